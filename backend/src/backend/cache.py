@@ -0,0 +1,64 @@
+"""Small bounded in-process caches."""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+
+from src.backend.config import settings
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for use in cache keys (case and whitespace insensitive)."""
+    return " ".join(query.lower().split())
+
+
+class LRUCache[K: Hashable, V]:
+    """Thread-safe least-recently-used cache with an optional TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float | None = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: K, value: V) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Retrieval results keyed by notebook content version, so entries for older
+# versions are never hit again and simply age out.
+retrieval_cache: LRUCache[tuple, list] = LRUCache(
+    max_entries=settings.retrieval_cache_max_entries,
+    ttl_seconds=settings.retrieval_cache_ttl_seconds,
+)
@@ -0,0 +1,123 @@
+"""Semantic cache of final answers for repeated questions."""
+
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from src.backend.config import settings
+
+# (notebook_id, content_version, provider, model, chat_style, response_length,
+#  custom_instructions, sorted document_ids, per_document)
+AnswerCacheKey = tuple[str, int, str, str, str, str, str | None, tuple[str, ...] | None, bool]
+
+
+@dataclass
+class CachedAnswer:
+    content: str
+    sources: list[dict]
+    grounding: dict
+    created_at: float = field(default_factory=time.monotonic)
+
+
+def make_cache_key(
+    notebook_id: str,
+    content_version: int,
+    provider: str,
+    model: str,
+    chat_style: str,
+    response_length: str,
+    custom_instructions: str | None,
+    document_ids: list[str] | None,
+    per_document: bool = False,
+) -> AnswerCacheKey:
+    """Build the exact-match part of the cache key; the query is matched by similarity."""
+    return (
+        notebook_id,
+        content_version,
+        provider,
+        model,
+        chat_style,
+        response_length,
+        custom_instructions if chat_style == "custom" else None,
+        tuple(sorted(document_ids)) if document_ids else None,
+        per_document,
+    )
+
+
+class SemanticAnswerCache:
+    """Answers keyed by notebook/config plus a query-embedding similarity threshold.
+
+    Entries for a notebook are dropped as soon as an entry for a newer content
+    version is seen, so any document change invalidates previous answers.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._buckets: OrderedDict[AnswerCacheKey, list[tuple[np.ndarray, CachedAnswer]]] = (
+            OrderedDict()
+        )
+        self._size = 0
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _prune_expired(self, key: AnswerCacheKey) -> list[tuple[np.ndarray, CachedAnswer]]:
+        bucket = self._buckets.get(key, [])
+        cutoff = time.monotonic() - self.ttl_seconds
+        fresh = [item for item in bucket if item[1].created_at >= cutoff]
+        self._size -= len(bucket) - len(fresh)
+        if fresh:
+            self._buckets[key] = fresh
+        else:
+            self._buckets.pop(key, None)
+        return fresh
+
+    def get(self, key: AnswerCacheKey, query_embedding: Sequence[float]) -> CachedAnswer | None:
+        """Return the most similar cached answer above the threshold, if any."""
+        bucket = self._prune_expired(key)
+        if not bucket:
+            return None
+
+        matrix = np.stack([vector for vector, _ in bucket])
+        similarities = matrix @ self._normalize(query_embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+
+        self._buckets.move_to_end(key)
+        return bucket[best][1]
+
+    def put(self, key: AnswerCacheKey, query_embedding: Sequence[float], answer: CachedAnswer):
+        """Store an answer, evicting stale versions and least recently used entries."""
+        self.invalidate_notebook(key[0], keep_version=key[1])
+
+        self._buckets.setdefault(key, []).append((self._normalize(query_embedding), answer))
+        self._buckets.move_to_end(key)
+        self._size += 1
+
+        while self._size > self.max_entries and self._buckets:
+            oldest_key, oldest_bucket = next(iter(self._buckets.items()))
+            oldest_bucket.pop(0)
+            self._size -= 1
+            if not oldest_bucket:
+                del self._buckets[oldest_key]
+
+    def invalidate_notebook(self, notebook_id: str, keep_version: int | None = None) -> None:
+        """Drop cached answers for a notebook, optionally keeping one content version."""
+        for key in [k for k in self._buckets if k[0] == notebook_id and k[1] != keep_version]:
+            self._size -= len(self._buckets.pop(key))
+
+
+answer_cache = SemanticAnswerCache(
+    max_entries=settings.answer_cache_max_entries,
+    ttl_seconds=settings.answer_cache_ttl_seconds,
+    similarity_threshold=settings.answer_cache_similarity_threshold,
+)
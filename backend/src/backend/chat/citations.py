@@ -0,0 +1,76 @@
+"""Incremental citation tracking over a streamed answer."""
+
+import re
+
+from sqlalchemy import select
+
+from src.backend.database import async_session
+from src.backend.models import Chunk
+
+CITATION_PATTERN = re.compile(r"\[(\d+)\]")
+# Longest unfinished marker kept between tokens, e.g. "[123"
+MAX_PARTIAL_MARKER = 6
+
+
+class CitationTracker:
+    """Resolve citation markers such as ``[2]`` as soon as each one is complete.
+
+    Tokens rarely align with markers, so a trailing ``[`` (and any digits after
+    it) is held back until the next token arrives.
+    """
+
+    def __init__(self, sources: list[dict], page_numbers: dict[str, int | None] | None = None):
+        self._sources = {source["citation_index"]: source for source in sources}
+        self._page_numbers = page_numbers or {}
+        self._partial = ""
+        self.cited: list[int] = []  # Citation indexes in order of first appearance
+
+    def feed(self, text: str) -> list[dict]:
+        """Consume a token and return a citation event payload for each new citation."""
+        text = self._partial + text
+        events = []
+        end = 0
+        for match in CITATION_PATTERN.finditer(text):
+            end = match.end()
+            index = int(match.group(1))
+            source = self._sources.get(index)
+            if source is None or index in self.cited:
+                continue
+            self.cited.append(index)
+            events.append(
+                {
+                    "type": "citation",
+                    "citation_index": index,
+                    "chunk_id": source["chunk_id"],
+                    "document_id": source["document_id"],
+                    "document_name": source["document_name"],
+                    "content": source["content"],
+                    "relevance_score": source["relevance_score"],
+                    "page_number": self._page_numbers.get(source["chunk_id"]),
+                }
+            )
+
+        start = text.rfind("[", end)
+        partial = text[start:] if start != -1 else ""
+        if partial == "[" or (len(partial) <= MAX_PARTIAL_MARKER and partial[1:].isdigit()):
+            self._partial = partial
+        else:
+            self._partial = ""
+        return events
+
+    def cited_sources(self) -> list[dict]:
+        """The sources referenced so far, in citation order."""
+        return [self._sources[index] for index in sorted(self.cited)]
+
+
+async def create_citation_tracker(sources: list[dict]) -> CitationTracker:
+    """Build a tracker for ``sources``, loading their page numbers in one query."""
+    chunk_ids = [source["chunk_id"] for source in sources]
+    page_numbers: dict[str, int | None] = {}
+    if chunk_ids:
+        async with async_session() as session:
+            result = await session.execute(
+                select(Chunk.id, Chunk.page_number).where(Chunk.id.in_(chunk_ids))
+            )
+            page_numbers = dict(result.all())
+    return CitationTracker(sources, page_numbers)
@@ -0,0 +1,83 @@
+"""Long-context mode: answer from the whole notebook when it fits the model."""
+
+from sqlalchemy import func, select
+
+from src.backend.cache import retrieval_cache
+from src.backend.config import settings
+from src.backend.database import async_session
+from src.backend.llm.base import LLMProvider
+from src.backend.models import Chunk, Document, Notebook
+
+
+def long_context_budget(provider: LLMProvider, model: str) -> int:
+    """Maximum notebook tokens to send, leaving room for history and the answer."""
+    window_share = int(provider.context_window(model) * settings.rag_long_context_window_ratio)
+    return min(settings.rag_long_context_max_tokens, window_share)
+
+
+async def load_long_context_sources(
+    notebook: Notebook,
+    provider: LLMProvider,
+    model: str,
+    document_ids: list[str] | None = None,
+) -> list[dict] | None:
+    """Return every chunk of the notebook as sources if it fits the model, else None.
+
+    Chunks are ordered by document and position so the resulting prompt prefix
+    is byte-identical across turns until the notebook content changes, which
+    is what lets providers reuse their prompt cache.
+    """
+    if not settings.rag_long_context_enabled:
+        return None
+
+    budget = long_context_budget(provider, model)
+    cache_key = (
+        "full_text",
+        notebook.id,
+        notebook.content_version,
+        tuple(sorted(document_ids)) if document_ids else None,
+        budget,
+    )
+    cached = retrieval_cache.get(cache_key)
+    if cached is not None:
+        return [dict(source) for source in cached] if cached else None
+
+    conditions = [
+        Document.notebook_id == notebook.id,
+        Document.processing_status == "ready",
+        Chunk.parent_id.is_(None),
+    ]
+    if document_ids:
+        conditions.append(Document.id.in_(document_ids))
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(func.coalesce(func.sum(Chunk.token_count), 0))
+            .join(Document, Chunk.document_id == Document.id)
+            .where(*conditions)
+        )
+        total_tokens = result.scalar_one()
+
+        sources: list[dict] = []
+        if 0 < total_tokens <= budget:
+            result = await session.execute(
+                select(Chunk, Document.filename)
+                .join(Document, Chunk.document_id == Document.id)
+                .where(*conditions)
+                .order_by(Document.created_at, Document.id, Chunk.chunk_index)
+            )
+            sources = [
+                {
+                    "chunk_id": chunk.id,
+                    "document_id": chunk.document_id,
+                    "document_name": filename,
+                    "content": chunk.content,
+                    "relevance_score": 1.0,
+                    "citation_index": citation_index,
+                }
+                for citation_index, (chunk, filename) in enumerate(result.all(), start=1)
+            ]
+
+    # An empty list records "too large" so the size check is not repeated
+    retrieval_cache.put(cache_key, sources)
+    return [dict(source) for source in sources] if sources else None
@@ -0,0 +1,82 @@
+"""Speculative retrieval prefetch for draft queries, tracked per chat session."""
+
+import asyncio
+import time
+from collections.abc import Coroutine, Hashable
+
+from src.backend.cache import LRUCache, normalize_query
+from src.backend.config import settings
+
+PrefetchKey = tuple[str, tuple[str, ...] | None, bool]
+
+
+def prefetch_key(query: str, document_ids: list[str] | None, per_document: bool) -> PrefetchKey:
+    """Identify the retrieval a draft query would trigger."""
+    return (
+        normalize_query(query),
+        tuple(sorted(document_ids)) if document_ids else None,
+        per_document,
+    )
+
+
+class RetrievalPrefetcher:
+    """At most one in-flight prefetch per session, with a minimum gap between starts.
+
+    Prefetches only warm the query-embedding and retrieval caches; a send with
+    the same query then hits them. A newer draft cancels the previous prefetch.
+    """
+
+    def __init__(self, min_interval_seconds: float):
+        self.min_interval_seconds = min_interval_seconds
+        self._pending: dict[str, tuple[Hashable, asyncio.Task]] = {}
+        self._last_started: LRUCache[str, float] = LRUCache(max_entries=4096, ttl_seconds=60)
+
+    def schedule(self, session_id: str, key: Hashable, coro: Coroutine) -> bool:
+        """Start a prefetch, replacing the session's previous one.
+
+        Returns False (and discards ``coro``) when the session is rate limited.
+        """
+        now = time.monotonic()
+        last_started = self._last_started.get(session_id)
+        if last_started is not None and now - last_started < self.min_interval_seconds:
+            coro.close()
+            return False
+
+        self.cancel(session_id)
+        task = asyncio.create_task(coro)
+        self._pending[session_id] = (key, task)
+        self._last_started.put(session_id, now)
+        task.add_done_callback(lambda done: self._discard(session_id, done))
+        return True
+
+    def cancel(self, session_id: str) -> bool:
+        """Cancel the session's in-flight prefetch, if any."""
+        entry = self._pending.pop(session_id, None)
+        if entry is None:
+            return False
+        entry[1].cancel()
+        return True
+
+    async def wait(self, session_id: str, key: Hashable, timeout: float) -> None:
+        """Let a matching in-flight prefetch finish; cancel one for a different draft."""
+        entry = self._pending.get(session_id)
+        if entry is None:
+            return
+        pending_key, task = entry
+        if pending_key != key:
+            self.cancel(session_id)
+            return
+        # Neither raises on timeout nor cancels the prefetch
+        await asyncio.wait({task}, timeout=timeout)
+
+    def _discard(self, session_id: str, task: asyncio.Task) -> None:
+        entry = self._pending.get(session_id)
+        if entry is not None and entry[1] is task:
+            del self._pending[session_id]
+        if not task.cancelled():
+            task.exception()  # Prefetch failures are not reported; the send retries
+
+
+retrieval_prefetcher = RetrievalPrefetcher(
+    min_interval_seconds=settings.prefetch_min_interval_ms / 1000,
+)
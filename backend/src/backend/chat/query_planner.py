@@ -0,0 +1,119 @@
+"""Query planning: rewrite conversational follow-ups into standalone search queries."""
+
+import asyncio
+import json
+import re
+
+from src.backend.cache import LRUCache, normalize_query
+from src.backend.config import settings
+from src.backend.llm import get_provider
+from src.backend.llm.base import ChatMessage as LLMChatMessage
+from src.backend.llm.scheduler import Priority, llm_scheduler
+from src.backend.models import Message
+
+# Words that usually refer back to something said earlier in the conversation
+REFERENCE_PATTERN = re.compile(
+    r"\b(it|its|they|them|their|this|that|these|those|he|she|him|her|his|"
+    r"one|ones|former|latter|above|previous|earlier|same|again|else)\b",
+    re.IGNORECASE,
+)
+FOLLOW_UP_PREFIX_PATTERN = re.compile(
+    r"^\s*(and|also|but|so|what about|how about|why|how so|more on|tell me more|elaborate)\b",
+    re.IGNORECASE,
+)
+MIN_STANDALONE_WORDS = 4
+
+# Rewrites keyed by query and the conversation turns they depend on, so that
+# regenerate and edit reuse the same plan (and hit the retrieval cache).
+_plan_cache: LRUCache[tuple, list[str]] = LRUCache(
+    max_entries=settings.retrieval_cache_max_entries,
+    ttl_seconds=settings.retrieval_cache_ttl_seconds,
+)
+
+
+def is_standalone_query(query: str, history: list[Message] | None) -> bool:
+    """Cheap check for whether a query can be searched without conversation context."""
+    if not history:
+        return True
+    if len(query.split()) < MIN_STANDALONE_WORDS:
+        return False
+    if FOLLOW_UP_PREFIX_PATTERN.search(query):
+        return False
+    return not REFERENCE_PATTERN.search(query)
+
+
+def _build_rewrite_prompt(query: str, turns: list[Message], max_queries: int) -> str:
+    transcript = "\n".join(f"{msg.role.upper()}: {msg.content[:500]}" for msg in turns)
+    return f"""Rewrite the user's latest message into standalone search queries for a document search engine.
+
+Conversation so far:
+{transcript}
+
+Latest message: {query}
+
+Resolve pronouns and references using the conversation. If the message asks about several distinct things, write one query per thing (at most {max_queries}).
+Return a JSON array of strings. Only return the JSON array, nothing else. Example format: ["Query 1", "Query 2"]"""
+
+
+def _parse_queries(response: str, max_queries: int) -> list[str]:
+    json_match = re.search(r"\[.*\]", response, re.DOTALL)
+    if not json_match:
+        return []
+    parsed = json.loads(json_match.group())
+    if not isinstance(parsed, list):
+        return []
+
+    queries: list[str] = []
+    for item in parsed:
+        text = str(item).strip()
+        if text and text not in queries:
+            queries.append(text)
+    return queries[:max_queries]
+
+
+async def plan_queries(
+    query: str,
+    history: list[Message] | None,
+    provider_name: str,
+    model: str,
+    notebook_id: str | None = None,
+) -> list[str]:
+    """Turn the latest user message into one or more standalone search queries.
+
+    Standalone questions skip the LLM entirely. Rewriting runs under a hard
+    time budget; on timeout or any failure the original query is used as-is.
+    """
+    if not settings.rag_query_rewrite_enabled or is_standalone_query(query, history):
+        return [query]
+
+    max_queries = settings.rag_query_rewrite_max_queries
+    turns = (history or [])[-settings.rag_query_rewrite_history_turns :]
+    rewrite_model = settings.rag_query_rewrite_models.get(provider_name, model)
+    cache_key = (normalize_query(query), tuple(msg.id for msg in turns), rewrite_model)
+    cached = _plan_cache.get(cache_key)
+    if cached is not None:
+        return list(cached)
+
+    prompt = _build_rewrite_prompt(query, turns, max_queries)
+    provider = get_provider(provider_name)
+
+    try:
+        full_response = ""
+        # The time budget includes waiting for a slot with the provider
+        async with (
+            asyncio.timeout(settings.rag_query_rewrite_timeout),
+            llm_scheduler.slot(provider_name, Priority.CHAT, notebook_id),
+        ):
+            async for chunk in provider.chat_stream(
+                [LLMChatMessage(role="user", content=prompt)], rewrite_model
+            ):
+                if chunk:
+                    full_response += chunk
+        queries = _parse_queries(full_response, max_queries)
+    except Exception:
+        return [query]
+
+    if not queries:
+        return [query]
+    _plan_cache.put(cache_key, queries)
+    return list(queries)
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+import time
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.backend.chat import service
+from src.backend.chat.prefetch import prefetch_key, retrieval_prefetcher
 from src.backend.chat.schemas import (
     ChatSessionCreate,
     ChatSessionListResponse,
@@ -11,18 +14,28 @@ from src.backend.chat.schemas import (
     MessageFeedbackRequest,
     MessageListResponse,
     MessageResponse,
+    ModelUsage,
+    NotebookUsageResponse,
+    PrefetchRequest,
     RegenerateRequest,
     SendMessageRequest,
     SuggestedQuestionsResponse,
 )
+from src.backend.chat.sse import EventStreamResponse
+from src.backend.chat.streams import generations, parse_last_event_id
+from src.backend.chat.suggestions import suggestion_jobs
 from src.backend.config import settings
 from src.backend.database import get_session
-from src.backend.documents.service import list_documents
+from src.backend.documents.schemas import DocumentFilters
+from src.backend.documents.service import filter_document_ids, list_documents
 from src.backend.llm import get_provider
+from src.backend.llm.scheduler import llm_scheduler
 from src.backend.notebooks.service import get_notebook
 
 router = APIRouter(prefix="/api", tags=["chat"])
 
+SSE_HEADERS = {"Cache-Control": "no-cache", "Connection": "keep-alive"}
+
 
 def session_to_response(chat_session) -> ChatSessionResponse:
     return ChatSessionResponse(
@@ -34,6 +47,36 @@ def session_to_response(chat_session) -> ChatSessionResponse:
     )
 
 
+async def resolve_document_ids(
+    db_session: AsyncSession,
+    notebook_id: str,
+    document_ids: list[str] | None,
+    per_document: bool,
+    filters: DocumentFilters | None = None,
+) -> list[str] | None:
+    """Resolve the documents a turn may retrieve from.
+
+    Filters narrow the selection; an empty list means they matched nothing and
+    the turn has no sources (as search returns no results). Per-document
+    retrieval over no selection means over every ready document.
+    """
+    document_ids = await filter_document_ids(db_session, notebook_id, filters, document_ids or None)
+    if per_document and document_ids is None:
+        documents = await list_documents(db_session, notebook_id)
+        return [d.id for d in documents if d.processing_status == "ready"]
+    return document_ids
+
+
+def stream_generation(session_id: str, events: AsyncIterator[bytes]) -> EventStreamResponse:
+    """Run a chat generation in the background and stream its event log.
+
+    The generation is not tied to this response: a client that loses the
+    connection can resume with GET /streams/{stream_id} and Last-Event-ID.
+    """
+    stream = generations.start(session_id, events)
+    return EventStreamResponse(stream.read(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 def message_to_response(message) -> MessageResponse:
     return MessageResponse(
         id=message.id,
@@ -42,10 +85,20 @@ def message_to_response(message) -> MessageResponse:
         content=message.content,
         model=message.model,
         feedback=message.feedback,
+        interrupted=message.interrupted,
+        prompt_tokens=message.prompt_tokens,
+        completion_tokens=message.completion_tokens,
+        ttft_ms=message.ttft_ms,
+        generation_ms=message.generation_ms,
+        retrieval_ms=message.retrieval_ms,
         created_at=message.created_at,
     )
 
 
+def _round_ms(value: float | None) -> float | None:
+    return round(value, 2) if value is not None else None
+
+
 @router.get(
     "/notebooks/{notebook_id}/sessions",
     response_model=ChatSessionListResponse,
@@ -66,6 +119,41 @@ async def list_sessions(
     return ChatSessionListResponse(sessions=[session_to_response(s) for s in sessions])
 
 
+@router.get("/notebooks/{notebook_id}/usage", response_model=NotebookUsageResponse)
+async def get_notebook_usage(
+    notebook_id: str,
+    session: AsyncSession = Depends(get_session),
+) -> NotebookUsageResponse:
+    """Token usage and latency of the notebook's answers, per model."""
+    notebook = await get_notebook(session, notebook_id)
+    if not notebook:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Notebook not found",
+        )
+
+    rows = await service.get_usage_by_model(session, notebook_id)
+    return NotebookUsageResponse(
+        notebook_id=notebook_id,
+        models=[
+            ModelUsage(
+                model=row.model,
+                messages=row.messages,
+                prompt_tokens=row.prompt_tokens,
+                completion_tokens=row.completion_tokens,
+                avg_ttft_ms=_round_ms(row.avg_ttft_ms),
+                max_ttft_ms=_round_ms(row.max_ttft_ms),
+                avg_generation_ms=_round_ms(row.avg_generation_ms),
+                avg_retrieval_ms=_round_ms(row.avg_retrieval_ms),
+                tokens_per_second=(
+                    round(row.decoded_tokens / row.decode_ms * 1000, 2) if row.decode_ms else None
+                ),
+            )
+            for row in rows
+        ],
+    )
+
+
 @router.get(
     "/notebooks/{notebook_id}/suggested-questions",
     response_model=SuggestedQuestionsResponse,
@@ -74,7 +162,11 @@ async def get_suggested_questions(
     notebook_id: str,
     db_session: AsyncSession = Depends(get_session),
 ) -> SuggestedQuestionsResponse:
-    """Get suggested questions based on notebook sources."""
+    """Get suggested questions based on notebook sources.
+
+    Questions are cached per notebook content version; under load generation
+    is skipped and an empty list is returned.
+    """
     notebook = await get_notebook(db_session, notebook_id)
     if not notebook:
         raise HTTPException(
@@ -82,21 +174,34 @@ async def get_suggested_questions(
             detail="Notebook not found",
         )
 
-    documents = await list_documents(db_session, notebook_id)
-    ready_docs = [d for d in documents if d.processing_status == "ready"]
-
-    if not ready_docs:
+    if not settings.suggestions_enabled:
         return SuggestedQuestionsResponse(questions=[])
 
-    source_summaries = [doc.summary or f"Document: {doc.filename}" for doc in ready_docs[:5]]
-
-    questions = await service.generate_suggested_questions(
-        source_summaries=source_summaries,
-        provider_name=notebook.llm_provider,
-        model=notebook.llm_model or settings.default_llm_model,
+    model = settings.suggestions_models.get(
+        notebook.llm_provider, notebook.llm_model or settings.default_llm_model
     )
+    key = ("initial", notebook.id, notebook.content_version, model)
+    questions = await suggestion_jobs.get(key, settings.suggestions_wait_timeout)
+    if questions is None:
+        documents = await list_documents(db_session, notebook_id)
+        ready_docs = [d for d in documents if d.processing_status == "ready"]
+
+        if not ready_docs:
+            return SuggestedQuestionsResponse(questions=[])
+
+        source_summaries = [doc.summary or f"Document: {doc.filename}" for doc in ready_docs[:5]]
+        suggestion_jobs.start(
+            key,
+            service.generate_suggested_questions(
+                source_summaries=source_summaries,
+                provider_name=notebook.llm_provider,
+                model=model,
+                notebook_id=notebook.id,
+            ),
+        )
+        questions = await suggestion_jobs.get(key, settings.suggestions_wait_timeout)
 
-    return SuggestedQuestionsResponse(questions=questions)
+    return SuggestedQuestionsResponse(questions=questions or [])
 
 
 @router.post(
@@ -173,8 +278,51 @@ async def send_message(
     session_id: str,
     request: SendMessageRequest,
     db_session: AsyncSession = Depends(get_session),
-) -> StreamingResponse:
-    """Send a message and get a streaming response."""
+) -> EventStreamResponse:
+    """Send a message and get a streaming response.
+
+    Only the session lookup happens before the response starts; storing the
+    message runs inside the stream.
+    """
+    started = time.perf_counter()
+    row = await service.get_session_with_notebook(db_session, session_id)
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+    chat_session, notebook = row
+    llm_scheduler.admit(notebook.llm_provider)
+
+    model = request.model or notebook.llm_model or settings.default_llm_model
+
+    per_document = request.retrieval_mode == "per_document"
+    document_ids = await resolve_document_ids(
+        db_session, notebook.id, request.document_ids, per_document, request.filters
+    )
+    timings = {"lookup_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    return stream_generation(
+        session_id,
+        service.stream_chat_turn(
+            query=request.content,
+            chat_session=chat_session,
+            notebook=notebook,
+            model=model,
+            document_ids=document_ids,
+            per_document=per_document,
+            timings=timings,
+        ),
+    )
+
+
+@router.post("/sessions/{session_id}/prefetch", status_code=status.HTTP_202_ACCEPTED)
+async def prefetch_retrieval(
+    session_id: str,
+    request: PrefetchRequest,
+    db_session: AsyncSession = Depends(get_session),
+) -> None:
+    """Start warming retrieval for a draft query; replaces the session's previous prefetch."""
+    if not settings.prefetch_enabled or not request.content.strip():
+        return
+
     chat_session = await service.get_session(db_session, session_id)
     if not chat_session:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
@@ -183,29 +331,34 @@ async def send_message(
     if not notebook:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notebook not found")
 
-    model = request.model or notebook.llm_model or settings.default_llm_model
-
-    await service.create_message(db_session, session_id, "user", request.content)
-
-    if not chat_session.title:
-        title = service.generate_title_from_message(request.content)
-        await service.update_session_title(db_session, chat_session, title)
+    model = notebook.llm_model or settings.default_llm_model
+    per_document = request.retrieval_mode == "per_document"
+    document_ids = await resolve_document_ids(
+        db_session, notebook.id, request.document_ids, per_document, request.filters
+    )
 
-    messages = await service.get_messages(db_session, session_id)
-    history = messages[:-1] if messages else []
+    if document_ids == []:
+        return
 
-    return StreamingResponse(
-        service.stream_rag_response(
-            query=request.content,
-            notebook=notebook,
-            session_id=session_id,
-            model=model,
-            document_ids=request.document_ids,
-            conversation_history=history,
+    scheduled = retrieval_prefetcher.schedule(
+        session_id,
+        prefetch_key(request.content, document_ids, per_document),
+        service.prefetch_retrieval(
+            request.content, notebook, session_id, model, document_ids, per_document
         ),
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"},
     )
+    if not scheduled:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Prefetch rate limit exceeded",
+            headers={"Retry-After": "1"},
+        )
+
+
+@router.delete("/sessions/{session_id}/prefetch", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_prefetch(session_id: str) -> None:
+    """Cancel the session's in-flight prefetch, e.g. when the draft is cleared."""
+    retrieval_prefetcher.cancel(session_id)
 
 
 @router.post("/messages/{message_id}/regenerate")
@@ -213,7 +366,7 @@ async def regenerate_message(
     message_id: str,
     request: RegenerateRequest | None = None,
     db_session: AsyncSession = Depends(get_session),
-) -> StreamingResponse:
+) -> EventStreamResponse:
     """Regenerate the last assistant response, optionally with a modification instruction."""
     message = await service.get_message(db_session, message_id)
     if not message:
@@ -228,6 +381,18 @@ async def regenerate_message(
     if not chat_session:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
 
+    notebook = await get_notebook(db_session, chat_session.notebook_id)
+    if not notebook:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notebook not found")
+    llm_scheduler.admit(notebook.llm_provider)
+
+    # Reuse the previous answer's citations unless the notebook content changed since.
+    # An answer that cited nothing (a refusal, an interrupted stream) is retrieved
+    # for again, which the retrieval cache serves for an unchanged content version.
+    reuse_sources = None
+    if message.content_version is not None and message.content_version == notebook.content_version:
+        reuse_sources = await service.get_message_source_chunks(db_session, message.id) or None
+
     await db_session.delete(message)
     await db_session.commit()
 
@@ -241,10 +406,6 @@ async def regenerate_message(
     if not last_user_message:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No user message found")
 
-    notebook = await get_notebook(db_session, chat_session.notebook_id)
-    if not notebook:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notebook not found")
-
     model = message.model or notebook.llm_model or settings.default_llm_model
     history = [m for m in messages if m.id != last_user_message.id]
 
@@ -253,25 +414,60 @@ async def regenerate_message(
     if request and request.instruction:
         query = f"[MODIFICATION INSTRUCTION: {request.instruction}]\n\nOriginal question: {query}"
 
-    return StreamingResponse(
+    return stream_generation(
+        chat_session.id,
         service.stream_rag_response(
             query=query,
             notebook=notebook,
             session_id=chat_session.id,
             model=model,
             conversation_history=history,
+            use_answer_cache=False,
+            retrieval_query=last_user_message.content,
+            reuse_sources=reuse_sources,
         ),
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"},
     )
 
 
+@router.get(
+    "/messages/{message_id}/suggested-questions",
+    response_model=SuggestedQuestionsResponse,
+)
+async def get_follow_up_questions(
+    message_id: str,
+    db_session: AsyncSession = Depends(get_session),
+) -> SuggestedQuestionsResponse:
+    """Get follow-up questions for an assistant message.
+
+    Generation normally starts in the background when the answer completes;
+    otherwise it is started here. Under load it is skipped and an empty list
+    is returned.
+    """
+    message = await service.get_message(db_session, message_id)
+    if not message or message.role != "assistant":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
+
+    questions = await suggestion_jobs.get(message.id, settings.suggestions_wait_timeout)
+    if questions is None:
+        row = await service.get_session_with_notebook(db_session, message.chat_session_id)
+        if not row:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+        _, notebook = row
+        model = message.model or notebook.llm_model or settings.default_llm_model
+        if service.schedule_follow_up_questions(
+            message.id, message.content, notebook.llm_provider, model, notebook.id
+        ):
+            questions = await suggestion_jobs.get(message.id, settings.suggestions_wait_timeout)
+
+    return SuggestedQuestionsResponse(questions=questions or [])
+
+
 @router.patch("/messages/{message_id}")
 async def edit_message(
     message_id: str,
     request: EditMessageRequest,
     db_session: AsyncSession = Depends(get_session),
-) -> StreamingResponse:
+) -> EventStreamResponse:
     """Edit a user message, delete subsequent messages, and regenerate the response."""
     message = await service.get_message(db_session, message_id)
     if not message:
@@ -286,17 +482,16 @@ async def edit_message(
     if not chat_session:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
 
-    # Update message content
-    message.content = request.content
-    db_session.add(message)
-    await db_session.commit()
-
-    # Delete all messages after this one
-    await service.delete_messages_after(db_session, message)
-
     notebook = await get_notebook(db_session, chat_session.notebook_id)
     if not notebook:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notebook not found")
+    llm_scheduler.admit(notebook.llm_provider)
+
+    # Update message content and delete all messages after this one together
+    message.content = request.content
+    db_session.add(message)
+    await service.delete_messages_after(db_session, message)
+    await db_session.commit()
 
     # Get remaining messages for conversation history (excluding the edited message)
     messages = await service.get_messages(db_session, chat_session.id)
@@ -304,7 +499,8 @@ async def edit_message(
 
     model = notebook.llm_model or settings.default_llm_model
 
-    return StreamingResponse(
+    return stream_generation(
+        chat_session.id,
         service.stream_rag_response(
             query=request.content,
             notebook=notebook,
@@ -312,8 +508,6 @@ async def edit_message(
             model=model,
             conversation_history=history,
         ),
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"},
     )
 
 
@@ -345,6 +539,31 @@ async def set_message_feedback(
     return message_to_response(message)
 
 
+@router.get("/streams/{stream_id}")
+async def resume_stream(
+    stream_id: str,
+    last_event_id: str | None = Header(None),
+) -> EventStreamResponse:
+    """Reconnect to a running or just finished generation, replaying missed events."""
+    stream = generations.get(stream_id)
+    if not stream:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stream not found")
+    return EventStreamResponse(
+        stream.read(after=parse_last_event_id(last_event_id, stream.id)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.delete("/streams/{stream_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_stream(stream_id: str) -> None:
+    """Stop a generation; the partial answer is saved as interrupted."""
+    stream = generations.get(stream_id)
+    if not stream:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stream not found")
+    stream.cancel()
+
+
 @router.get("/llm/providers")
 async def list_llm_providers():
     """List available LLM providers and their models."""
@@ -3,6 +3,8 @@ from typing import Annotated, Literal
 
 from pydantic import BaseModel, PlainSerializer
 
+from src.backend.documents.schemas import DocumentFilters
+
 # Serialize datetime to ISO format with Z suffix for UTC
 UTCDateTime = Annotated[
     datetime,
@@ -38,6 +40,12 @@ class MessageResponse(BaseModel):
     content: str
     model: str | None
     feedback: str | None
+    interrupted: bool = False
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    ttft_ms: float | None = None
+    generation_ms: float | None = None
+    retrieval_ms: float | None = None
     created_at: UTCDateTime
 
     model_config = {"from_attributes": True}
@@ -51,6 +59,16 @@ class SendMessageRequest(BaseModel):
     content: str
     model: str | None = None
     document_ids: list[str] | None = None
+    filters: DocumentFilters | None = None  # Applied on top of document_ids
+    # "per_document" gives each selected document its own share of the context
+    retrieval_mode: Literal["default", "per_document"] = "default"
+
+
+class PrefetchRequest(BaseModel):
+    content: str  # Draft query as currently typed
+    document_ids: list[str] | None = None
+    filters: DocumentFilters | None = None
+    retrieval_mode: Literal["default", "per_document"] = "default"
 
 
 class SourceInfo(BaseModel):
@@ -84,3 +102,21 @@ class EditMessageRequest(BaseModel):
 
 class SuggestedQuestionsResponse(BaseModel):
     questions: list[str]
+
+
+class ModelUsage(BaseModel):
+    model: str | None
+    messages: int
+    prompt_tokens: int
+    completion_tokens: int
+    avg_ttft_ms: float | None
+    max_ttft_ms: float | None
+    avg_generation_ms: float | None
+    avg_retrieval_ms: float | None
+    # Completion tokens per second after the first token
+    tokens_per_second: float | None
+
+
+class NotebookUsageResponse(BaseModel):
+    notebook_id: str
+    models: list[ModelUsage]
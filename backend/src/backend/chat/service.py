@@ -1,20 +1,61 @@
 """Chat service for session and message management."""
 
-import json
-import re
+import asyncio
+import time
 from collections.abc import AsyncGenerator
+from contextlib import aclosing
+from dataclasses import dataclass, field
 
-from sqlalchemy import select
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.backend.cache import normalize_query, retrieval_cache
+from src.backend.chat.answer_cache import CachedAnswer, answer_cache, make_cache_key
+from src.backend.chat.citations import create_citation_tracker
+from src.backend.chat.long_context import load_long_context_sources
+from src.backend.chat.prefetch import prefetch_key, retrieval_prefetcher
+from src.backend.chat.query_planner import is_standalone_query, plan_queries
 from src.backend.chat.schemas import GroundingMetadata
+from src.backend.chat.sse import coalesce_tokens, sse_event
+from src.backend.chat.suggestions import suggestion_jobs
+from src.backend.chat.turn_router import TurnRoute, classify_turn
 from src.backend.config import settings
 from src.backend.database import async_session
-from src.backend.embedding.service import embed_query
-from src.backend.embedding.vectorstore import search_collection
+from src.backend.embedding.mmr import maximal_marginal_relevance
+from src.backend.embedding.service import embed_query, embed_texts
+from src.backend.embedding.vectorstore import CHILD_FETCH_FACTOR, search_collection
 from src.backend.llm import get_provider
 from src.backend.llm.base import ChatMessage as LLMChatMessage
-from src.backend.models import ChatSession, Message, MessageSource, Notebook, utc_now
+from src.backend.llm.scheduler import Priority, llm_scheduler
+from src.backend.llm.structured import generate_validated_json, text_list
+from src.backend.models import (
+    ChatSession,
+    Chunk,
+    Document,
+    Message,
+    MessageSource,
+    Notebook,
+    utc_now,
+)
+from src.backend.processing.chunking import count_tokens
+
+# Rank offset for reciprocal rank fusion of multi-query results
+RRF_K = 60
+# Approximate size of the token events used when replaying a cached answer
+REPLAY_CHUNK_CHARS = 64
+# Stage timings that together make up an answer's retrieval time
+RETRIEVAL_TIMINGS = (
+    "prefetch_wait_ms",
+    "plan_ms",
+    "embed_ms",
+    "search_ms",
+    "select_ms",
+    "hydrate_ms",
+)
+
+# Partial answers being saved after their client disconnected
+_interrupted_saves: set[asyncio.Task] = set()
 
 
 async def list_sessions(session: AsyncSession, notebook_id: str) -> list[ChatSession]:
@@ -49,23 +90,26 @@ async def create_session(
     return chat_session
 
 
-async def update_session_title(
-    session: AsyncSession, chat_session: ChatSession, title: str
-) -> ChatSession:
-    """Update a chat session title."""
-    chat_session.title = title
-    chat_session.updated_at = utc_now()
-    await session.commit()
-    await session.refresh(chat_session)
-    return chat_session
-
-
 async def delete_session(session: AsyncSession, chat_session: ChatSession) -> None:
     """Delete a chat session and all its messages."""
     await session.delete(chat_session)
     await session.commit()
 
 
+async def get_session_with_notebook(
+    session: AsyncSession, session_id: str
+) -> tuple[ChatSession, Notebook] | None:
+    """Get a chat session and its notebook in one query."""
+    stmt = (
+        select(ChatSession, Notebook)
+        .join(Notebook, ChatSession.notebook_id == Notebook.id)
+        .where(ChatSession.id == session_id)
+    )
+    result = await session.execute(stmt)
+    row = result.first()
+    return tuple(row) if row else None
+
+
 async def get_messages(session: AsyncSession, session_id: str) -> list[Message]:
     """Get all messages in a chat session."""
     stmt = select(Message).where(Message.chat_session_id == session_id).order_by(Message.created_at)
@@ -80,43 +124,143 @@ async def get_message(session: AsyncSession, message_id: str) -> Message | None:
     return result.scalar_one_or_none()
 
 
-async def create_message(
-    session: AsyncSession,
+async def save_assistant_message(
     chat_session_id: str,
-    role: str,
     content: str,
-    model: str | None = None,
+    model: str,
+    content_version: int | None,
+    sources: list[dict],
+    interrupted: bool = False,
+    usage: dict[str, int] | None = None,
+    timings: dict[str, float] | None = None,
 ) -> Message:
-    """Create a new message."""
+    """Store an assistant answer and its sources in a single transaction.
+
+    Token counts from ``usage`` and latencies from ``timings`` (as filled in
+    by the streaming functions) are stored with the message.
+    """
+    usage = usage or {}
+    timings = timings or {}
     message = Message(
         chat_session_id=chat_session_id,
-        role=role,
+        role="assistant",
         content=content,
         model=model,
+        content_version=content_version,
+        interrupted=interrupted,
+        prompt_tokens=usage.get("prompt_tokens"),
+        completion_tokens=usage.get("completion_tokens"),
+        ttft_ms=timings.get("ttft_ms"),
+        generation_ms=timings.get("generate_ms"),
+        retrieval_ms=retrieval_ms(timings),
     )
-    session.add(message)
-    await session.commit()
-    await session.refresh(message)
+    async with async_session() as session:
+        # The sources are flushed as one multi-row insert right after the message
+        session.add_all(
+            [
+                message,
+                *(
+                    MessageSource(
+                        message_id=message.id,
+                        chunk_id=source["chunk_id"],
+                        relevance_score=source["relevance_score"],
+                        citation_index=source["citation_index"],
+                    )
+                    for source in sources
+                ),
+            ]
+        )
+        await session.commit()
     return message
 
 
-async def add_message_source(
-    session: AsyncSession,
-    message_id: str,
-    chunk_id: str,
-    relevance_score: float,
-    citation_index: int,
-) -> MessageSource:
-    """Add a source citation to a message."""
-    source = MessageSource(
-        message_id=message_id,
-        chunk_id=chunk_id,
-        relevance_score=relevance_score,
-        citation_index=citation_index,
+def retrieval_ms(timings: dict[str, float]) -> float | None:
+    """Time spent finding sources for an answer, or None if there was no retrieval."""
+    stages = [timings[key] for key in RETRIEVAL_TIMINGS if key in timings]
+    return round(sum(stages), 2) if stages else None
+
+
+async def get_usage_by_model(session: AsyncSession, notebook_id: str) -> list[Row]:
+    """Aggregate token usage and latency of a notebook's answers, per model.
+
+    Answers replayed from the answer cache count as messages but carry no
+    usage or timings, so they do not affect the averages.
+    """
+    # Decode time (the generation after its first token) of answers with a token count
+    decode_ms = Message.generation_ms - Message.ttft_ms
+    measured = Message.completion_tokens.is_not(None) & (decode_ms > 0)
+    stmt = (
+        select(
+            Message.model,
+            func.count(Message.id).label("messages"),
+            func.coalesce(func.sum(Message.prompt_tokens), 0).label("prompt_tokens"),
+            func.coalesce(func.sum(Message.completion_tokens), 0).label("completion_tokens"),
+            func.avg(Message.ttft_ms).label("avg_ttft_ms"),
+            func.max(Message.ttft_ms).label("max_ttft_ms"),
+            func.avg(Message.generation_ms).label("avg_generation_ms"),
+            func.avg(Message.retrieval_ms).label("avg_retrieval_ms"),
+            func.sum(Message.completion_tokens).filter(measured).label("decoded_tokens"),
+            func.sum(decode_ms).filter(measured).label("decode_ms"),
+        )
+        .join(ChatSession, Message.chat_session_id == ChatSession.id)
+        .where(ChatSession.notebook_id == notebook_id, Message.role == "assistant")
+        .group_by(Message.model)
+        .order_by(func.count(Message.id).desc())
     )
-    session.add(source)
-    await session.commit()
-    return source
+    result = await session.execute(stmt)
+    return list(result.all())
+
+
+async def record_user_message(
+    chat_session_id: str, content: str, title: str | None = None
+) -> list[Message]:
+    """Store a user message (and the session title, if given) in one transaction.
+
+    Returns:
+        The conversation history before this message.
+    """
+    async with async_session() as session:
+        history = await get_messages(session, chat_session_id)
+        session.add(Message(chat_session_id=chat_session_id, role="user", content=content))
+        if title is not None:
+            await session.execute(
+                update(ChatSession)
+                .where(ChatSession.id == chat_session_id)
+                .values(title=title, updated_at=utc_now())
+            )
+        await session.commit()
+    return history
+
+
+def persist_interrupted_answer(
+    chat_session_id: str,
+    content: str,
+    model: str,
+    content_version: int | None,
+    sources: list[dict],
+    usage: dict[str, int] | None = None,
+    timings: dict[str, float] | None = None,
+) -> None:
+    """Save a partial answer from a stream that is being cancelled or closed.
+
+    The stream itself cannot await anymore, so the write runs as its own task.
+    """
+    if not content:
+        return
+    task = asyncio.create_task(
+        save_assistant_message(
+            chat_session_id,
+            content,
+            model,
+            content_version,
+            sources,
+            interrupted=True,
+            usage=usage,
+            timings=timings,
+        )
+    )
+    _interrupted_saves.add(task)
+    task.add_done_callback(_interrupted_saves.discard)
 
 
 async def get_message_sources(session: AsyncSession, message_id: str) -> list[MessageSource]:
@@ -130,6 +274,29 @@ async def get_message_sources(session: AsyncSession, message_id: str) -> list[Me
     return list(result.scalars().all())
 
 
+async def get_message_source_chunks(session: AsyncSession, message_id: str) -> list[dict]:
+    """Load a message's cited chunks in one query, formatted like retrieved sources."""
+    stmt = (
+        select(MessageSource, Chunk, Document.filename)
+        .join(Chunk, MessageSource.chunk_id == Chunk.id)
+        .join(Document, Chunk.document_id == Document.id)
+        .where(MessageSource.message_id == message_id)
+        .order_by(MessageSource.citation_index)
+    )
+    result = await session.execute(stmt)
+    return [
+        {
+            "chunk_id": chunk.id,
+            "document_id": chunk.document_id,
+            "document_name": filename,
+            "content": chunk.content,
+            "relevance_score": source.relevance_score,
+            "citation_index": source.citation_index,
+        }
+        for source, chunk, filename in result.all()
+    ]
+
+
 async def delete_last_assistant_message(
     session: AsyncSession, chat_session_id: str
 ) -> Message | None:
@@ -150,16 +317,17 @@ async def delete_last_assistant_message(
 
 
 async def delete_messages_after(session: AsyncSession, message: Message) -> int:
-    """Delete all messages that come after the specified message in the session."""
-    from sqlalchemy import delete
+    """Delete all messages (and their sources) after the specified message in the session.
 
-    stmt = (
-        delete(Message)
+    The caller commits, so the deletion can share a transaction with other changes.
+    """
+    later = (
+        select(Message.id)
         .where(Message.chat_session_id == message.chat_session_id)
         .where(Message.created_at > message.created_at)
     )
-    result = await session.execute(stmt)
-    await session.commit()
+    await session.execute(delete(MessageSource).where(MessageSource.message_id.in_(later)))
+    result = await session.execute(delete(Message).where(Message.id.in_(later)))
     return result.rowcount or 0
 
 
@@ -173,12 +341,20 @@ def generate_title_from_message(content: str) -> str:
     return title
 
 
+SUGGESTED_QUESTIONS_SCHEMA = {
+    "type": "object",
+    "properties": {"questions": {"type": "array", "items": {"type": "string"}}},
+    "required": ["questions"],
+}
+
+
 async def generate_suggested_questions(
     source_summaries: list[str],
     previous_response: str | None = None,
     provider_name: str = "ollama",
     model: str = "llama3.2",
     count: int = 3,
+    notebook_id: str | None = None,
 ) -> list[str]:
     """Generate suggested questions based on sources or previous response."""
     if not source_summaries and not previous_response:
@@ -193,8 +369,7 @@ async def generate_suggested_questions(
 Response:
 {previous_response[:2000]}
 
-Generate exactly {count} questions. Return them as a JSON array of strings.
-Only return the JSON array, nothing else. Example format: ["Question 1?", "Question 2?", "Question 3?"]"""
+Generate exactly {count} questions. Respond with a JSON object of the form {{"questions": ["Question 1?", "Question 2?", "Question 3?"]}}."""
     else:
         # Generate initial questions based on source content
         context = "\n\n".join(s[:500] for s in source_summaries[:5])
@@ -203,30 +378,46 @@ Only return the JSON array, nothing else. Example format: ["Question 1?", "Quest
 Source content:
 {context}
 
-Generate exactly {count} questions that cover different aspects of the content. Return them as a JSON array of strings.
-Only return the JSON array, nothing else. Example format: ["Question 1?", "Question 2?", "Question 3?"]"""
+Generate exactly {count} questions that cover different aspects of the content. Respond with a JSON object of the form {{"questions": ["Question 1?", "Question 2?", "Question 3?"]}}."""
 
     messages = [LLMChatMessage(role="user", content=prompt)]
 
-    try:
-        full_response = ""
-        async for chunk in provider.chat_stream(messages, model):
-            if chunk:
-                full_response += chunk
-
-        # Parse JSON response
-        # Try to find JSON array in the response
-        json_match = re.search(r"\[.*\]", full_response, re.DOTALL)
-        if json_match:
-            questions = json.loads(json_match.group())
-            if isinstance(questions, list):
-                return [str(q) for q in questions[:count]]
+    def parse(data: dict) -> list[str]:
+        questions = text_list(data, "questions")
+        if not questions:
+            raise ValueError("No questions generated")
+        return questions[:count]
 
-        return []
+    try:
+        async with llm_scheduler.slot(provider_name, Priority.SUGGESTIONS, notebook_id):
+            return await generate_validated_json(
+                provider, messages, model, SUGGESTED_QUESTIONS_SCHEMA, parse
+            )
     except Exception:
         return []
 
 
+def schedule_follow_up_questions(
+    message_id: str, response: str, provider_name: str, model: str, notebook_id: str
+) -> bool:
+    """Start generating follow-up questions for an answer in the background.
+
+    Returns False when suggestions are disabled or the job was skipped for load.
+    """
+    if not settings.suggestions_enabled or not response:
+        return False
+    return suggestion_jobs.start(
+        message_id,
+        generate_suggested_questions(
+            source_summaries=[],
+            previous_response=response,
+            provider_name=provider_name,
+            model=settings.suggestions_models.get(provider_name, model),
+            notebook_id=notebook_id,
+        ),
+    )
+
+
 def filter_and_score_sources(
     raw_sources: list[dict],
 ) -> tuple[list[dict], GroundingMetadata]:
@@ -260,60 +451,76 @@ def filter_and_score_sources(
     return filtered_sources, metadata
 
 
-def build_rag_prompt(
-    question: str,
-    sources: list[dict],
-    chat_style: str = "default",
-    response_length: str = "default",
-    custom_instructions: str | None = None,
-    has_relevant_sources: bool = True,
-) -> str:
-    """Build the RAG prompt with sources and style configuration."""
+FORMATTING_INSTRUCTION = """Format your response for readability:
+- Use **bold** for key terms and important concepts
+- Use bullet points or numbered lists when listing multiple items
+- Keep paragraphs concise (2-4 sentences each)
+- Use ### headings to organize distinct topics or sections when the answer covers multiple aspects"""
+
+GROUNDING_RULES = """CRITICAL GROUNDING RULES:
+1. ONLY use information from the provided source documents. Do NOT use prior knowledge or training data.
+2. Every factual claim MUST include a citation [1], [2], etc. referencing the source.
+3. If the sources do not contain information to answer the question, you MUST respond:
+   "I cannot answer this question based on your sources. The documents don't contain information about [topic]."
+4. Do NOT speculate, infer, or extrapolate beyond what is explicitly stated in the sources.
+5. If you are uncertain whether the sources support an answer, err on the side of saying you cannot answer."""
+
+
+def _format_source_text(sources: list[dict]) -> str:
     source_text = ""
     for source in sources:
         idx = source["citation_index"]
         source_text += f'\n[{idx}] From "{source["document_name"]}":\n{source["content"]}\n'
+    return source_text
 
+
+def _style_instruction(chat_style: str, custom_instructions: str | None) -> str:
     if chat_style == "learning_guide":
-        style_instruction = """You are a knowledgeable tutor helping someone learn from these materials.
+        return """You are a knowledgeable tutor helping someone learn from these materials.
 Break down complex concepts into clear explanations. Use analogies and examples when helpful.
 Ask follow-up questions to check understanding when appropriate."""
-    elif chat_style == "custom" and custom_instructions:
-        style_instruction = custom_instructions
-    else:
-        style_instruction = "You are a research assistant answering questions based strictly on the provided documents."
+    if chat_style == "custom" and custom_instructions:
+        return custom_instructions
+    return (
+        "You are a research assistant answering questions based strictly on the provided documents."
+    )
+
 
+def _length_instruction(response_length: str) -> str:
     if response_length == "shorter":
-        length_instruction = (
-            "Keep your response concise and to the point. Aim for 2-3 sentences when possible."
-        )
-    elif response_length == "longer":
-        length_instruction = (
-            "Provide detailed, comprehensive responses. Include relevant context and examples."
-        )
-    else:
-        length_instruction = (
-            "Provide appropriately detailed responses based on the complexity of the question."
-        )
+        return "Keep your response concise and to the point. Aim for 2-3 sentences when possible."
+    if response_length == "longer":
+        return "Provide detailed, comprehensive responses. Include relevant context and examples."
+    return "Provide appropriately detailed responses based on the complexity of the question."
 
-    formatting_instruction = """Format your response for readability:
-- Use **bold** for key terms and important concepts
-- Use bullet points or numbered lists when listing multiple items
-- Keep paragraphs concise (2-4 sentences each)
-- Use ### headings to organize distinct topics or sections when the answer covers multiple aspects"""
 
-    grounding_rules = """CRITICAL GROUNDING RULES:
-1. ONLY use information from the provided source documents. Do NOT use prior knowledge or training data.
-2. Every factual claim MUST include a citation [1], [2], etc. referencing the source.
-3. If the sources do not contain information to answer the question, you MUST respond:
-   "I cannot answer this question based on your sources. The documents don't contain information about [topic]."
-4. Do NOT speculate, infer, or extrapolate beyond what is explicitly stated in the sources.
-5. If you are uncertain whether the sources support an answer, err on the side of saying you cannot answer."""
+def build_rag_instructions(
+    chat_style: str = "default",
+    response_length: str = "default",
+    custom_instructions: str | None = None,
+) -> str:
+    """Build the system prompt for answers grounded in the notebook's sources.
 
-    if not has_relevant_sources:
-        return f"""{style_instruction}
+    It depends only on notebook settings, so it forms a stable prefix that
+    providers can cache across turns and sessions.
+    """
+    return f"""{_style_instruction(chat_style, custom_instructions)}
+
+{_length_instruction(response_length)}
+
+{FORMATTING_INSTRUCTION}
 
-The user asked: "{question}"
+{GROUNDING_RULES}"""
+
+
+def build_rag_prompt(
+    question: str,
+    sources: list[dict],
+    has_relevant_sources: bool = True,
+) -> str:
+    """Build the user turn with the retrieved sources (see :func:`build_rag_instructions`)."""
+    if not has_relevant_sources:
+        return f"""The user asked: "{question}"
 
 You have searched the user's documents but found no relevant information to answer this question.
 
@@ -321,129 +528,917 @@ Respond with a helpful message explaining that you cannot answer based on their
 
 Do NOT attempt to answer using your general knowledge."""
 
-    return f"""{style_instruction}
+    return f"""Use the following source documents to answer the user's question.
+
+Sources:
+{_format_source_text(sources)}
+
+Question: {question}"""
 
-{length_instruction}
 
-{formatting_instruction}
+def build_long_context_prompt(
+    sources: list[dict],
+    chat_style: str = "default",
+    response_length: str = "default",
+    custom_instructions: str | None = None,
+) -> str:
+    """Build a system prompt holding the full notebook text.
 
-{grounding_rules}
+    The prompt does not depend on the question, so it forms a stable prefix
+    that providers can cache across turns; questions follow as user messages.
+    """
+    return f"""{build_rag_instructions(chat_style, response_length, custom_instructions)}
 
-Use the following source documents to answer the user's question.
+The following is the complete content of the user's documents. Use it to answer the user's questions.
 
 Sources:
-{source_text}
+{_format_source_text(sources)}"""
 
-Question: {question}"""
 
+def history_to_llm_messages(history: list[Message] | None) -> list[LLMChatMessage]:
+    """Convert prior turns to LLM messages, marking the last one as a cacheable prefix.
 
-def retrieve_sources(
-    query: str,
+    Each turn extends the previous conversation, so the prefix cached at the
+    end of this request's history is reused by the next turn.
+    """
+    messages = [LLMChatMessage(role=msg.role, content=msg.content) for msg in history or []]
+    if messages:
+        messages[-1].cache = True
+    return messages
+
+
+def build_conversational_prompt(
+    message: str,
+    route: TurnRoute,
+    chat_style: str = "default",
+    response_length: str = "default",
+    custom_instructions: str | None = None,
+) -> str:
+    """Build a prompt for turns answered from the conversation alone."""
+    style_instruction = _style_instruction(chat_style, custom_instructions)
+
+    if route == "meta":
+        return f"""{style_instruction}
+
+{_length_instruction(response_length)}
+
+{FORMATTING_INSTRUCTION}
+
+The user is asking you to change or discuss your previous answer. Apply their request using only information already present in the conversation above. Keep citation markers such as [1] attached to the claims they support, and do not add new factual claims.
+
+Request: {message}"""
+
+    return f"""{style_instruction}
+
+The user sent a conversational message rather than a question about their documents. Reply briefly and naturally. Do not introduce new facts; if they seem to want information, invite them to ask a question about their sources.
+
+Message: {message}"""
+
+
+def _parse_search_results(search_results: dict) -> list[dict]:
+    """Flatten a single-query vector store result into candidate dicts."""
+    if not (search_results and search_results.get("ids") and search_results["ids"][0]):
+        return []
+
+    ids = search_results["ids"][0]
+    documents = search_results.get("documents", [[]])[0]
+    metadatas = search_results.get("metadatas", [[]])[0]
+    distances = search_results.get("distances", [[]])[0]
+    embeddings = search_results.get("embeddings")
+    embeddings = embeddings[0] if embeddings is not None and len(embeddings) else []
+
+    candidates = []
+    for i, chunk_id in enumerate(ids):
+        metadata = metadatas[i] if i < len(metadatas) else {}
+        content = documents[i] if i < len(documents) else ""
+        distance = distances[i] if i < len(distances) else 1.0
+        embedding = embeddings[i] if i < len(embeddings) else None
+        candidates.append(
+            {
+                "chunk_id": chunk_id,
+                "document_id": metadata.get("document_id", ""),
+                "document_name": metadata.get("document_name", ""),
+                "content": content,
+                "relevance_score": round(1.0 - distance, 4),
+                "embedding": embedding,
+                "parent_id": metadata.get("parent_id"),
+            }
+        )
+    return candidates
+
+
+def _collapse_to_parents(candidates: list[dict]) -> list[dict]:
+    """Replace child chunk hits by their parent section, keeping each parent's best hit.
+
+    Parent content is not in the vector store; it is left as None here and
+    filled in by :func:`hydrate_parent_sections`.
+    """
+    collapsed = []
+    seen_parents: set[str] = set()
+    for candidate in candidates:
+        parent_id = candidate.pop("parent_id", None)
+        if parent_id:
+            if parent_id in seen_parents:
+                continue
+            seen_parents.add(parent_id)
+            candidate["chunk_id"] = parent_id
+            candidate["content"] = None
+        collapsed.append(candidate)
+    return collapsed
+
+
+async def hydrate_parent_sections(sources: list[dict]) -> list[dict]:
+    """Load the content of parent sections selected through their children."""
+    missing = [source["chunk_id"] for source in sources if source["content"] is None]
+    if not missing:
+        return sources
+
+    async with async_session() as session:
+        result = await session.execute(select(Chunk.id, Chunk.content).where(Chunk.id.in_(missing)))
+        contents = dict(result.all())
+
+    hydrated = []
+    for source in sources:
+        if source["content"] is None:
+            if source["chunk_id"] not in contents:
+                continue  # Parent deleted since the search
+            source["content"] = contents[source["chunk_id"]]
+        hydrated.append(source)
+    for citation_index, source in enumerate(hydrated, start=1):
+        source["citation_index"] = citation_index
+    return hydrated
+
+
+def _search_candidates(
+    query_embedding: list[float],
     notebook_id: str,
     document_ids: list[str] | None = None,
 ) -> list[dict]:
-    """Retrieve and format sources from vector store."""
-    query_embedding = embed_query(query)
+    """Search the vector store, over-fetching candidates when MMR is enabled.
+
+    Child chunk hits are collapsed into their parent sections.
+    """
+    max_chunks = settings.rag_max_context_chunks
+    use_mmr = settings.rag_mmr_enabled and settings.rag_mmr_fetch_k > max_chunks
+    n_results = settings.rag_mmr_fetch_k if use_mmr else max_chunks
+    if settings.parent_child_chunking:
+        n_results *= CHILD_FETCH_FACTOR
     search_results = search_collection(
         notebook_id=notebook_id,
         query_embedding=query_embedding,
-        n_results=settings.rag_max_context_chunks,
+        n_results=n_results,
         document_ids=document_ids,
+        include_embeddings=use_mmr,
     )
+    return _collapse_to_parents(_parse_search_results(search_results))
+
+
+def _select_sources(
+    query_embedding: list[float],
+    candidates: list[dict],
+    max_chunks: int | None = None,
+) -> list[dict]:
+    """Pick the context chunks from ranked candidates and assign citation indices.
+
+    When MMR is enabled, the over-fetched candidate set is re-ranked so that
+    near-duplicate chunks (e.g. several versions of one document) do not crowd
+    out other evidence.
+    """
+    max_chunks = max_chunks or settings.rag_max_context_chunks
+    order = list(range(min(len(candidates), max_chunks)))
+    if (
+        settings.rag_mmr_enabled
+        and len(candidates) > max_chunks
+        and all(c["embedding"] is not None for c in candidates)
+    ):
+        order = maximal_marginal_relevance(
+            query_embedding,
+            [c["embedding"] for c in candidates],
+            k=max_chunks,
+            lambda_mult=settings.rag_mmr_lambda,
+        )
 
     sources = []
-    if search_results and search_results.get("ids") and search_results["ids"][0]:
-        ids = search_results["ids"][0]
-        documents = search_results.get("documents", [[]])[0]
-        metadatas = search_results.get("metadatas", [[]])[0]
-        distances = search_results.get("distances", [[]])[0]
-
-        for i, chunk_id in enumerate(ids):
-            metadata = metadatas[i] if i < len(metadatas) else {}
-            content = documents[i] if i < len(documents) else ""
-            distance = distances[i] if i < len(distances) else 1.0
-            sources.append(
-                {
-                    "chunk_id": chunk_id,
-                    "document_id": metadata.get("document_id", ""),
-                    "document_name": metadata.get("document_name", ""),
-                    "content": content,
-                    "relevance_score": round(1.0 - distance, 4),
-                    "citation_index": i + 1,
-                }
-            )
+    for citation_index, i in enumerate(order, start=1):
+        source = {key: value for key, value in candidates[i].items() if key != "embedding"}
+        source["citation_index"] = citation_index
+        sources.append(source)
+    return sources
+
+
+def _fuse_candidates(candidate_lists: list[list[dict]]) -> list[dict]:
+    """Merge per-query rankings with reciprocal rank fusion.
+
+    Each chunk keeps its best relevance score across queries.
+    """
+    fused: dict[str, dict] = {}
+    scores: dict[str, float] = {}
+    for candidates in candidate_lists:
+        for rank, candidate in enumerate(candidates):
+            chunk_id = candidate["chunk_id"]
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+            existing = fused.get(chunk_id)
+            if existing is None or candidate["relevance_score"] > existing["relevance_score"]:
+                fused[chunk_id] = candidate
+
+    ranked_ids = sorted(fused, key=lambda chunk_id: scores[chunk_id], reverse=True)
+    return [fused[chunk_id] for chunk_id in ranked_ids]
 
+
+def _centroid(embeddings: list[list[float]]) -> list[float]:
+    return [sum(values) / len(values) for values in zip(*embeddings, strict=True)]
+
+
+def retrieve_sources(
+    query: str,
+    notebook_id: str,
+    document_ids: list[str] | None = None,
+    query_embedding: list[float] | None = None,
+    timings: dict[str, float] | None = None,
+) -> list[dict]:
+    """Retrieve and format sources from vector store.
+
+    Parent sections come back with ``content`` None; pass the result through
+    :func:`hydrate_parent_sections` (as :func:`retrieve_sources_for_queries`
+    does). If a ``timings`` dict is given, per-stage durations in milliseconds are
+    recorded into it (``embed_ms``, ``search_ms``, ``select_ms``).
+    """
+    started = time.perf_counter()
+    if query_embedding is None:
+        query_embedding = embed_query(query)
+    embedded = time.perf_counter()
+    candidates = _search_candidates(query_embedding, notebook_id, document_ids)
+    searched = time.perf_counter()
+    sources = _select_sources(query_embedding, candidates)
+
+    if timings is not None:
+        timings["embed_ms"] = round((embedded - started) * 1000, 2)
+        timings["search_ms"] = round((searched - embedded) * 1000, 2)
+        timings["select_ms"] = round((time.perf_counter() - searched) * 1000, 2)
     return sources
 
 
-async def stream_rag_response(
+async def retrieve_sources_for_queries(
+    queries: list[str],
+    notebook_id: str,
+    document_ids: list[str] | None = None,
+    query_embedding: list[float] | None = None,
+    content_version: int | None = None,
+    timings: dict[str, float] | None = None,
+) -> list[dict]:
+    """Retrieve sources for one or more standalone queries.
+
+    Multiple queries are embedded in a single batch, searched concurrently and
+    fused into one ranking before the final context chunks are selected. A
+    precomputed ``query_embedding`` is only used for a single query. Parent
+    sections matched through child chunks are loaded from the database.
+
+    When the notebook's ``content_version`` is given, results are cached so
+    repeated retrievals (regenerate, edit, identical questions) skip both the
+    embedding and the vector search. Stage durations are recorded into
+    ``timings`` as in :func:`retrieve_sources`.
+    """
+    cache_key = None
+    if content_version is not None:
+        cache_key = (
+            "sources",
+            notebook_id,
+            content_version,
+            tuple(normalize_query(q) for q in queries),
+            tuple(sorted(document_ids)) if document_ids else None,
+            settings.rag_max_context_chunks,
+        )
+        cached = retrieval_cache.get(cache_key)
+        if cached is not None:
+            return [dict(source) for source in cached]
+
+    if len(queries) == 1:
+        sources = await asyncio.to_thread(
+            retrieve_sources, queries[0], notebook_id, document_ids, query_embedding, timings
+        )
+    else:
+        started = time.perf_counter()
+        query_embeddings = await asyncio.to_thread(embed_texts, queries)
+        embedded = time.perf_counter()
+        candidate_lists = await asyncio.gather(
+            *(
+                asyncio.to_thread(_search_candidates, embedding, notebook_id, document_ids)
+                for embedding in query_embeddings
+            )
+        )
+        searched = time.perf_counter()
+        candidates = _fuse_candidates(list(candidate_lists))[: settings.rag_mmr_fetch_k]
+        sources = _select_sources(_centroid(query_embeddings), candidates)
+
+        if timings is not None:
+            timings["embed_ms"] = round((embedded - started) * 1000, 2)
+            timings["search_ms"] = round((searched - embedded) * 1000, 2)
+            timings["select_ms"] = round((time.perf_counter() - searched) * 1000, 2)
+
+    hydrate_started = time.perf_counter()
+    sources = await hydrate_parent_sections(sources)
+    if timings is not None:
+        timings["hydrate_ms"] = round((time.perf_counter() - hydrate_started) * 1000, 2)
+
+    if cache_key is not None:
+        retrieval_cache.put(cache_key, [dict(source) for source in sources])
+    return sources
+
+
+def _search_document(
+    query_embeddings: list[list[float]],
+    notebook_id: str,
+    document_id: str,
+) -> tuple[list[dict], float]:
+    """Search a single document with every query and keep its top relevant chunks.
+
+    Chunks below ``rag_min_relevance_score`` are dropped before the quota is
+    filled, so the answer's relevance filter cannot empty a document's share.
+    """
+    started = time.perf_counter()
+    candidate_lists = [
+        _search_candidates(embedding, notebook_id, [document_id]) for embedding in query_embeddings
+    ]
+    candidates = (
+        candidate_lists[0] if len(candidate_lists) == 1 else _fuse_candidates(candidate_lists)
+    )
+    candidates = [
+        candidate
+        for candidate in candidates
+        if candidate["relevance_score"] >= settings.rag_min_relevance_score
+    ]
+    sources = _select_sources(
+        _centroid(query_embeddings), candidates, max_chunks=settings.rag_per_document_chunks
+    )
+    return sources, round((time.perf_counter() - started) * 1000, 2)
+
+
+def _merge_per_document(per_document: list[list[dict]], max_tokens: int) -> list[dict]:
+    """Interleave per-document rankings round-robin until the token budget is spent.
+
+    Taking each document's best chunk before anyone's second keeps every
+    document represented even when the budget runs out early.
+    """
+    merged: list[dict] = []
+    used_tokens = 0
+    for rank in range(max((len(sources) for sources in per_document), default=0)):
+        for sources in per_document:
+            if rank >= len(sources):
+                continue
+            tokens = count_tokens(sources[rank]["content"])
+            if used_tokens + tokens > max_tokens:
+                continue
+            merged.append(sources[rank])
+            used_tokens += tokens
+
+    for citation_index, source in enumerate(merged, start=1):
+        source["citation_index"] = citation_index
+    return merged
+
+
+async def retrieve_sources_per_document(
+    queries: list[str],
+    notebook_id: str,
+    document_ids: list[str],
+    query_embedding: list[float] | None = None,
+    content_version: int | None = None,
+    timings: dict[str, float] | None = None,
+) -> tuple[list[dict], list[dict]]:
+    """Retrieve a fixed quota of chunks from each document, for comparisons.
+
+    A single global top-k often comes entirely from the one document that best
+    matches the wording of the question. Here every document is searched
+    concurrently and the per-document results are merged under
+    ``rag_per_document_max_tokens``. Stage durations are recorded into
+    ``timings`` as in :func:`retrieve_sources`.
+
+    Returns:
+        The merged sources and a per-document report (chunks kept and search
+        time). The report is empty when the result came from the cache.
+    """
+    cache_key = None
+    if content_version is not None:
+        cache_key = (
+            "per_document",
+            notebook_id,
+            content_version,
+            tuple(normalize_query(q) for q in queries),
+            tuple(sorted(document_ids)),
+            settings.rag_per_document_chunks,
+            settings.rag_per_document_max_tokens,
+        )
+        cached = retrieval_cache.get(cache_key)
+        if cached is not None:
+            return [dict(source) for source in cached], []
+
+    started = time.perf_counter()
+    if query_embedding is not None and len(queries) == 1:
+        query_embeddings = [query_embedding]
+    else:
+        query_embeddings = await asyncio.to_thread(embed_texts, queries)
+    embedded = time.perf_counter()
+
+    results = await asyncio.gather(
+        *(
+            asyncio.to_thread(_search_document, query_embeddings, notebook_id, document_id)
+            for document_id in document_ids
+        )
+    )
+    searched = time.perf_counter()
+    hydrated = await hydrate_parent_sections(
+        [source for document_sources, _ in results for source in document_sources]
+    )
+    if timings is not None:
+        timings["embed_ms"] = round((embedded - started) * 1000, 2)
+        timings["search_ms"] = round((searched - embedded) * 1000, 2)
+        timings["hydrate_ms"] = round((time.perf_counter() - searched) * 1000, 2)
+    per_document_sources = [
+        [source for source in hydrated if source["document_id"] == document_id]
+        for document_id in document_ids
+    ]
+    sources = _merge_per_document(per_document_sources, settings.rag_per_document_max_tokens)
+
+    kept: dict[str, int] = {}
+    for source in sources:
+        kept[source["document_id"]] = kept.get(source["document_id"], 0) + 1
+    report = [
+        {
+            "document_id": document_id,
+            "chunks": kept.get(document_id, 0),
+            "search_ms": search_ms,
+        }
+        for document_id, (_, search_ms) in zip(document_ids, results, strict=True)
+    ]
+
+    if cache_key is not None:
+        retrieval_cache.put(cache_key, [dict(source) for source in sources])
+    return sources, report
+
+
+async def prefetch_retrieval(
     query: str,
     notebook: Notebook,
     session_id: str,
     model: str,
     document_ids: list[str] | None = None,
-    conversation_history: list[Message] | None = None,
+    per_document: bool = False,
+) -> None:
+    """Warm the caches that stream_rag_response would hit for a draft query.
+
+    The query embedding is always warmed. Retrieval is only run for questions
+    that will be searched as typed; follow-ups that need an LLM rewrite are
+    not worth speculating on.
+    """
+    provider = get_provider(notebook.llm_provider)
+    if await load_long_context_sources(notebook, provider, model, document_ids) is not None:
+        return
+
+    query_embedding = await asyncio.to_thread(embed_query, query)
+
+    async with async_session() as session:
+        history = await get_messages(session, session_id)
+    if settings.rag_query_rewrite_enabled and not is_standalone_query(query, history):
+        return
+
+    if per_document and document_ids:
+        await retrieve_sources_per_document(
+            [query], notebook.id, document_ids, query_embedding, notebook.content_version
+        )
+    else:
+        await retrieve_sources_for_queries(
+            [query],
+            notebook.id,
+            document_ids,
+            query_embedding=query_embedding,
+            content_version=notebook.content_version,
+        )
+
+
+def split_for_replay(content: str, size: int = REPLAY_CHUNK_CHARS) -> list[str]:
+    """Split a cached answer into token-like pieces, breaking after whitespace."""
+    pieces = []
+    start = 0
+    while start < len(content):
+        end = min(start + size, len(content))
+        if end < len(content):
+            space = content.rfind(" ", start, end)
+            if space > start:
+                end = space + 1
+        pieces.append(content[start:end])
+        start = end
+    return pieces
+
+
+async def replay_cached_answer(
+    cached: CachedAnswer,
+    session_id: str,
+    model: str,
+    content_version: int,
 ) -> AsyncGenerator[str]:
-    """Stream a RAG response with sources, grounding, and follow-up questions."""
-    try:
-        yield f"data: {json.dumps({'type': 'stage', 'stage': 'searching'})}\n\n"
+    """Replay a cached answer as a regular SSE stream flagged ``cached``."""
+    sources = [dict(source) for source in cached.sources]
+
+    yield sse_event({"type": "stage", "stage": "reading"})
+    yield sse_event({"type": "sources", "sources": sources, "cached": True})
+    yield sse_event({"type": "grounding", "metadata": cached.grounding, "cached": True})
+    yield sse_event({"type": "stage", "stage": "generating"})
+
+    tracker = await create_citation_tracker(sources)
+    for piece in split_for_replay(cached.content):
+        yield sse_event({"type": "token", "content": piece, "cached": True})
+        for citation in tracker.feed(piece):
+            yield sse_event(citation)
+
+    assistant_message = await save_assistant_message(
+        session_id, cached.content, model, content_version, tracker.cited_sources()
+    )
 
-        raw_sources = retrieve_sources(query, notebook.id, document_ids)
-        sources, grounding_metadata = filter_and_score_sources(raw_sources)
+    yield sse_event({"type": "done", "message_id": assistant_message.id, "cached": True})
 
-        yield f"data: {json.dumps({'type': 'stage', 'stage': 'reading'})}\n\n"
-        yield f"data: {json.dumps({'type': 'sources', 'sources': sources})}\n\n"
-        yield f"data: {json.dumps({'type': 'grounding', 'metadata': grounding_metadata.model_dump()})}\n\n"
-        yield f"data: {json.dumps({'type': 'stage', 'stage': 'generating'})}\n\n"
 
-        prompt = build_rag_prompt(
-            query,
-            sources,
-            chat_style=notebook.chat_style,
-            response_length=notebook.response_length,
-            custom_instructions=notebook.custom_instructions,
-            has_relevant_sources=grounding_metadata.has_relevant_sources,
+@dataclass
+class GeneratedAnswer:
+    """What :func:`generate_answer` produced, filled in as it runs."""
+
+    content: str = ""
+    usage: dict[str, int] = field(default_factory=dict)
+    message: Message | None = None
+    cited_sources: list[dict] = field(default_factory=list)
+
+
+async def generate_answer(
+    llm_messages: list[LLMChatMessage],
+    sources: list[dict],
+    notebook: Notebook,
+    session_id: str,
+    model: str,
+    timings: dict[str, float],
+    answer: GeneratedAnswer,
+) -> AsyncGenerator[str]:
+    """Stream an answer from the notebook's provider and save it with its sources.
+
+    Waits for a chat slot (sending ``queue`` events), then sends ``token`` and
+    ``citation`` events. Queue time, TTFT and generation time go into
+    ``timings``. A partial answer is saved as interrupted if the stream is
+    closed early; otherwise ``answer.message`` is set once it is saved.
+    """
+    provider = get_provider(notebook.llm_provider)
+    tracker = await create_citation_tracker(sources)
+    ticket = llm_scheduler.enqueue(notebook.llm_provider, Priority.CHAT, notebook.id)
+    try:
+        queued_at = time.perf_counter()
+        async for position in ticket.positions():
+            yield sse_event({"type": "queue", "position": position})
+        timings["queue_ms"] = round((time.perf_counter() - queued_at) * 1000, 2)
+
+        generate_started = time.perf_counter()
+        async with aclosing(
+            coalesce_tokens(provider.chat_stream(llm_messages, model, answer.usage))
+        ) as chunks:
+            async for chunk in chunks:
+                if not answer.content:
+                    timings["ttft_ms"] = round((time.perf_counter() - generate_started) * 1000, 2)
+                answer.content += chunk
+                yield sse_event({"type": "token", "content": chunk})
+                for citation in tracker.feed(chunk):
+                    yield sse_event(citation)
+    except (asyncio.CancelledError, GeneratorExit):
+        # Client disconnected; the provider stream is closed on the way out
+        persist_interrupted_answer(
+            session_id,
+            answer.content,
+            model,
+            notebook.content_version,
+            tracker.cited_sources(),
+            answer.usage,
+            timings,
         )
+        raise
+    finally:
+        ticket.release()
+    timings["generate_ms"] = round((time.perf_counter() - generate_started) * 1000, 2)
+
+    # Only sources the answer actually cites are kept with the message
+    answer.cited_sources = tracker.cited_sources()
+    answer.message = await save_assistant_message(
+        session_id,
+        answer.content,
+        model,
+        notebook.content_version,
+        answer.cited_sources,
+        usage=answer.usage,
+        timings=timings,
+    )
 
-        llm_messages = [
-            LLMChatMessage(role=msg.role, content=msg.content)
-            for msg in (conversation_history or [])
-        ]
-        llm_messages.append(LLMChatMessage(role="user", content=prompt))
+
+def completion_events(answer: GeneratedAnswer, timings: dict[str, float]) -> list[bytes]:
+    """The ``usage``, ``timings`` and ``done`` events that end an answer stream."""
+    events = []
+    if answer.usage:
+        events.append(sse_event({"type": "usage", "usage": answer.usage}))
+    events.append(sse_event({"type": "timings", "timings": timings}))
+    events.append(sse_event({"type": "done", "message_id": answer.message.id}))
+    return events
+
+
+async def stream_history_only_response(
+    query: str,
+    route: TurnRoute,
+    notebook: Notebook,
+    session_id: str,
+    model: str,
+    conversation_history: list[Message] | None = None,
+    timings: dict[str, float] | None = None,
+) -> AsyncGenerator[str]:
+    """Answer a chit-chat or meta turn from the conversation without retrieval.
+
+    Meta turns (e.g. "make that shorter") carry over the previous answer's
+    citations so the markers in the rewritten answer still resolve.
+    """
+    history = conversation_history or []
+    sources: list[dict] = []
+    if route == "meta":
+        last_answer = next((msg for msg in reversed(history) if msg.role == "assistant"), None)
+        if last_answer is not None:
+            async with async_session() as session:
+                sources = await get_message_source_chunks(session, last_answer.id)
+
+    yield sse_event({"type": "sources", "sources": sources})
+    yield sse_event({"type": "stage", "stage": "generating"})
+
+    prompt = build_conversational_prompt(
+        query,
+        route,
+        chat_style=notebook.chat_style,
+        response_length=notebook.response_length,
+        custom_instructions=notebook.custom_instructions,
+    )
+    llm_messages = history_to_llm_messages(history)
+    llm_messages.append(LLMChatMessage(role="user", content=prompt))
+
+    timings = timings if timings is not None else {}
+    answer = GeneratedAnswer()
+    async with aclosing(
+        generate_answer(llm_messages, sources, notebook, session_id, model, timings, answer)
+    ) as events:
+        async for event in events:
+            yield event
+
+    for event in completion_events(answer, timings):
+        yield event
+
+
+async def stream_rag_response(
+    query: str,
+    notebook: Notebook,
+    session_id: str,
+    model: str,
+    document_ids: list[str] | None = None,
+    conversation_history: list[Message] | None = None,
+    use_answer_cache: bool = True,
+    retrieval_query: str | None = None,
+    reuse_sources: list[dict] | None = None,
+    per_document: bool = False,
+    timings: dict[str, float] | None = None,
+) -> AsyncGenerator[str]:
+    """Stream a RAG response with sources, grounding, and follow-up questions.
+
+    The first question of a session is looked up in the semantic answer cache;
+    a hit is replayed without retrieval or an LLM call. ``retrieval_query``
+    overrides the text used for search when ``query`` carries extra
+    instructions for the model. ``reuse_sources`` (e.g. the citations of a
+    regenerated answer) skips query planning and retrieval altogether; when
+    it is empty, retrieval runs as usual (served from the retrieval cache if
+    the notebook content is unchanged).
+
+    Notebooks small enough to fit the model's context skip retrieval: the full
+    text is sent as a cacheable system prompt and every chunk is citable.
+    Chit-chat and requests to rework the previous answer skip retrieval too
+    (see :func:`classify_turn`). With ``per_document``, each of the given
+    documents contributes its own chunks (see
+    :func:`retrieve_sources_per_document`). An empty ``document_ids`` (filters
+    that matched nothing) gets the grounded no-sources answer.
+
+    Per-stage durations (added to ``timings``, if given) are sent in a
+    ``timings`` event before ``done``, after a ``usage`` event with the
+    token counts reported by the provider (including prompt cache reads and
+    writes). While the provider is busy with other calls, ``queue`` events
+    report the answer's place in line.
+    """
+    retrieval_query = retrieval_query or query
+    timings = timings if timings is not None else {}
+    try:
+        started = time.perf_counter()
+        decision = await classify_turn(retrieval_query, conversation_history)
+        timings["route_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        if decision.route != "retrieve":
+            retrieval_prefetcher.cancel(session_id)
+            async with aclosing(
+                stream_history_only_response(
+                    query,
+                    decision.route,
+                    notebook,
+                    session_id,
+                    model,
+                    conversation_history,
+                    timings=timings,
+                )
+            ) as events:
+                async for event in events:
+                    yield event
+            return
+
+        # A prefetch for this exact draft may still be running; its results
+        # land in the caches used below
+        started = time.perf_counter()
+        await retrieval_prefetcher.wait(
+            session_id,
+            prefetch_key(retrieval_query, document_ids, per_document),
+            settings.prefetch_wait_timeout,
+        )
+        timings["prefetch_wait_ms"] = round((time.perf_counter() - started) * 1000, 2)
 
         provider = get_provider(notebook.llm_provider)
-        full_response = ""
-        async for chunk in provider.chat_stream(llm_messages, model):
-            if chunk:
-                full_response += chunk
-                yield f"data: {json.dumps({'type': 'token', 'content': chunk})}\n\n"
-
-        async with async_session() as save_session:
-            assistant_message = await create_message(
-                save_session, session_id, "assistant", full_response, model
+        yield sse_event({"type": "stage", "stage": "searching"})
+
+        cache_key = None
+        query_embedding = decision.query_embedding
+        if (
+            use_answer_cache
+            and settings.answer_cache_enabled
+            and not conversation_history
+            and document_ids != []
+        ):
+            cache_key = make_cache_key(
+                notebook.id,
+                notebook.content_version,
+                notebook.llm_provider,
+                model,
+                notebook.chat_style,
+                notebook.response_length,
+                notebook.custom_instructions,
+                document_ids,
+                per_document,
+            )
+            if query_embedding is None:
+                query_embedding = await asyncio.to_thread(embed_query, retrieval_query)
+            cached = answer_cache.get(cache_key, query_embedding)
+            if cached:
+                async with aclosing(
+                    replay_cached_answer(cached, session_id, model, notebook.content_version)
+                ) as events:
+                    async for event in events:
+                        yield event
+                return
+
+        full_sources = None
+        if document_ids != []:
+            full_sources = await load_long_context_sources(notebook, provider, model, document_ids)
+        if document_ids == []:
+            # Filters matched no documents: answer from no sources, not from all of them
+            raw_sources = []
+        elif full_sources is not None:
+            raw_sources = full_sources
+        elif reuse_sources:
+            raw_sources = [dict(source) for source in reuse_sources]
+        else:
+            started = time.perf_counter()
+            queries = await plan_queries(
+                retrieval_query, conversation_history, notebook.llm_provider, model, notebook.id
             )
-            for source in sources:
-                await add_message_source(
-                    save_session,
-                    assistant_message.id,
-                    source["chunk_id"],
-                    source["relevance_score"],
-                    source["citation_index"],
+            timings["plan_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            if queries != [retrieval_query]:
+                yield sse_event({"type": "queries", "queries": queries})
+
+            planned_embedding = query_embedding if queries == [retrieval_query] else None
+            if per_document and document_ids:
+                raw_sources, document_report = await retrieve_sources_per_document(
+                    queries,
+                    notebook.id,
+                    document_ids,
+                    query_embedding=planned_embedding,
+                    content_version=notebook.content_version,
+                    timings=timings,
                 )
+                if document_report:
+                    yield sse_event(
+                        {"type": "retrieval", "mode": "per_document", "documents": document_report}
+                    )
+            else:
+                raw_sources = await retrieve_sources_for_queries(
+                    queries,
+                    notebook.id,
+                    document_ids,
+                    query_embedding=planned_embedding,
+                    content_version=notebook.content_version,
+                    timings=timings,
+                )
+        sources, grounding_metadata = filter_and_score_sources(raw_sources)
+
+        yield sse_event({"type": "stage", "stage": "reading"})
+        # In long-context mode every chunk of the notebook is a source; clients
+        # get just the cited ones, from the citation events
+        yield sse_event({"type": "sources", "sources": sources if full_sources is None else []})
+        yield sse_event({"type": "grounding", "metadata": grounding_metadata.model_dump()})
+        yield sse_event({"type": "stage", "stage": "generating"})
+
+        llm_messages = []
+        if full_sources is not None:
+            system_prompt = build_long_context_prompt(
+                sources,
+                chat_style=notebook.chat_style,
+                response_length=notebook.response_length,
+                custom_instructions=notebook.custom_instructions,
+            )
+            llm_messages.append(LLMChatMessage(role="system", content=system_prompt, cache=True))
+            prompt = query
+        else:
+            system_prompt = build_rag_instructions(
+                chat_style=notebook.chat_style,
+                response_length=notebook.response_length,
+                custom_instructions=notebook.custom_instructions,
+            )
+            llm_messages.append(LLMChatMessage(role="system", content=system_prompt, cache=True))
+            prompt = build_rag_prompt(
+                query,
+                sources,
+                has_relevant_sources=grounding_metadata.has_relevant_sources,
+            )
 
-        yield f"data: {json.dumps({'type': 'done', 'message_id': assistant_message.id})}\n\n"
+        llm_messages.extend(history_to_llm_messages(conversation_history))
+        llm_messages.append(LLMChatMessage(role="user", content=prompt))
 
-        try:
-            questions = await generate_suggested_questions(
-                source_summaries=[],
-                previous_response=full_response,
-                provider_name=notebook.llm_provider,
-                model=model,
+        answer = GeneratedAnswer()
+        async with aclosing(
+            generate_answer(llm_messages, sources, notebook, session_id, model, timings, answer)
+        ) as events:
+            async for event in events:
+                yield event
+
+        if cache_key is not None and answer.content:
+            answer_cache.put(
+                cache_key,
+                query_embedding,
+                CachedAnswer(
+                    content=answer.content,
+                    sources=[
+                        dict(source)
+                        for source in (sources if full_sources is None else answer.cited_sources)
+                    ],
+                    grounding=grounding_metadata.model_dump(),
+                ),
             )
-            if questions:
-                yield f"data: {json.dumps({'type': 'suggestions', 'questions': questions})}\n\n"
-        except Exception:
-            pass
 
+        # Fetched separately via /messages/{id}/suggested-questions
+        schedule_follow_up_questions(
+            answer.message.id, answer.content, notebook.llm_provider, model, notebook.id
+        )
+
+        for event in completion_events(answer, timings):
+            yield event
+
+    except Exception as e:
+        yield sse_event({"type": "error", "error": str(e)})
+
+
+async def stream_chat_turn(
+    query: str,
+    chat_session: ChatSession,
+    notebook: Notebook,
+    model: str,
+    document_ids: list[str] | None = None,
+    per_document: bool = False,
+    timings: dict[str, float] | None = None,
+) -> AsyncGenerator[str]:
+    """Record a new user message and stream the answer.
+
+    The user message, session title and history are written and read in a
+    single transaction. The turn is then routed; only a turn that needs
+    retrieval waits for the session's draft prefetch (``prefetch_wait_ms``),
+    whose results the retrieval stages pick up from the caches.
+    """
+    timings = timings if timings is not None else {}
+    started = time.perf_counter()
+    try:
+        title = None if chat_session.title else generate_title_from_message(query)
+        history = await record_user_message(chat_session.id, query, title)
     except Exception as e:
-        yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+        yield sse_event({"type": "error", "error": str(e)})
+        return
+    timings["persist_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    # Closing this stream (client disconnect) closes the answer stream with it
+    async with aclosing(
+        stream_rag_response(
+            query=query,
+            notebook=notebook,
+            session_id=chat_session.id,
+            model=model,
+            document_ids=document_ids,
+            conversation_history=history,
+            per_document=per_document,
+            timings=timings,
+        )
+    ) as events:
+        async for event in events:
+            yield event
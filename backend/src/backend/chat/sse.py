@@ -0,0 +1,113 @@
+"""Server-sent event framing for chat streams."""
+
+import asyncio
+import time
+from collections.abc import AsyncIterable, AsyncIterator
+
+import orjson
+from fastapi.responses import StreamingResponse
+from starlette.types import Send
+
+from src.backend.config import settings
+
+# Provider streams being closed after their consumer went away
+_closing: set[asyncio.Task] = set()
+
+
+def sse_event(payload: dict) -> bytes:
+    """Encode one SSE ``data:`` frame."""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+async def coalesce_tokens(
+    chunks: AsyncIterable[str],
+    max_delay_ms: int | None = None,
+    max_bytes: int | None = None,
+) -> AsyncIterator[str]:
+    """Merge streamed text into fewer, larger pieces.
+
+    The first chunk is released immediately so time to first token is
+    unchanged. After that, text is held until ``max_bytes`` are buffered or
+    ``max_delay_ms`` have passed since the oldest buffered chunk, whichever
+    comes first; the delay is enforced even while the provider is silent.
+    Everything buffered is released when the stream ends, so the caller can
+    flush stage changes right after the loop.
+
+    If this generator is closed or cancelled early, the source stream is
+    closed too (ending the provider's HTTP response).
+    """
+    max_delay_ms = settings.sse_coalesce_ms if max_delay_ms is None else max_delay_ms
+    max_bytes = settings.sse_coalesce_max_bytes if max_bytes is None else max_bytes
+    iterator = aiter(chunks)
+
+    buffer: list[str] = []
+    buffered_bytes = 0
+    deadline: float | None = None
+    first = True
+    pending: asyncio.Future | None = None
+    exhausted = False
+    try:
+        if max_delay_ms <= 0:
+            async for chunk in iterator:
+                if chunk:
+                    yield chunk
+            exhausted = True
+            return
+
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(iterator))
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                # Window elapsed while waiting for the provider
+                yield "".join(buffer)
+                buffer, buffered_bytes, deadline = [], 0, None
+                continue
+
+            next_chunk, pending = pending, None
+            try:
+                chunk = next_chunk.result()
+            except StopAsyncIteration:
+                exhausted = True
+                break
+            if not chunk:
+                continue
+
+            buffer.append(chunk)
+            buffered_bytes += len(chunk.encode())
+            if first or buffered_bytes >= max_bytes:
+                first = False
+                yield "".join(buffer)
+                buffer, buffered_bytes, deadline = [], 0, None
+            elif deadline is None:
+                deadline = time.monotonic() + max_delay_ms / 1000
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        # Nothing is awaited here: this runs while the stream is being cancelled
+        # or closed, so the source is shut down by a task of its own
+        if pending is not None and not pending.done():
+            pending.cancel()
+        elif not exhausted and hasattr(iterator, "aclose"):
+            task = asyncio.ensure_future(iterator.aclose())
+            _closing.add(task)
+            task.add_done_callback(_closing.discard)
+
+
+class EventStreamResponse(StreamingResponse):
+    """A StreamingResponse that closes its event generator when streaming stops.
+
+    On client disconnect StreamingResponse stops iterating but may leave the
+    generator suspended until garbage collection. Closing it right away lets
+    chat streams stop the provider and save the partial answer promptly.
+    """
+
+    async def stream_response(self, send: Send) -> None:
+        try:
+            await super().stream_response(send)
+        finally:
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
@@ -0,0 +1,151 @@
+"""Chat generations decoupled from the HTTP connection that started them.
+
+Each generation runs as a task that appends its SSE frames to a bounded,
+numbered in-memory log. Clients read the log and may reconnect with
+``Last-Event-ID`` to receive the frames they missed. A generation nobody is
+reading is cancelled after a grace period (saving the partial answer).
+"""
+
+import asyncio
+import itertools
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from uuid import uuid4
+
+from src.backend.chat.sse import sse_event
+from src.backend.config import settings
+
+
+class GenerationStream:
+    """One generation's event log and the task producing it."""
+
+    def __init__(self, session_id: str, max_events: int):
+        self.id = str(uuid4())
+        self.session_id = session_id
+        self.finished = False
+        self.task: asyncio.Task | None = None
+        self._events: deque[tuple[int, bytes]] = deque(maxlen=max_events)
+        self._next_seq = 1
+        self._changed = asyncio.Event()
+        self._readers = 0
+        self._grace_timer: asyncio.TimerHandle | None = None
+
+    def append(self, frame: bytes) -> None:
+        """Number a ``data:`` frame and wake up readers."""
+        seq = self._next_seq
+        self._next_seq += 1
+        self._events.append((seq, b"id: %s:%d\n" % (self.id.encode(), seq) + frame))
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def finish(self) -> None:
+        self.finished = True
+        self._cancel_grace_timer()
+        self._changed.set()
+
+    def cancel(self) -> None:
+        """Stop the generation (its partial answer is saved as interrupted)."""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    async def read(self, after: int = 0) -> AsyncIterator[bytes]:
+        """Yield frames with a sequence number above ``after``, then follow the log."""
+        self._readers += 1
+        self._cancel_grace_timer()
+        try:
+            if self._events and after + 1 < self._events[0][0]:
+                # Frames after ``after`` were dropped from the bounded log
+                yield sse_event({"type": "error", "error": "Stream can no longer be resumed"})
+                return
+            while True:
+                changed = self._changed
+                start = after + 1 - self._events[0][0] if self._events else 0
+                for seq, frame in list(itertools.islice(self._events, max(start, 0), None)):
+                    after = seq
+                    yield frame
+                if self.finished:
+                    return
+                await changed.wait()
+        finally:
+            self._readers -= 1
+            if self._readers == 0 and not self.finished:
+                self._start_grace_timer()
+
+    def _start_grace_timer(self) -> None:
+        self._cancel_grace_timer()
+        self._grace_timer = asyncio.get_running_loop().call_later(
+            settings.stream_resume_grace_seconds, self.cancel
+        )
+
+    def _cancel_grace_timer(self) -> None:
+        if self._grace_timer is not None:
+            self._grace_timer.cancel()
+            self._grace_timer = None
+
+
+class GenerationRegistry:
+    """At most one running generation per chat session, looked up by stream ID.
+
+    Finished streams stay available for ``retention_seconds`` so a client that
+    lost the connection near the end can still read the last frames.
+    """
+
+    def __init__(self, max_events: int, retention_seconds: float):
+        self.max_events = max_events
+        self.retention_seconds = retention_seconds
+        self._streams: dict[str, GenerationStream] = {}
+        self._by_session: dict[str, GenerationStream] = {}
+
+    def start(self, session_id: str, events: AsyncIterator[bytes]) -> GenerationStream:
+        """Run ``events`` in the background, replacing the session's running generation."""
+        previous = self._by_session.get(session_id)
+        if previous is not None:
+            previous.cancel()
+
+        stream = GenerationStream(session_id, self.max_events)
+        stream.append(sse_event({"type": "stream", "stream_id": stream.id}))
+        self._streams[stream.id] = stream
+        self._by_session[session_id] = stream
+        stream.task = asyncio.create_task(self._run(stream, events))
+        return stream
+
+    def get(self, stream_id: str) -> GenerationStream | None:
+        return self._streams.get(stream_id)
+
+    async def _run(self, stream: GenerationStream, events: AsyncIterator[bytes]) -> None:
+        try:
+            async with aclosing(events) as frames:
+                async for frame in frames:
+                    stream.append(frame)
+        except asyncio.CancelledError:
+            stream.append(sse_event({"type": "error", "error": "Generation cancelled"}))
+        except Exception as e:
+            stream.append(sse_event({"type": "error", "error": str(e)}))
+        finally:
+            stream.finish()
+            if self._by_session.get(stream.session_id) is stream:
+                del self._by_session[stream.session_id]
+            asyncio.get_running_loop().call_later(
+                self.retention_seconds, self._streams.pop, stream.id, None
+            )
+
+
+def parse_last_event_id(value: str | None, stream_id: str) -> int:
+    """Sequence number from a ``Last-Event-ID`` of the form ``<stream id>:<seq>``.
+
+    An ID from another stream (e.g. the previous generation in the same tab)
+    means nothing of this one was received, so it replays from the start.
+    """
+    if not value:
+        return 0
+    prefix, _, seq = value.rpartition(":")
+    if prefix != stream_id or not seq.isdigit():
+        return 0
+    return int(seq)
+
+
+generations = GenerationRegistry(
+    max_events=settings.stream_event_log_max_events,
+    retention_seconds=settings.stream_retention_seconds,
+)
@@ -0,0 +1,66 @@
+"""Suggested questions generated in the background, outside of chat streams."""
+
+import asyncio
+from collections.abc import Coroutine, Hashable
+
+from src.backend.cache import LRUCache
+from src.backend.config import settings
+
+
+class SuggestionJobs:
+    """One background generation per key, with results cached after completion.
+
+    Keys are a message ID for follow-up questions, or the notebook and content
+    version for a notebook's initial questions. When ``max_in_flight`` jobs are
+    already running, new jobs are skipped rather than queued.
+    """
+
+    def __init__(self, max_in_flight: int, max_entries: int, ttl_seconds: float):
+        self.max_in_flight = max_in_flight
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+        self._results: LRUCache[Hashable, list[str]] = LRUCache(max_entries, ttl_seconds)
+
+    def start(self, key: Hashable, coro: Coroutine) -> bool:
+        """Run ``coro`` for ``key`` unless its result is cached or already pending.
+
+        Returns False (and discards ``coro``) when the job is skipped for load.
+        """
+        if self._results.get(key) is not None or key in self._tasks:
+            coro.close()
+            return True
+        if len(self._tasks) >= self.max_in_flight:
+            coro.close()
+            return False
+
+        task = asyncio.create_task(coro)
+        self._tasks[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return True
+
+    async def get(self, key: Hashable, timeout: float) -> list[str] | None:
+        """Return the questions for ``key``, waiting up to ``timeout`` for a pending job."""
+        cached = self._results.get(key)
+        if cached is not None:
+            return cached
+        task = self._tasks.get(key)
+        if task is None:
+            return None
+        # Neither raises on timeout nor cancels the job
+        await asyncio.wait({task}, timeout=timeout)
+        return self._results.get(key)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        self._tasks.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        # An empty list is also what a failed generation returns; the next
+        # request tries again instead of getting nothing for the whole TTL
+        if task.result():
+            self._results.put(key, task.result())
+
+
+suggestion_jobs = SuggestionJobs(
+    max_in_flight=settings.suggestions_max_in_flight,
+    max_entries=settings.suggestions_cache_max_entries,
+    ttl_seconds=settings.retrieval_cache_ttl_seconds,
+)
@@ -0,0 +1,132 @@
+"""Turn routing: answer chit-chat and edits of the previous answer without retrieval."""
+
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from typing import Literal
+
+import numpy as np
+
+from src.backend.config import settings
+from src.backend.embedding.service import embed_query, embed_texts
+from src.backend.models import Message
+
+logger = logging.getLogger(__name__)
+
+TurnRoute = Literal["retrieve", "chit_chat", "meta"]
+
+_CHIT_CHAT_PHRASE = (
+    r"(hi|hello|hey|yo|thanks|thank you|thx|ty|cheers|ok|okay|k|cool|great|nice|awesome|"
+    r"perfect|got it|makes sense|understood|good (morning|afternoon|evening)|bye|goodbye|"
+    r"see you|you're welcome|no problem|lol|haha)( (so much|a lot|again|there))?"
+)
+CHIT_CHAT_PATTERN = re.compile(
+    rf"^\s*{_CHIT_CHAT_PHRASE}([\s!.,:)]+{_CHIT_CHAT_PHRASE})*[\s!.,:)]*$",
+    re.IGNORECASE,
+)
+# Requests to transform the previous answer rather than to find new information
+META_PATTERN = re.compile(
+    r"^\s*((please|pls|can you|could you|would you|now) )*("
+    r"make (it|that|this|the answer) (shorter|longer|simpler|clearer|more \w+)|"
+    r"(shorten|simplify|rephrase|reword|rewrite|summari[sz]e|condense|expand on) "
+    r"(it|that|this|your (answer|response))|"
+    r"(say|explain) (it|that|this) (again|more simply|differently|in simpler terms)|"
+    r"translate (it|that|this)|"
+    r"(put|format|turn) (it|that|this) (in|into|as) |"
+    r"(in|as) (a )?(bullet points|bullets|a table|a list|one sentence|one paragraph)|"
+    r"tl;?dr"
+    r")",
+    re.IGNORECASE,
+)
+# A new information need tacked onto an edit request ("shorter, and what about X?")
+NEW_QUESTION_PATTERN = re.compile(r"\b(what|who|when|where|which|why|how)\b[^?]*\?", re.IGNORECASE)
+
+# Prototype phrases for the embedding check; heuristics catch the exact forms
+PROTOTYPES: dict[TurnRoute, list[str]] = {
+    "chit_chat": [
+        "thanks, that was helpful",
+        "hello, how are you?",
+        "great, thank you very much",
+        "okay, got it",
+        "that's interesting",
+        "goodbye",
+    ],
+    "meta": [
+        "make that shorter",
+        "can you rephrase your answer?",
+        "explain that in simpler terms",
+        "give me the answer as bullet points",
+        "summarize what you just said",
+        "translate your answer to Spanish",
+    ],
+}
+
+_prototype_matrix: np.ndarray | None = None
+_prototype_routes: list[TurnRoute] = []
+
+
+@dataclass
+class TurnDecision:
+    route: TurnRoute
+    reason: str  # "heuristic", "prototype", "default", or "disabled"
+    score: float | None = None  # Best prototype similarity, when computed
+    query_embedding: list[float] | None = None  # Reusable for retrieval and caching
+
+
+def _prototypes() -> tuple[np.ndarray, list[TurnRoute]]:
+    """Embed the prototype phrases once and keep them as a normalized matrix."""
+    global _prototype_matrix, _prototype_routes
+    if _prototype_matrix is None:
+        routes = [route for route, phrases in PROTOTYPES.items() for _ in phrases]
+        phrases = [phrase for items in PROTOTYPES.values() for phrase in items]
+        matrix = np.asarray(embed_texts(phrases), dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        _prototype_matrix, _prototype_routes = matrix, routes
+    return _prototype_matrix, _prototype_routes
+
+
+def _classify(query: str, history: list[Message] | None) -> TurnDecision:
+    has_previous_answer = any(msg.role == "assistant" for msg in history or [])
+
+    if CHIT_CHAT_PATTERN.match(query):
+        return TurnDecision("chit_chat", "heuristic")
+    if has_previous_answer and META_PATTERN.match(query) and not NEW_QUESTION_PATTERN.search(query):
+        return TurnDecision("meta", "heuristic")
+    if len(query.split()) > settings.rag_turn_router_max_words:
+        return TurnDecision("retrieve", "default")
+
+    query_embedding = embed_query(query)
+    matrix, routes = _prototypes()
+    vector = np.asarray(query_embedding, dtype=np.float32)
+    similarities = matrix @ (vector / (np.linalg.norm(vector) or 1.0))
+    best = int(np.argmax(similarities))
+    score = float(similarities[best])
+    route = routes[best]
+
+    if score >= settings.rag_turn_router_threshold and (route != "meta" or has_previous_answer):
+        return TurnDecision(route, "prototype", score, query_embedding)
+    return TurnDecision("retrieve", "default", score, query_embedding)
+
+
+async def classify_turn(query: str, history: list[Message] | None) -> TurnDecision:
+    """Decide whether a user turn needs retrieval.
+
+    Regex heuristics handle greetings, thanks and explicit edit requests for
+    free. Short messages that match neither are compared against embedded
+    prototype phrases; anything long or uncertain is routed to retrieval.
+    Every decision is logged so thresholds can be tuned from real traffic.
+    """
+    if not settings.rag_turn_router_enabled:
+        return TurnDecision("retrieve", "disabled")
+
+    decision = await asyncio.to_thread(_classify, query, history)
+    logger.info(
+        "turn route=%s reason=%s score=%s words=%d query=%r",
+        decision.route,
+        decision.reason,
+        f"{decision.score:.3f}" if decision.score is not None else "-",
+        len(query.split()),
+        query[:100],
+    )
+    return decision
@@ -10,18 +10,38 @@ class Settings(BaseSettings):
     # CORS
     cors_origins: str = "http://localhost:3000"
 
+    # Logging
+    log_level: str = "INFO"  # Level of the application's own (src.backend) loggers
+
     # Ollama
     ollama_base_url: str = "http://localhost:11434"
     ollama_timeout: int = 300
+    ollama_num_ctx: int = 8192  # Context window requested for chat (tokens)
+    ollama_keep_alive: str = "30m"  # Keep models (and their prompt cache) loaded between turns
+    ollama_max_concurrency: int = 2  # Calls sent to the Ollama server at once
     default_llm_model: str = "llama3.2"
 
     # Anthropic (Claude)
     anthropic_api_key: str | None = None
     anthropic_default_model: str = "claude-sonnet-4-20250514"
+    anthropic_max_concurrency: int = 8
 
     # OpenAI
     openai_api_key: str | None = None
     openai_default_model: str = "gpt-4o"
+    openai_max_concurrency: int = 8
+
+    # Pooled HTTP clients for LLM providers
+    http_connect_timeout_seconds: float = 10.0
+    http_keepalive_expiry_seconds: float = 300.0  # Idle connections are kept this long
+
+    # LLM call scheduling (chat first, then suggestions, then background jobs)
+    llm_default_max_concurrency: int = 4  # Providers without their own limit
+    llm_max_queued_requests: int = 32  # Chat requests beyond this get 429 Too Many Requests
+    llm_max_queued_background_requests: int = 32  # Same for summaries, mind maps, source guides
+    llm_expected_call_seconds: float = 10.0  # Initial call duration estimate for Retry-After
+    llm_json_timeout_seconds: float = 120.0  # Per call; a hung call would hold a provider slot
+    llm_json_max_attempts: int = 3  # Calls per structured (JSON) generation before giving up
 
     # Storage
     chroma_persist_directory: str = "./data/chroma"
@@ -33,10 +53,16 @@ class Settings(BaseSettings):
     # Chunking
     chunk_size: int = 512
     chunk_overlap: int = 50
+    # Parent-child indexing: embed small child chunks, answer with their parent sections
+    parent_child_chunking: bool = True
+    parent_chunk_size: int = 768
+    child_chunk_size: int = 128
+    child_chunk_overlap: int = 20
 
     # Limits
     max_upload_size_mb: int = 50
     max_sources_per_notebook: int = 50
+    max_search_batch_queries: int = 256
 
     # Source extraction
     url_extraction_timeout: int = 30
@@ -53,6 +79,64 @@ class Settings(BaseSettings):
     rag_min_relevance_score: float = 0.35  # Minimum score to include a chunk
     rag_high_relevance_threshold: float = 0.6  # Score indicating strong relevance
     rag_max_context_chunks: int = 5  # Maximum chunks to include in context
+    rag_mmr_enabled: bool = True  # Diversify context chunks with maximal marginal relevance
+    rag_mmr_fetch_k: int = 20  # Candidates fetched from the vector store before MMR
+    rag_mmr_lambda: float = 0.7  # 1.0 = pure relevance, 0.0 = pure diversity
+
+    # Long-context mode: send the whole notebook instead of retrieved chunks when it fits
+    rag_long_context_enabled: bool = True
+    rag_long_context_max_tokens: int = 24000  # Upper bound on notebook tokens sent per turn
+    rag_long_context_window_ratio: float = 0.5  # Share of the model context the notebook may use
+
+    # Per-document retrieval (comparison questions across several documents)
+    rag_per_document_chunks: int = 3  # Chunks kept from each document
+    rag_per_document_max_tokens: int = 6000  # Token budget for the merged context
+
+    # Turn routing: answer chit-chat and edits of the last answer without retrieval
+    rag_turn_router_enabled: bool = True
+    rag_turn_router_threshold: float = 0.88  # Prototype similarity needed to skip retrieval
+    rag_turn_router_max_words: int = 12  # Longer messages always go to retrieval
+
+    # Query planning (rewrite follow-ups into standalone search queries)
+    rag_query_rewrite_enabled: bool = True
+    # Fast model per provider, e.g. {"ollama": "llama3.2:1b"}; defaults to the chat model
+    rag_query_rewrite_models: dict[str, str] = {}
+    rag_query_rewrite_timeout: float = 3.0  # Seconds before falling back to the raw query
+    rag_query_rewrite_max_queries: int = 3
+    rag_query_rewrite_history_turns: int = 4
+
+    # Semantic answer cache (first question of a session only)
+    answer_cache_enabled: bool = True
+    answer_cache_similarity_threshold: float = 0.95  # Cosine similarity between queries
+    answer_cache_ttl_seconds: int = 3600
+    answer_cache_max_entries: int = 512
+
+    # Retrieval result cache, keyed by notebook content version
+    retrieval_cache_max_entries: int = 1024
+    retrieval_cache_ttl_seconds: int = 3600
+    query_embedding_cache_max_entries: int = 2048
+
+    # Speculative retrieval prefetch while the user is typing
+    prefetch_enabled: bool = True
+    prefetch_min_interval_ms: int = 300  # Per-session minimum gap between prefetches
+    prefetch_wait_timeout: float = 2.0  # Max seconds a send waits for a matching prefetch
+
+    # Chat streaming: merge tokens into fewer SSE frames (0 ms disables)
+    sse_coalesce_ms: int = 25
+    sse_coalesce_max_bytes: int = 256
+
+    # Resumable chat streams (generation continues while the client reconnects)
+    stream_event_log_max_events: int = 4096  # Frames kept per generation for replay
+    stream_resume_grace_seconds: float = 15.0  # Unread generations are cancelled after this
+    stream_retention_seconds: float = 60.0  # Finished streams stay resumable this long
+
+    # Suggested questions, generated in the background outside of chat streams
+    suggestions_enabled: bool = True
+    # Cheaper model per provider, e.g. {"openai": "gpt-4o-mini"}; defaults to the chat model
+    suggestions_models: dict[str, str] = {}
+    suggestions_max_in_flight: int = 4  # Further jobs are skipped while this many run
+    suggestions_wait_timeout: float = 20.0  # Max seconds a request waits for a pending job
+    suggestions_cache_max_entries: int = 1024
 
     # App
     app_version: str = "0.1.0"
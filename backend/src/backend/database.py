@@ -78,6 +78,28 @@ async def run_migrations() -> None:
         ("notebook", "custom_instructions", "TEXT"),
         ("notebook", "llm_provider", "VARCHAR DEFAULT 'ollama'"),
         ("notebook", "llm_model", "VARCHAR DEFAULT 'llama3.2'"),
+        # Content version for cache invalidation
+        ("notebook", "content_version", "INTEGER DEFAULT 0"),
+        ("message", "content_version", "INTEGER"),
+        ("message", "interrupted", "BOOLEAN DEFAULT 0"),
+        # Per-answer token usage and latency
+        ("message", "prompt_tokens", "INTEGER"),
+        ("message", "completion_tokens", "INTEGER"),
+        ("message", "ttft_ms", "FLOAT"),
+        ("message", "generation_ms", "FLOAT"),
+        ("message", "retrieval_ms", "FLOAT"),
+        # Parent-child chunk indexing
+        ("chunk", "parent_id", "VARCHAR REFERENCES chunk(id)"),
+    ]
+
+    # Indexes on migrated columns (create_all only indexes new tables) and for
+    # the document filters applied before vector search
+    indexes = [
+        ("ix_chunk_parent_id", "chunk", "parent_id"),
+        ("ix_document_notebook_source_type", "document", "notebook_id, source_type"),
+        ("ix_document_notebook_file_type", "document", "notebook_id, file_type"),
+        ("ix_document_notebook_created_at", "document", "notebook_id, created_at"),
+        ("ix_document_notebook_page_count", "document", "notebook_id, page_count"),
     ]
 
     async with engine.begin() as conn:
@@ -85,6 +107,8 @@ async def run_migrations() -> None:
             # Skip if column already exists
             with contextlib.suppress(Exception):
                 await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_def}"))
+        for name, table, column in indexes:
+            await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})"))
 
 
 async def get_session() -> AsyncGenerator[AsyncSession]:
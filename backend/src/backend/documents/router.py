@@ -1,12 +1,18 @@
+import asyncio
 from pathlib import Path
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, status
 from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.backend.cache import normalize_query, retrieval_cache
+from src.backend.config import settings
 from src.backend.database import async_session, get_session
 from src.backend.documents import service
 from src.backend.documents.schemas import (
+    BatchSearchRequest,
+    BatchSearchResponse,
+    BatchSearchResult,
     ChunkListResponse,
     ChunkResponse,
     DocumentListResponse,
@@ -15,8 +21,12 @@ from src.backend.documents.schemas import (
     SearchResponse,
     SearchResult,
 )
-from src.backend.embedding.service import embed_query
-from src.backend.embedding.vectorstore import search_collection
+from src.backend.embedding.service import embed_query, embed_texts
+from src.backend.embedding.vectorstore import (
+    CHILD_FETCH_FACTOR,
+    search_collection,
+    search_collection_batch,
+)
 from src.backend.notebooks.service import get_notebook
 from src.backend.processing.service import process_document
 
@@ -43,6 +53,83 @@ def document_to_response(doc: service.Document) -> DocumentResponse:
     )
 
 
+def to_search_results(
+    results: dict, query_index: int = 0, limit: int | None = None
+) -> list[SearchResult]:
+    """Convert one query's matches from a Chroma result to search results.
+
+    Child chunk matches are collapsed into their parent section, keeping each
+    parent's best match. The section text is filled in by
+    :func:`with_section_text`.
+    """
+    if not results or not results.get("ids") or not results["ids"][query_index]:
+        return []
+
+    ids = results["ids"][query_index]
+    documents = results.get("documents", [[]])[query_index]
+    metadatas = results.get("metadatas", [[]])[query_index]
+    distances = results.get("distances", [[]])[query_index]
+
+    search_results: list[SearchResult] = []
+    seen_parents: set[str] = set()
+    for i, chunk_id in enumerate(ids):
+        if limit is not None and len(search_results) >= limit:
+            break
+        metadata = metadatas[i] if i < len(metadatas) else {}
+        parent_id = metadata.get("parent_id")
+        if parent_id:
+            if parent_id in seen_parents:
+                continue
+            seen_parents.add(parent_id)
+            chunk_id = parent_id
+        content = documents[i] if i < len(documents) else ""
+        distance = distances[i] if i < len(distances) else 1.0
+
+        # Convert distance to relevance score (cosine distance to similarity)
+        relevance_score = 1.0 - distance
+
+        search_results.append(
+            SearchResult(
+                chunk_id=chunk_id,
+                document_id=metadata.get("document_id", ""),
+                document_name=metadata.get("document_name", ""),
+                content=content,
+                chunk_index=metadata.get("chunk_index", 0),
+                token_count=metadata.get("token_count", 0),
+                relevance_score=round(relevance_score, 4),
+            )
+        )
+    return search_results
+
+
+def with_section_text(results: list[SearchResult], sections: dict) -> list[SearchResult]:
+    """Fill in the text, index and size of the sections behind search results.
+
+    The vector store only holds child chunks; results point at their parent
+    sections (or at plain chunks of documents indexed without children).
+    Sections deleted since the search are dropped.
+    """
+    loaded = []
+    for result in results:
+        section = sections.get(result.chunk_id)
+        if section is None:
+            continue
+        result.content = section.content
+        result.chunk_index = section.chunk_index
+        result.token_count = section.token_count
+        loaded.append(result)
+    return loaded
+
+
+def search_fetch_count(top_k: int) -> int:
+    """Matches to request so that usually ``top_k`` distinct parent sections remain.
+
+    Fewer are returned when the best matches crowd into a few sections, as in
+    chat retrieval.
+    """
+    return top_k * CHILD_FETCH_FACTOR if settings.parent_child_chunking else top_k
+
+
 async def process_document_background(document_id: str) -> None:
     """Process document in background with new session."""
     async with async_session() as session:
@@ -233,6 +320,22 @@ async def search_documents(
             detail="Notebook not found",
         )
 
+    document_ids = await service.filter_document_ids(session, notebook_id, request.filters)
+    if document_ids == []:
+        return SearchResponse(results=[])
+
+    cache_key = (
+        "search",
+        notebook_id,
+        notebook.content_version,
+        normalize_query(request.query),
+        request.top_k,
+        tuple(sorted(document_ids)) if document_ids else None,
+    )
+    cached = retrieval_cache.get(cache_key)
+    if cached is not None:
+        return SearchResponse(results=cached)
+
     # Embed query
     query_embedding = embed_query(request.query)
 
@@ -240,36 +343,102 @@ async def search_documents(
     results = search_collection(
         notebook_id=notebook_id,
         query_embedding=query_embedding,
-        n_results=request.top_k,
+        n_results=search_fetch_count(request.top_k),
+        document_ids=document_ids,
     )
 
-    # Convert to response format
-    search_results: list[SearchResult] = []
-
-    if results and results.get("ids") and results["ids"][0]:
-        ids = results["ids"][0]
-        documents = results.get("documents", [[]])[0]
-        metadatas = results.get("metadatas", [[]])[0]
-        distances = results.get("distances", [[]])[0]
-
-        for i, chunk_id in enumerate(ids):
-            metadata = metadatas[i] if i < len(metadatas) else {}
-            content = documents[i] if i < len(documents) else ""
-            distance = distances[i] if i < len(distances) else 1.0
-
-            # Convert distance to relevance score (cosine distance to similarity)
-            relevance_score = 1.0 - distance
-
-            search_results.append(
-                SearchResult(
-                    chunk_id=chunk_id,
-                    document_id=metadata.get("document_id", ""),
-                    document_name=metadata.get("document_name", ""),
-                    content=content,
-                    chunk_index=metadata.get("chunk_index", 0),
-                    token_count=metadata.get("token_count", 0),
-                    relevance_score=round(relevance_score, 4),
-                )
-            )
+    # Convert to response format, one result per parent section
+    search_results = to_search_results(results, limit=request.top_k)
+    sections = await service.get_search_sections(session, [r.chunk_id for r in search_results])
+    search_results = with_section_text(search_results, sections)
 
+    retrieval_cache.put(cache_key, search_results)
     return SearchResponse(results=search_results)
+
+
+@router.post("/notebooks/{notebook_id}/search/batch", response_model=BatchSearchResponse)
+async def search_documents_batch(
+    notebook_id: str,
+    request: BatchSearchRequest,
+    session: AsyncSession = Depends(get_session),
+) -> BatchSearchResponse:
+    """Search for relevant chunks for many queries at once.
+
+    Queries not already cached are embedded in one batch and sent to the
+    vector store in a single multi-query request. Results share the search
+    cache with the single-query endpoint.
+    """
+    if len(request.queries) > settings.max_search_batch_queries:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many queries (max {settings.max_search_batch_queries})",
+        )
+
+    notebook = await get_notebook(session, notebook_id)
+    if not notebook:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Notebook not found",
+        )
+
+    document_ids = await service.filter_document_ids(session, notebook_id, request.filters)
+    if document_ids == []:
+        return BatchSearchResponse(
+            results=[BatchSearchResult(query=query, results=[]) for query in request.queries]
+        )
+    filter_key = tuple(sorted(document_ids)) if document_ids else None
+
+    def cache_key(normalized: str) -> tuple:
+        return (
+            "search",
+            notebook_id,
+            notebook.content_version,
+            normalized,
+            request.top_k,
+            filter_key,
+        )
+
+    # Duplicate queries (after normalization) are searched once
+    results_by_query: dict[str, list[SearchResult]] = {}
+    missing: dict[str, str] = {}
+    for query in request.queries:
+        normalized = normalize_query(query)
+        if normalized in results_by_query or normalized in missing:
+            continue
+        cached = retrieval_cache.get(cache_key(normalized))
+        if cached is not None:
+            results_by_query[normalized] = cached
+        else:
+            missing[normalized] = query
+
+    if missing:
+        query_embeddings = await asyncio.to_thread(embed_texts, list(missing.values()))
+        results = await asyncio.to_thread(
+            search_collection_batch,
+            notebook_id,
+            query_embeddings,
+            search_fetch_count(request.top_k),
+            document_ids,
+        )
+        found = [to_search_results(results, i, request.top_k) for i in range(len(missing))]
+
+        # Load section text for every result in the batch in one query
+        chunk_ids = {result.chunk_id for results in found for result in results}
+        sections = await service.get_search_sections(session, list(chunk_ids))
+        found = [with_section_text(results, sections) for results in found]
+
+        # Resolve document names once for every result in the batch
+        document_ids = {result.document_id for results in found for result in results}
+        names = await service.get_document_names(session, list(document_ids))
+        for normalized, search_results in zip(missing, found, strict=True):
+            for result in search_results:
+                result.document_name = names.get(result.document_id, result.document_name)
+            retrieval_cache.put(cache_key(normalized), search_results)
+            results_by_query[normalized] = search_results
+
+    return BatchSearchResponse(
+        results=[
+            BatchSearchResult(query=query, results=results_by_query[normalize_query(query)])
+            for query in request.queries
+        ]
+    )
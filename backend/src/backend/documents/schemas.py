@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class DocumentResponse(BaseModel):
@@ -40,9 +40,21 @@ class ChunkListResponse(BaseModel):
     chunks: list[ChunkResponse]
 
 
+class DocumentFilters(BaseModel):
+    """Restrict retrieval to documents matching every given condition."""
+
+    source_type: list[str] | None = None  # file, url, youtube, paste
+    file_type: list[str] | None = None  # pdf, txt, markdown, docx, html, ...
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    min_pages: int | None = Field(None, ge=0)  # Bounds on the document's page count
+    max_pages: int | None = Field(None, ge=0)
+
+
 class SearchRequest(BaseModel):
     query: str
     top_k: int = 5
+    filters: DocumentFilters | None = None
 
 
 class SearchResult(BaseModel):
@@ -57,3 +69,18 @@ class SearchResult(BaseModel):
 
 class SearchResponse(BaseModel):
     results: list[SearchResult]
+
+
+class BatchSearchRequest(BaseModel):
+    queries: list[str] = Field(..., min_length=1)
+    top_k: int = 5
+    filters: DocumentFilters | None = None
+
+
+class BatchSearchResult(BaseModel):
+    query: str
+    results: list[SearchResult]
+
+
+class BatchSearchResponse(BaseModel):
+    results: list[BatchSearchResult]  # In the order of the request's queries
@@ -1,12 +1,17 @@
+from datetime import UTC, datetime
 from pathlib import Path
 from uuid import uuid4
 
 from fastapi import UploadFile
 from sqlalchemy import select
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.backend.config import settings
+from src.backend.documents.schemas import DocumentFilters
+from src.backend.embedding.vectorstore import delete_chunks_from_collection
 from src.backend.models import Chunk, Document
+from src.backend.notebooks.service import bump_content_version
 
 ALLOWED_EXTENSIONS = {".pdf", ".txt", ".md", ".docx", ".html"}
 EXTENSION_TO_TYPE = {
@@ -46,9 +51,78 @@ async def get_document(session: AsyncSession, document_id: str) -> Document | No
     return result.scalar_one_or_none()
 
 
+async def filter_document_ids(
+    session: AsyncSession,
+    notebook_id: str,
+    filters: DocumentFilters | None,
+    document_ids: list[str] | None = None,
+) -> list[str] | None:
+    """Resolve structured filters to the IDs of matching ready documents.
+
+    The lookup runs on indexed ``document`` columns, so the vector search only
+    receives a document-id set. Returns ``document_ids`` unchanged when no
+    filter is set; otherwise the result is narrowed to ``document_ids`` (if
+    given) and may be empty.
+    """
+    if filters is None or not filters.model_dump(exclude_none=True):
+        return document_ids
+
+    conditions = [Document.notebook_id == notebook_id, Document.processing_status == "ready"]
+    if document_ids:
+        conditions.append(Document.id.in_(document_ids))
+    if filters.source_type:
+        conditions.append(Document.source_type.in_(filters.source_type))
+    if filters.file_type:
+        conditions.append(Document.file_type.in_(filters.file_type))
+    # Naive timestamps are taken as UTC
+    if filters.created_after is not None:
+        conditions.append(Document.created_at >= _as_utc(filters.created_after))
+    if filters.created_before is not None:
+        conditions.append(Document.created_at < _as_utc(filters.created_before))
+    if filters.min_pages is not None:
+        conditions.append(Document.page_count >= filters.min_pages)
+    if filters.max_pages is not None:
+        conditions.append(Document.page_count <= filters.max_pages)
+
+    result = await session.execute(select(Document.id).where(*conditions))
+    return list(result.scalars().all())
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
+
+
+async def get_document_names(session: AsyncSession, document_ids: list[str]) -> dict[str, str]:
+    """Map document IDs to their current filenames."""
+    if not document_ids:
+        return {}
+    result = await session.execute(
+        select(Document.id, Document.filename).where(Document.id.in_(document_ids))
+    )
+    return dict(result.all())
+
+
+async def get_search_sections(session: AsyncSession, chunk_ids: list[str]) -> dict[str, Row]:
+    """Map chunk IDs to the text, index and size of those chunks, in one query."""
+    if not chunk_ids:
+        return {}
+    result = await session.execute(
+        select(Chunk.id, Chunk.content, Chunk.chunk_index, Chunk.token_count).where(
+            Chunk.id.in_(chunk_ids)
+        )
+    )
+    return {row.id: row for row in result.all()}
+
+
 async def get_document_chunks(session: AsyncSession, document_id: str) -> list[Chunk]:
-    """Get all chunks for a document."""
-    stmt = select(Chunk).where(Chunk.document_id == document_id).order_by(Chunk.chunk_index)
+    """Get all content chunks for a document (parent sections, not their children)."""
+    stmt = (
+        select(Chunk)
+        .where(Chunk.document_id == document_id, Chunk.parent_id.is_(None))
+        .order_by(Chunk.chunk_index)
+    )
     result = await session.execute(stmt)
     return list(result.scalars().all())
 
@@ -101,6 +175,16 @@ async def delete_document(session: AsyncSession, document: Document) -> None:
         if file_path.exists() and file_path.is_file():
             file_path.unlink()
 
+    # Remove the document's vectors so they no longer show up in search
+    result = await session.execute(
+        select(Chunk.id).where(Chunk.document_id == document.id, Chunk.embedding_id.is_not(None))
+    )
+    chunk_ids = list(result.scalars().all())
+    if chunk_ids:
+        delete_chunks_from_collection(document.notebook_id, chunk_ids)
+
     # Delete document record (cascades to chunks)
     await session.delete(document)
+    if chunk_ids:
+        await bump_content_version(session, document.notebook_id)
     await session.commit()
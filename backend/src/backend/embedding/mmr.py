@@ -0,0 +1,56 @@
+"""Maximal marginal relevance (MMR) selection over embedding vectors."""
+
+from collections.abc import Sequence
+
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so dot products are cosine similarities."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def maximal_marginal_relevance(
+    query_embedding: Sequence[float],
+    candidate_embeddings: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.7,
+) -> list[int]:
+    """Select up to k candidate indices balancing relevance and diversity.
+
+    Each step picks the candidate maximizing
+    ``lambda_mult * sim(query, c) - (1 - lambda_mult) * max(sim(c, selected))``.
+    A lambda of 1.0 reduces to plain relevance ranking; lower values penalize
+    near-duplicates of already selected chunks more strongly.
+
+    Returns:
+        Indices into ``candidate_embeddings`` in selection order.
+    """
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    if candidates.ndim != 2 or len(candidates) == 0 or k <= 0:
+        return []
+
+    k = min(k, len(candidates))
+    candidates = _normalize(candidates)
+    query = _normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))
+
+    query_similarity = (candidates @ query.T).ravel()
+    pairwise_similarity = candidates @ candidates.T
+
+    selected = [int(np.argmax(query_similarity))]
+    # Highest similarity of each candidate to anything already selected
+    redundancy = pairwise_similarity[selected[0]].copy()
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        scores = lambda_mult * query_similarity - (1.0 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, pairwise_similarity[best], out=redundancy)
+
+    return selected
@@ -4,8 +4,15 @@ from functools import lru_cache
 
 from sentence_transformers import SentenceTransformer
 
+from src.backend.cache import LRUCache, normalize_query
 from src.backend.config import settings
 
+# Query embeddings by normalized text, warmed by retrieval prefetch while typing
+_query_embedding_cache: LRUCache[str, list[float]] = LRUCache(
+    max_entries=settings.query_embedding_cache_max_entries,
+    ttl_seconds=settings.retrieval_cache_ttl_seconds,
+)
+
 
 @lru_cache(maxsize=1)
 def get_embedding_model() -> SentenceTransformer:
@@ -21,7 +28,13 @@ def embed_texts(texts: list[str]) -> list[list[float]]:
 
 
 def embed_query(query: str) -> list[float]:
-    """Embed a single query text."""
+    """Embed a single query text (cached by normalized text)."""
+    key = normalize_query(query)
+    cached = _query_embedding_cache.get(key)
+    if cached is not None:
+        return cached
+
     model = get_embedding_model()
-    embedding = model.encode(query, convert_to_numpy=True)
-    return embedding.tolist()
+    embedding = model.encode(query, convert_to_numpy=True).tolist()
+    _query_embedding_cache.put(key, embedding)
+    return embedding
@@ -8,6 +8,9 @@ from chromadb.config import Settings as ChromaSettings
 
 from src.backend.config import settings
 
+# Extra child chunks fetched per result, since several children share a parent
+CHILD_FETCH_FACTOR = 3
+
 
 @lru_cache(maxsize=1)
 def get_chroma_client() -> chromadb.PersistentClient:
@@ -49,6 +52,7 @@ def search_collection(
     query_embedding: list[float],
     n_results: int = 5,
     document_ids: list[str] | None = None,
+    include_embeddings: bool = False,
 ) -> dict:
     """Search for similar chunks in a notebook collection.
 
@@ -58,6 +62,8 @@ def search_collection(
         n_results: Maximum number of results to return.
         document_ids: Optional list of document IDs to filter by.
             If provided, only chunks from these documents will be returned.
+        include_embeddings: Also return the stored chunk vectors, e.g. for
+            re-ranking without re-embedding the chunk text.
     """
     collection = get_collection(notebook_id)
 
@@ -66,15 +72,44 @@ def search_collection(
     if document_ids:
         where_filter = {"document_id": {"$in": document_ids}}
 
+    include = ["documents", "metadatas", "distances"]
+    if include_embeddings:
+        include.append("embeddings")
+
     results = collection.query(
         query_embeddings=[query_embedding],
         n_results=n_results,
-        include=["documents", "metadatas", "distances"],
+        include=include,
         where=where_filter,
     )
     return results
 
 
+def search_collection_batch(
+    notebook_id: str,
+    query_embeddings: list[list[float]],
+    n_results: int = 5,
+    document_ids: list[str] | None = None,
+) -> dict:
+    """Search a notebook collection for several queries in one request.
+
+    Results are returned in Chroma's per-query layout: ``results["ids"][i]``
+    holds the matches for ``query_embeddings[i]``.
+    """
+    collection = get_collection(notebook_id)
+
+    where_filter = None
+    if document_ids:
+        where_filter = {"document_id": {"$in": document_ids}}
+
+    return collection.query(
+        query_embeddings=query_embeddings,
+        n_results=n_results,
+        include=["documents", "metadatas", "distances"],
+        where=where_filter,
+    )
+
+
 def delete_collection(notebook_id: str) -> None:
     """Delete a notebook's collection."""
     client = get_chroma_client()
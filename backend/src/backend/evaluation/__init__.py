@@ -0,0 +1,4 @@
+"""Offline retrieval quality and latency evaluation.
+
+Run with ``python -m src.backend.evaluation`` from the backend directory.
+"""
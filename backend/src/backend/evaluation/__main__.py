@@ -0,0 +1,59 @@
+"""Command line entry point: ``python -m src.backend.evaluation``."""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Evaluate retrieval quality (recall@k, MRR, nDCG) and latency."
+    )
+    parser.add_argument("--corpus", type=Path, help="Directory of documents to ingest")
+    parser.add_argument("--queries", type=Path, help="JSON file of labeled queries")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here instead of stdout")
+    parser.add_argument(
+        "--work-dir",
+        type=Path,
+        help="Directory for the evaluation database and vector store (default: temporary)",
+    )
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="onotebook-eval-"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    # Keep evaluation data away from the application's; must happen before settings load
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{work_dir.resolve() / 'evaluation.db'}"
+    os.environ["CHROMA_PERSIST_DIRECTORY"] = str(work_dir / "chroma")
+    os.environ["UPLOAD_DIRECTORY"] = str(work_dir / "uploads")
+
+    from src.backend.evaluation.service import (
+        DEFAULT_CORPUS_DIRECTORY,
+        DEFAULT_QUERIES_PATH,
+        run_evaluation,
+    )
+
+    try:
+        report = asyncio.run(
+            run_evaluation(
+                corpus_directory=args.corpus or DEFAULT_CORPUS_DIRECTORY,
+                queries_path=args.queries or DEFAULT_QUERIES_PATH,
+            )
+        )
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
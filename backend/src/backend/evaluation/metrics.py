@@ -0,0 +1,69 @@
+"""Ranking metrics and latency summaries for retrieval evaluation."""
+
+import math
+from typing import NamedTuple
+
+
+class RelevanceLabel(NamedTuple):
+    document: str  # Document filename
+    evidence: str  # Text a chunk must contain to count as relevant
+
+
+def matched_labels(source: dict, labels: list[RelevanceLabel]) -> set[int]:
+    """Indices of the labels satisfied by a retrieved source."""
+    content = source["content"].lower()
+    return {
+        i
+        for i, label in enumerate(labels)
+        if source["document_name"] == label.document and label.evidence.lower() in content
+    }
+
+
+def _gains(sources: list[dict], labels: list[RelevanceLabel], k: int) -> list[int]:
+    """Binary gain per rank; each label is credited at most once."""
+    found: set[int] = set()
+    gains = []
+    for source in sources[:k]:
+        new = matched_labels(source, labels) - found
+        found |= new
+        gains.append(1 if new else 0)
+    return gains
+
+
+def recall_at_k(sources: list[dict], labels: list[RelevanceLabel], k: int) -> float:
+    if not labels:
+        return 0.0
+    return sum(_gains(sources, labels, k)) / len(labels)
+
+
+def reciprocal_rank(sources: list[dict], labels: list[RelevanceLabel]) -> float:
+    for rank, source in enumerate(sources, start=1):
+        if matched_labels(source, labels):
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(sources: list[dict], labels: list[RelevanceLabel], k: int) -> float:
+    if not labels:
+        return 0.0
+    dcg = sum(gain / math.log2(rank + 1) for rank, gain in enumerate(_gains(sources, labels, k), 1))
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(labels), k) + 1))
+    return dcg / ideal
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """Nearest-rank p50/p95/p99 plus mean and max."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def nearest_rank(p: float) -> float:
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {
+        "p50": round(nearest_rank(50), 2),
+        "p95": round(nearest_rank(95), 2),
+        "p99": round(nearest_rank(99), 2),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "max": round(ordered[-1], 2),
+    }
@@ -0,0 +1,193 @@
+"""Retrieval evaluation: ingest a corpus, run labeled queries, report metrics."""
+
+import json
+import shutil
+import time
+from pathlib import Path
+
+from sqlalchemy import func, select
+
+from src.backend.chat.service import filter_and_score_sources, retrieve_sources_for_queries
+from src.backend.config import settings
+from src.backend.database import async_session, init_db
+from src.backend.documents.service import EXTENSION_TO_TYPE, get_file_extension
+from src.backend.evaluation.metrics import (
+    RelevanceLabel,
+    ndcg_at_k,
+    percentiles,
+    recall_at_k,
+    reciprocal_rank,
+)
+from src.backend.models import Chunk, Document, Notebook
+from src.backend.processing.chunking import count_tokens
+from src.backend.processing.service import process_document
+
+EVALUATION_DIRECTORY = Path(__file__).parent
+DEFAULT_CORPUS_DIRECTORY = EVALUATION_DIRECTORY / "corpus"
+DEFAULT_QUERIES_PATH = EVALUATION_DIRECTORY / "queries.json"
+CUTOFFS = (1, 3, 5)
+
+
+def load_queries(path: Path) -> list[tuple[str, list[RelevanceLabel]]]:
+    """Load labeled queries: ``[{"query": ..., "relevant": [{"document", "evidence"}]}]``."""
+    items = json.loads(path.read_text(encoding="utf-8"))
+    return [
+        (item["query"], [RelevanceLabel(r["document"], r["evidence"]) for r in item["relevant"]])
+        for item in items
+    ]
+
+
+async def build_notebook(corpus_directory: Path) -> tuple[Notebook, dict]:
+    """Create a notebook and ingest every supported file through process_document."""
+    await init_db()
+
+    async with async_session() as session:
+        notebook = Notebook(name="Retrieval evaluation")
+        session.add(notebook)
+        await session.commit()
+        await session.refresh(notebook)
+
+        upload_directory = Path(settings.upload_directory) / notebook.id
+        upload_directory.mkdir(parents=True, exist_ok=True)
+
+        ingest_ms: list[float] = []
+        for path in sorted(corpus_directory.iterdir()):
+            extension = get_file_extension(path.name)
+            if extension not in EXTENSION_TO_TYPE:
+                continue
+
+            file_path = upload_directory / path.name
+            shutil.copyfile(path, file_path)
+            document = Document(
+                notebook_id=notebook.id,
+                filename=path.name,
+                file_type=EXTENSION_TO_TYPE[extension],
+                file_size=file_path.stat().st_size,
+                file_path=str(file_path),
+                processing_status="pending",
+            )
+            session.add(document)
+            await session.commit()
+            await session.refresh(document)
+
+            started = time.perf_counter()
+            await process_document(session, document)
+            ingest_ms.append((time.perf_counter() - started) * 1000)
+
+        def chunk_stats(*conditions):
+            return (
+                select(
+                    func.count(Chunk.id),
+                    func.coalesce(func.sum(Chunk.token_count), 0),
+                    func.coalesce(func.sum(func.length(Chunk.content)), 0),
+                )
+                .join(Document, Chunk.document_id == Document.id)
+                .where(Document.notebook_id == notebook.id, *conditions)
+            )
+
+        # Content chunks are what the LLM reads; embedded chunks are what is searched
+        content = (await session.execute(chunk_stats(Chunk.parent_id.is_(None)))).one()
+        embedded = (await session.execute(chunk_stats(Chunk.embedding_id.is_not(None)))).one()
+        stored = (await session.execute(chunk_stats())).one()
+
+    vector_store_bytes = sum(
+        path.stat().st_size
+        for path in Path(settings.chroma_persist_directory).rglob("*")
+        if path.is_file()
+    )
+    corpus = {
+        "documents": len(ingest_ms),
+        "chunks": content[0],
+        "chunk_tokens": content[1],
+        "embedded_chunks": embedded[0],
+        "embedded_tokens": embedded[1],
+        "stored_text_bytes": stored[2],
+        "vector_store_bytes": vector_store_bytes,
+        "ingest_ms": percentiles(ingest_ms),
+    }
+    return notebook, corpus
+
+
+async def evaluate_queries(
+    notebook_id: str,
+    queries: list[tuple[str, list[RelevanceLabel]]],
+) -> dict:
+    """Run each query through retrieval and score the context the LLM would see."""
+    per_query = []
+    stage_ms: dict[str, list[float]] = {}
+    context_tokens: list[float] = []
+
+    for query, labels in queries:
+        timings: dict[str, float] = {}
+        started = time.perf_counter()
+        raw_sources = await retrieve_sources_for_queries([query], notebook_id, timings=timings)
+        filter_started = time.perf_counter()
+        sources, grounding = filter_and_score_sources(raw_sources)
+        timings["filter_ms"] = (time.perf_counter() - filter_started) * 1000
+        timings["total_ms"] = (time.perf_counter() - started) * 1000
+
+        for stage, value in timings.items():
+            stage_ms.setdefault(stage.removesuffix("_ms"), []).append(value)
+
+        context_tokens.append(sum(count_tokens(source["content"]) for source in sources))
+
+        scores = {f"recall@{k}": recall_at_k(sources, labels, k) for k in CUTOFFS}
+        scores["mrr"] = reciprocal_rank(sources, labels)
+        scores.update({f"ndcg@{k}": ndcg_at_k(sources, labels, k) for k in CUTOFFS})
+        per_query.append(
+            {
+                "query": query,
+                "scores": {name: round(value, 4) for name, value in scores.items()},
+                "retrieved": [
+                    {
+                        "document_name": source["document_name"],
+                        "relevance_score": source["relevance_score"],
+                    }
+                    for source in sources
+                ],
+                "sources_filtered": grounding.sources_filtered,
+                "context_tokens": context_tokens[-1],
+            }
+        )
+
+    metric_names = per_query[0]["scores"].keys() if per_query else []
+    metrics = {
+        name: round(sum(q["scores"][name] for q in per_query) / len(per_query), 4)
+        for name in metric_names
+    }
+    return {
+        "metrics": metrics,
+        "latency_ms": {stage: percentiles(values) for stage, values in stage_ms.items()},
+        "context_tokens": percentiles(context_tokens),
+        "queries": per_query,
+    }
+
+
+async def run_evaluation(
+    corpus_directory: Path = DEFAULT_CORPUS_DIRECTORY,
+    queries_path: Path = DEFAULT_QUERIES_PATH,
+) -> dict:
+    """Build a notebook from the corpus and evaluate the labeled queries against it."""
+    notebook, corpus = await build_notebook(corpus_directory)
+    queries = load_queries(queries_path)
+    report = await evaluate_queries(notebook.id, queries)
+
+    return {
+        "config": {
+            "embedding_model": settings.embedding_model,
+            "chunk_size": settings.chunk_size,
+            "chunk_overlap": settings.chunk_overlap,
+            "parent_child_chunking": settings.parent_child_chunking,
+            "parent_chunk_size": settings.parent_chunk_size,
+            "child_chunk_size": settings.child_chunk_size,
+            "child_chunk_overlap": settings.child_chunk_overlap,
+            "rag_min_relevance_score": settings.rag_min_relevance_score,
+            "rag_max_context_chunks": settings.rag_max_context_chunks,
+            "rag_mmr_enabled": settings.rag_mmr_enabled,
+            "rag_mmr_fetch_k": settings.rag_mmr_fetch_k,
+            "rag_mmr_lambda": settings.rag_mmr_lambda,
+        },
+        "corpus": corpus,
+        "query_count": len(queries),
+        **report,
+    }
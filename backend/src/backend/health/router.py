@@ -3,6 +3,7 @@ from fastapi import APIRouter
 
 from src.backend.config import settings
 from src.backend.health.schemas import HealthResponse
+from src.backend.http_clients import http_clients
 
 router = APIRouter(prefix="/api", tags=["health"])
 
@@ -10,9 +11,8 @@ router = APIRouter(prefix="/api", tags=["health"])
 async def check_ollama_connection() -> bool:
     """Check if Ollama is running and accessible."""
     try:
-        async with httpx.AsyncClient(timeout=2.0) as client:
-            response = await client.get(f"{settings.ollama_base_url}/api/tags")
-            return response.status_code == 200
+        response = await http_clients.get("ollama").get("/api/tags", timeout=2.0)
+        return response.status_code == 200
     except (httpx.ConnectError, httpx.TimeoutException):
         return False
 
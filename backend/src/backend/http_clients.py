@@ -0,0 +1,78 @@
+"""Shared HTTP clients for LLM providers, opened at startup and closed on shutdown.
+
+Reusing one client per upstream keeps connections alive between calls, so a
+chat turn no longer pays TCP (and, for hosted APIs, TLS) setup before its
+first token. Hosted providers use HTTP/2, which multiplexes concurrent
+streams over a single connection.
+"""
+
+import httpx
+
+from src.backend.config import settings
+
+ANTHROPIC_BASE_URL = "https://api.anthropic.com"
+OPENAI_BASE_URL = "https://api.openai.com"
+
+
+def _limits(max_connections: int) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+    )
+
+
+def _create_client(name: str) -> httpx.AsyncClient:
+    # No read timeout by default: generations stream for as long as they take.
+    # Short calls (health checks, model lists) pass their own timeout.
+    timeout = httpx.Timeout(None, connect=settings.http_connect_timeout_seconds)
+    if name == "ollama":
+        return httpx.AsyncClient(
+            base_url=settings.ollama_base_url,
+            timeout=timeout,
+            # Room for model pulls and health checks next to generations
+            limits=_limits(settings.ollama_max_concurrency + 4),
+        )
+    if name == "anthropic":
+        return httpx.AsyncClient(
+            base_url=ANTHROPIC_BASE_URL,
+            timeout=timeout,
+            limits=_limits(settings.anthropic_max_concurrency),
+            http2=True,
+        )
+    if name == "openai":
+        return httpx.AsyncClient(
+            base_url=OPENAI_BASE_URL,
+            timeout=timeout,
+            limits=_limits(settings.openai_max_concurrency),
+            http2=True,
+        )
+    raise ValueError(f"Unknown HTTP client: {name}")
+
+
+class HTTPClients:
+    """One pooled AsyncClient per upstream (ollama, anthropic, openai)."""
+
+    def __init__(self):
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def open(self) -> None:
+        """Create every client up front (called from the application lifespan)."""
+        for name in ("ollama", "anthropic", "openai"):
+            self.get(name)
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """Return the client for ``name``, creating it on first use outside the app."""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._clients[name] = _create_client(name)
+        return client
+
+    async def aclose(self) -> None:
+        """Close all clients and their pooled connections."""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+http_clients = HTTPClients()
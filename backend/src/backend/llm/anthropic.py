@@ -3,10 +3,9 @@
 import json
 from collections.abc import AsyncIterator
 
-import httpx
-
 from src.backend.config import settings
-from src.backend.llm.base import ChatMessage, LLMProvider
+from src.backend.http_clients import http_clients
+from src.backend.llm.base import ChatMessage, JSONGenerationError, LLMProvider
 
 CLAUDE_MODELS = [
     "claude-sonnet-4-20250514",
@@ -14,6 +13,10 @@ CLAUDE_MODELS = [
     "claude-3-5-sonnet-20241022",
     "claude-3-5-haiku-20241022",
 ]
+CLAUDE_CONTEXT_WINDOW = 200_000
+CACHE_CONTROL = {"type": "ephemeral"}
+MAX_CACHE_BREAKPOINTS = 4  # Per request, across system and messages
+JSON_TOOL_NAME = "record_response"
 
 
 class AnthropicProvider(LLMProvider):
@@ -23,47 +26,57 @@ class AnthropicProvider(LLMProvider):
     async def list_models(self) -> list[str]:
         return CLAUDE_MODELS if self.is_available() else []
 
-    async def chat_stream(
-        self,
-        messages: list[ChatMessage],
-        model: str,
-    ) -> AsyncIterator[str]:
+    def context_window(self, model: str) -> int:
+        return CLAUDE_CONTEXT_WINDOW
+
+    def _headers(self) -> dict[str, str]:
         if not settings.anthropic_api_key:
             raise ValueError("Anthropic API key not configured")
+        return {
+            "x-api-key": settings.anthropic_api_key,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json",
+        }
 
-        # Extract system message if present
-        system_message = None
+    def _payload(self, messages: list[ChatMessage], model: str) -> dict:
+        # System messages go to the top-level system prompt. A cacheable
+        # message ends with a cache breakpoint, so everything up to it (system
+        # prompt, earlier turns) is reused by later requests. Only the
+        # last breakpoints the API allows are kept; each covers the ones before.
+        breakpoints = [i for i, msg in enumerate(messages) if msg.cache][-MAX_CACHE_BREAKPOINTS:]
+        system_blocks = []
         anthropic_messages = []
-        for msg in messages:
+        for i, msg in enumerate(messages):
+            block = {"type": "text", "text": msg.content}
+            if i in breakpoints:
+                block["cache_control"] = CACHE_CONTROL
             if msg.role == "system":
-                system_message = msg.content
+                system_blocks.append(block)
             else:
-                anthropic_messages.append({"role": msg.role, "content": msg.content})
+                anthropic_messages.append({"role": msg.role, "content": [block]})
 
         payload = {
             "model": model,
             "max_tokens": 4096,
             "messages": anthropic_messages,
-            "stream": True,
         }
-        if system_message:
-            payload["system"] = system_message
+        if system_blocks:
+            payload["system"] = system_blocks
+        return payload
 
-        headers = {
-            "x-api-key": settings.anthropic_api_key,
-            "anthropic-version": "2023-06-01",
-            "content-type": "application/json",
-        }
+    async def chat_stream(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        usage: dict[str, int] | None = None,
+    ) -> AsyncIterator[str]:
+        headers = self._headers()
+        payload = self._payload(messages, model)
+        payload["stream"] = True
 
-        async with (
-            httpx.AsyncClient(timeout=None) as client,
-            client.stream(
-                "POST",
-                "https://api.anthropic.com/v1/messages",
-                json=payload,
-                headers=headers,
-            ) as response,
-        ):
+        async with http_clients.get("anthropic").stream(
+            "POST", "/v1/messages", json=payload, headers=headers
+        ) as response:
             response.raise_for_status()
 
             async for line in response.aiter_lines():
@@ -79,7 +92,57 @@ class AnthropicProvider(LLMProvider):
                 except json.JSONDecodeError:
                     continue
 
-                if data.get("type") == "content_block_delta":
+                event_type = data.get("type")
+                if event_type == "content_block_delta":
                     delta = data.get("delta", {})
                     if delta.get("type") == "text_delta":
                         yield delta.get("text", "")
+                elif event_type == "message_start" and usage is not None:
+                    _record_usage(data.get("message", {}).get("usage", {}), usage)
+                elif event_type == "message_delta" and usage is not None:
+                    usage["completion_tokens"] = data.get("usage", {}).get("output_tokens", 0)
+
+    async def generate_json(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        schema: dict,
+        usage: dict[str, int] | None = None,
+    ) -> dict:
+        # Forcing a single tool call makes its input the structured output
+        headers = self._headers()
+        payload = self._payload(messages, model)
+        payload["tools"] = [
+            {
+                "name": JSON_TOOL_NAME,
+                "description": "Record the requested data.",
+                "input_schema": schema,
+            }
+        ]
+        payload["tool_choice"] = {"type": "tool", "name": JSON_TOOL_NAME}
+
+        response = await http_clients.get("anthropic").post(
+            "/v1/messages",
+            json=payload,
+            headers=headers,
+            timeout=settings.llm_json_timeout_seconds,
+        )
+        response.raise_for_status()
+        data = response.json()
+        if usage is not None:
+            _record_usage(data.get("usage", {}), usage)
+            usage["completion_tokens"] = data.get("usage", {}).get("output_tokens", 0)
+
+        for block in data.get("content", []):
+            if block.get("type") == "tool_use" and isinstance(block.get("input"), dict):
+                return block["input"]
+        raise JSONGenerationError("Model did not return the requested tool call")
+
+
+def _record_usage(counts: dict, usage: dict[str, int]) -> None:
+    # Uncached input, cache writes and cache reads are counted separately
+    cache_write = counts.get("cache_creation_input_tokens") or 0
+    cache_read = counts.get("cache_read_input_tokens") or 0
+    usage["prompt_tokens"] = counts.get("input_tokens", 0) + cache_write + cache_read
+    usage["cache_write_tokens"] = cache_write
+    usage["cache_read_tokens"] = cache_read
@@ -1,14 +1,34 @@
 """Base LLM provider protocol."""
 
+import json
 from abc import ABC, abstractmethod
 from collections.abc import AsyncIterator
 from dataclasses import dataclass
 
+# Fallback context window (tokens) for models without a known size
+DEFAULT_CONTEXT_WINDOW = 8192
+
 
 @dataclass
 class ChatMessage:
     role: str  # "user", "assistant", or "system"
     content: str
+    cache: bool = False  # End of a stable prompt prefix the provider may cache
+
+
+class JSONGenerationError(ValueError):
+    """The model's output was not the requested JSON object."""
+
+
+def parse_json_object(text: str) -> dict:
+    """Parse a model's JSON output, which must be an object."""
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise JSONGenerationError(f"Model returned invalid JSON: {e}") from e
+    if not isinstance(data, dict):
+        raise JSONGenerationError("Model returned JSON that is not an object")
+    return data
 
 
 class LLMProvider(ABC):
@@ -19,8 +39,32 @@ class LLMProvider(ABC):
         self,
         messages: list[ChatMessage],
         model: str,
+        usage: dict[str, int] | None = None,
     ) -> AsyncIterator[str]:
-        """Stream chat response tokens."""
+        """Stream chat response tokens.
+
+        Token counts reported by the provider are stored into ``usage`` when
+        the stream ends: ``prompt_tokens`` (including cached tokens),
+        ``completion_tokens`` and, where supported, ``cache_read_tokens`` and
+        ``cache_write_tokens``.
+        """
+        ...
+
+    @abstractmethod
+    async def generate_json(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        schema: dict,
+        usage: dict[str, int] | None = None,
+    ) -> dict:
+        """Generate a JSON object constrained to ``schema``.
+
+        ``schema`` is a JSON Schema whose top level is an object. Providers
+        enforce it with their structured output support; the result is not
+        validated further, so callers check the fields they use. Raises
+        JSONGenerationError when the output is not a JSON object.
+        """
         ...
 
     @abstractmethod
@@ -28,6 +72,10 @@ class LLMProvider(ABC):
         """List available models."""
         ...
 
+    def context_window(self, model: str) -> int:
+        """Return the model's context window in tokens."""
+        return DEFAULT_CONTEXT_WINDOW
+
     @abstractmethod
     def is_available(self) -> bool:
         """Check if provider is configured (e.g., has API key)."""
@@ -6,7 +6,8 @@ from collections.abc import AsyncIterator
 import httpx
 
 from src.backend.config import settings
-from src.backend.llm.base import ChatMessage, LLMProvider
+from src.backend.http_clients import http_clients
+from src.backend.llm.base import ChatMessage, LLMProvider, parse_json_object
 
 
 class OllamaProvider(LLMProvider):
@@ -15,35 +16,79 @@ class OllamaProvider(LLMProvider):
 
     async def list_models(self) -> list[str]:
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{settings.ollama_base_url}/api/tags")
-                response.raise_for_status()
-                return [m["name"] for m in response.json().get("models", [])]
+            response = await http_clients.get("ollama").get("/api/tags", timeout=10.0)
+            response.raise_for_status()
+            return [m["name"] for m in response.json().get("models", [])]
         except (httpx.ConnectError, httpx.TimeoutException):
             return []
 
+    def context_window(self, model: str) -> int:
+        return settings.ollama_num_ctx
+
     async def chat_stream(
         self,
         messages: list[ChatMessage],
         model: str,
+        usage: dict[str, int] | None = None,
     ) -> AsyncIterator[str]:
-        payload = {
-            "model": model,
-            "messages": [{"role": m.role, "content": m.content} for m in messages],
-            "stream": True,
-        }
-
-        async with (
-            httpx.AsyncClient(timeout=None) as client,
-            client.stream(
-                "POST",
-                f"{settings.ollama_base_url}/api/chat",
-                json=payload,
-            ) as response,
-        ):
+        payload = _chat_payload(messages, model)
+        payload["stream"] = True
+
+        async with http_clients.get("ollama").stream("POST", "/api/chat", json=payload) as response:
             response.raise_for_status()
             async for line in response.aiter_lines():
                 if line:
                     data = json.loads(line)
                     if "message" in data and "content" in data["message"]:
                         yield data["message"]["content"]
+                    if data.get("done") and usage is not None:
+                        _record_usage(data, usage)
+
+    async def generate_json(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        schema: dict,
+        usage: dict[str, int] | None = None,
+    ) -> dict:
+        # Ollama constrains sampling to the schema passed as ``format``
+        payload = _chat_payload(messages, model)
+        payload["stream"] = False
+        payload["format"] = schema
+
+        response = await http_clients.get("ollama").post(
+            "/api/chat", json=payload, timeout=settings.llm_json_timeout_seconds
+        )
+        response.raise_for_status()
+        data = response.json()
+        if usage is not None:
+            _record_usage(data, usage)
+        return parse_json_object(data.get("message", {}).get("content", ""))
+
+
+def _chat_payload(messages: list[ChatMessage], model: str) -> dict:
+    return {
+        "model": model,
+        "messages": [{"role": m.role, "content": m.content} for m in messages],
+        # A fixed context size avoids model reloads, and keeping the model
+        # loaded lets Ollama reuse the KV cache of an unchanged prompt prefix
+        "options": {"num_ctx": settings.ollama_num_ctx},
+        "keep_alive": settings.ollama_keep_alive,
+    }
+
+
+# Final-chunk durations (nanoseconds) reported as milliseconds
+DURATION_FIELDS = {
+    "load_duration": "load_ms",
+    "prompt_eval_duration": "prompt_eval_ms",
+    "eval_duration": "eval_ms",
+}
+
+
+def _record_usage(data: dict, usage: dict[str, float]) -> None:
+    # Prompt tokens served from the KV cache are not evaluated again
+    usage["prompt_tokens"] = data.get("prompt_eval_count", 0)
+    usage["completion_tokens"] = data.get("eval_count", 0)
+    for field, key in DURATION_FIELDS.items():
+        if field in data:
+            usage[key] = round(data[field] / 1_000_000, 2)
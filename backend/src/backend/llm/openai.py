@@ -3,10 +3,9 @@
 import json
 from collections.abc import AsyncIterator
 
-import httpx
-
 from src.backend.config import settings
-from src.backend.llm.base import ChatMessage, LLMProvider
+from src.backend.http_clients import http_clients
+from src.backend.llm.base import ChatMessage, LLMProvider, parse_json_object
 
 OPENAI_MODELS = [
     "gpt-4o",
@@ -15,6 +14,16 @@ OPENAI_MODELS = [
     "gpt-4",
     "gpt-3.5-turbo",
 ]
+OPENAI_CONTEXT_WINDOWS = {
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16_385,
+}
+# Models without structured outputs: JSON mode only, or (older GPT-4) not even that
+OPENAI_JSON_MODE_PREFIXES = ("gpt-4-turbo", "gpt-4-1106", "gpt-4-0125", "gpt-3.5-turbo")
+OPENAI_PLAIN_JSON_PREFIXES = ("gpt-4-0", "gpt-4-32k")
 
 
 class OpenAIProvider(LLMProvider):
@@ -24,36 +33,35 @@ class OpenAIProvider(LLMProvider):
     async def list_models(self) -> list[str]:
         return OPENAI_MODELS if self.is_available() else []
 
+    def context_window(self, model: str) -> int:
+        return OPENAI_CONTEXT_WINDOWS.get(model, super().context_window(model))
+
+    def _headers(self) -> dict[str, str]:
+        if not settings.openai_api_key:
+            raise ValueError("OpenAI API key not configured")
+        return {
+            "Authorization": f"Bearer {settings.openai_api_key}",
+            "Content-Type": "application/json",
+        }
+
     async def chat_stream(
         self,
         messages: list[ChatMessage],
         model: str,
+        usage: dict[str, int] | None = None,
     ) -> AsyncIterator[str]:
-        if not settings.openai_api_key:
-            raise ValueError("OpenAI API key not configured")
-
-        openai_messages = [{"role": m.role, "content": m.content} for m in messages]
-
+        headers = self._headers()
         payload = {
             "model": model,
-            "messages": openai_messages,
+            "messages": _to_openai_messages(messages),
             "stream": True,
+            # Token counts arrive in a final chunk without choices
+            "stream_options": {"include_usage": True},
         }
 
-        headers = {
-            "Authorization": f"Bearer {settings.openai_api_key}",
-            "Content-Type": "application/json",
-        }
-
-        async with (
-            httpx.AsyncClient(timeout=None) as client,
-            client.stream(
-                "POST",
-                "https://api.openai.com/v1/chat/completions",
-                json=payload,
-                headers=headers,
-            ) as response,
-        ):
+        async with http_clients.get("openai").stream(
+            "POST", "/v1/chat/completions", json=payload, headers=headers
+        ) as response:
             response.raise_for_status()
 
             async for line in response.aiter_lines():
@@ -69,9 +77,72 @@ class OpenAIProvider(LLMProvider):
                 except json.JSONDecodeError:
                     continue
 
+                counts = data.get("usage")
+                if counts and usage is not None:
+                    _record_usage(counts, usage)
+
                 choices = data.get("choices", [])
                 if choices:
                     delta = choices[0].get("delta", {})
                     content = delta.get("content", "")
                     if content:
                         yield content
+
+    async def generate_json(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        schema: dict,
+        usage: dict[str, int] | None = None,
+    ) -> dict:
+        headers = self._headers()
+        openai_messages = _to_openai_messages(messages)
+        payload = {"model": model, "messages": openai_messages}
+        if _supports_json_schema(model):
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "response", "schema": schema},
+            }
+        else:
+            # The schema goes into the prompt; JSON mode (where available) keeps
+            # the output parseable but does not enforce its shape
+            instruction = (
+                "Respond only with a JSON object that matches this JSON schema:\n"
+                + json.dumps(schema)
+            )
+            openai_messages.insert(0, {"role": "system", "content": instruction})
+            if model.startswith(OPENAI_JSON_MODE_PREFIXES):
+                payload["response_format"] = {"type": "json_object"}
+
+        response = await http_clients.get("openai").post(
+            "/v1/chat/completions",
+            json=payload,
+            headers=headers,
+            timeout=settings.llm_json_timeout_seconds,
+        )
+        response.raise_for_status()
+        data = response.json()
+        if usage is not None and data.get("usage"):
+            _record_usage(data["usage"], usage)
+
+        choices = data.get("choices", [])
+        content = choices[0].get("message", {}).get("content") if choices else None
+        return parse_json_object(content or "")
+
+
+def _supports_json_schema(model: str) -> bool:
+    if model == "gpt-4" or model.startswith(OPENAI_JSON_MODE_PREFIXES):
+        return False
+    return not model.startswith(OPENAI_PLAIN_JSON_PREFIXES)
+
+
+def _to_openai_messages(messages: list[ChatMessage]) -> list[dict]:
+    # OpenAI caches long prompt prefixes automatically; no markers needed
+    return [{"role": m.role, "content": m.content} for m in messages]
+
+
+def _record_usage(counts: dict, usage: dict[str, int]) -> None:
+    usage["prompt_tokens"] = counts.get("prompt_tokens", 0)
+    usage["completion_tokens"] = counts.get("completion_tokens", 0)
+    details = counts.get("prompt_tokens_details") or {}
+    usage["cache_read_tokens"] = details.get("cached_tokens", 0)
@@ -0,0 +1,260 @@
+"""Per-provider scheduling of LLM calls.
+
+Each provider gets a fixed number of concurrent calls. Waiting calls are
+served by priority class (interactive chat before suggested questions before
+background jobs) and, within a class, round-robin across notebooks so one
+notebook's burst of jobs cannot hold the queue.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from enum import IntEnum
+
+from src.backend.config import settings
+
+
+class Priority(IntEnum):
+    CHAT = 0
+    SUGGESTIONS = 1
+    BACKGROUND = 2
+
+
+class QueueFullError(Exception):
+    """Raised when a provider's queue cannot take more requests of a priority class."""
+
+    def __init__(self, provider_name: str, retry_after: int):
+        super().__init__(f"Too many requests queued for {provider_name}")
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A place in a provider's queue, and then the slot it was granted."""
+
+    def __init__(self, scheduler: "ProviderScheduler", priority: Priority, notebook_id: str):
+        self.priority = priority
+        self.notebook_id = notebook_id
+        self.granted = False
+        self.released = False
+        self._scheduler = scheduler
+        self._changed = asyncio.Event()
+        self._started: float | None = None
+
+    @property
+    def position(self) -> int:
+        """1-based place in line, or 0 once the call may run."""
+        return 0 if self.granted else self._scheduler.position(self)
+
+    async def wait(self) -> None:
+        """Wait until the call may run."""
+        while not self.granted:
+            await self._notified()
+
+    async def positions(self) -> AsyncIterator[int]:
+        """Yield the queue position whenever it changes, until the call may run."""
+        last = None
+        while not self.granted:
+            position = self.position
+            if position != last:
+                last = position
+                yield position
+            await self._notified()
+
+    def release(self) -> None:
+        """Give up the place in line, or free the slot once the call is done."""
+        if not self.released:
+            self.released = True
+            self._scheduler.release(self)
+
+    async def _notified(self) -> None:
+        changed = self._changed
+        await changed.wait()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class ProviderScheduler:
+    """Admission, ordering and concurrency limit for one provider."""
+
+    def __init__(
+        self,
+        provider_name: str,
+        max_concurrency: int,
+        max_queued: int,
+        max_queued_background: int | None = None,
+    ):
+        self.provider_name = provider_name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queued = max_queued
+        self.max_queued_background = (
+            max_queued if max_queued_background is None else max_queued_background
+        )
+        self.running = 0
+        # Priority -> notebook ID -> waiting tickets; notebook order is the round-robin order
+        self._waiting: dict[Priority, OrderedDict[str, deque[Ticket]]] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        self._queued = 0
+        self._queued_by_priority: dict[Priority, int] = dict.fromkeys(Priority, 0)
+        # Moving average of call durations, used for Retry-After
+        self._average_seconds = settings.llm_expected_call_seconds
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def queued_at(self, priority: Priority) -> int:
+        """Calls waiting in one priority class."""
+        return self._queued_by_priority[priority]
+
+    def admit(self, priority: Priority = Priority.CHAT) -> None:
+        """Reject a new request when its priority class's queue is already full.
+
+        Each class is bounded on its own, so a backlog of background jobs never
+        turns interactive chat away. Routers call this to fail fast with a 429;
+        :meth:`enqueue` applies the same bound when the call actually queues.
+        """
+        limit = self.max_queued_background if priority == Priority.BACKGROUND else self.max_queued
+        if self._queued_by_priority[priority] >= limit:
+            raise QueueFullError(self.provider_name, self.retry_after(priority))
+
+    def retry_after(self, priority: Priority = Priority.CHAT) -> int:
+        """Seconds until the calls served before a new ``priority`` call have drained."""
+        ahead = sum(self._queued_by_priority[p] for p in Priority if p <= priority)
+        rounds = (ahead + 1) / self.max_concurrency
+        return max(1, math.ceil(rounds * self._average_seconds))
+
+    def enqueue(self, priority: Priority, notebook_id: str | None = None) -> Ticket:
+        """Take a slot if one is free, otherwise a place in line.
+
+        Raises QueueFullError if the call would have to wait in a full class.
+        """
+        ticket = Ticket(self, priority, notebook_id or "")
+        if self.running < self.max_concurrency and self._queued == 0:
+            self._grant(ticket)
+            return ticket
+        self.admit(priority)
+        self._waiting[priority].setdefault(ticket.notebook_id, deque()).append(ticket)
+        self._queued += 1
+        self._queued_by_priority[priority] += 1
+        self._notify_waiting()
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """Where ``ticket`` is in dispatch order if nothing else arrives."""
+        ahead = sum(
+            len(tickets)
+            for priority in Priority
+            if priority < ticket.priority
+            for tickets in self._waiting[priority].values()
+        )
+        notebooks = self._waiting[ticket.priority]
+        own = notebooks.get(ticket.notebook_id)
+        if own is None or ticket not in own:
+            return 0
+        index = own.index(ticket)
+        # Round-robin: every notebook is served once per round
+        before = True
+        for notebook_id, tickets in notebooks.items():
+            if notebook_id == ticket.notebook_id:
+                before = False
+                ahead += index
+                continue
+            ahead += min(len(tickets), index + 1 if before else index)
+        return ahead + 1
+
+    def release(self, ticket: Ticket) -> None:
+        if ticket.granted:
+            self.running -= 1
+            elapsed = time.monotonic() - ticket._started
+            self._average_seconds = 0.8 * self._average_seconds + 0.2 * elapsed
+        else:
+            notebooks = self._waiting[ticket.priority]
+            tickets = notebooks.get(ticket.notebook_id)
+            if tickets is not None and ticket in tickets:
+                tickets.remove(ticket)
+                self._queued -= 1
+                self._queued_by_priority[ticket.priority] -= 1
+                if not tickets:
+                    del notebooks[ticket.notebook_id]
+        self._dispatch()
+        self._notify_waiting()
+
+    def _dispatch(self) -> None:
+        while self.running < self.max_concurrency and self._queued:
+            notebooks = next(n for n in self._waiting.values() if n)
+            notebook_id, tickets = next(iter(notebooks.items()))
+            ticket = tickets.popleft()
+            self._queued -= 1
+            self._queued_by_priority[ticket.priority] -= 1
+            # The notebook goes to the back of its class for the next round
+            del notebooks[notebook_id]
+            if tickets:
+                notebooks[notebook_id] = tickets
+            self._grant(ticket)
+
+    def _grant(self, ticket: Ticket) -> None:
+        ticket.granted = True
+        ticket._started = time.monotonic()
+        self.running += 1
+        ticket._notify()
+
+    def _notify_waiting(self) -> None:
+        for notebooks in self._waiting.values():
+            for tickets in notebooks.values():
+                for ticket in tickets:
+                    ticket._notify()
+
+
+class LLMScheduler:
+    """One ProviderScheduler per provider name, created on first use."""
+
+    def __init__(self):
+        self._schedulers: dict[str, ProviderScheduler] = {}
+
+    def get(self, provider_name: str) -> ProviderScheduler:
+        if provider_name not in self._schedulers:
+            self._schedulers[provider_name] = ProviderScheduler(
+                provider_name,
+                max_concurrency=_max_concurrency(provider_name),
+                max_queued=settings.llm_max_queued_requests,
+                max_queued_background=settings.llm_max_queued_background_requests,
+            )
+        return self._schedulers[provider_name]
+
+    def admit(self, provider_name: str, priority: Priority = Priority.CHAT) -> None:
+        self.get(provider_name).admit(priority)
+
+    def enqueue(
+        self, provider_name: str, priority: Priority, notebook_id: str | None = None
+    ) -> Ticket:
+        return self.get(provider_name).enqueue(priority, notebook_id)
+
+    @asynccontextmanager
+    async def slot(
+        self, provider_name: str, priority: Priority, notebook_id: str | None = None
+    ) -> AsyncIterator[None]:
+        """Hold one of the provider's slots for the duration of the block."""
+        ticket = self.enqueue(provider_name, priority, notebook_id)
+        try:
+            await ticket.wait()
+            yield
+        finally:
+            ticket.release()
+
+
+def _max_concurrency(provider_name: str) -> int:
+    limits = {
+        "ollama": settings.ollama_max_concurrency,
+        "anthropic": settings.anthropic_max_concurrency,
+        "openai": settings.openai_max_concurrency,
+    }
+    return limits.get(provider_name, settings.llm_default_max_concurrency)
+
+
+llm_scheduler = LLMScheduler()
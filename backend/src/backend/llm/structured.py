@@ -0,0 +1,50 @@
+"""Structured (JSON) generation with bounded retries."""
+
+from collections.abc import Callable
+
+import httpx
+
+from src.backend.config import settings
+from src.backend.llm.base import ChatMessage, LLMProvider
+
+# Output the caller cannot use (missing fields, wrong types, empty values)
+INVALID_OUTPUT_ERRORS = (ValueError, KeyError, TypeError)
+
+
+def required_text(data: dict, key: str) -> str:
+    """A non-empty string field of a generated object."""
+    value = data[key]
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{key} is missing or empty")
+    return value.strip()
+
+
+def text_list(data: dict, key: str) -> list[str]:
+    """A list-of-strings field of a generated object, without blank entries."""
+    value = data.get(key, [])
+    if not isinstance(value, list):
+        raise TypeError(f"{key} is not a list")
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+async def generate_validated_json[T](
+    provider: LLMProvider,
+    messages: list[ChatMessage],
+    model: str,
+    schema: dict,
+    parse: Callable[[dict], T],
+    attempts: int | None = None,
+) -> T:
+    """Generate a JSON object and convert it with ``parse``, retrying bad output.
+
+    ``parse`` raises ValueError, KeyError or TypeError for an object it
+    cannot use. Unusable output and transport errors are retried, up to
+    ``attempts`` calls in total; after that the last error is raised.
+    """
+    attempts = max(1, attempts or settings.llm_json_max_attempts)
+    for _ in range(attempts - 1):
+        try:
+            return parse(await provider.generate_json(messages, model, schema))
+        except (*INVALID_OUTPUT_ERRORS, httpx.TransportError):
+            continue
+    return parse(await provider.generate_json(messages, model, schema))
@@ -1,15 +1,19 @@
+import logging
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from src.backend.chat import router as chat_router
 from src.backend.config import settings
 from src.backend.database import init_db
 from src.backend.documents import router as documents_router
 from src.backend.health import router as health_router
+from src.backend.http_clients import http_clients
+from src.backend.llm.scheduler import QueueFullError
 from src.backend.notebooks import router as notebooks_router
 from src.backend.notes import router as notes_router
 from src.backend.ollama import router as ollama_router
@@ -18,6 +22,25 @@ from src.backend.sources import router as sources_router
 from src.backend.studio import router as studio_router
 
 
+def configure_logging() -> None:
+    """Send the application's log records to stderr at ``settings.log_level``.
+
+    Nothing else configures the root logger, which would drop INFO records
+    such as the turn routing decisions.
+    """
+    logger = logging.getLogger("src.backend")
+    logger.setLevel(settings.log_level.upper())
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(levelname)s:     %(name)s - %(message)s"))
+        logger.addHandler(handler)
+    # The handler above is the only one, whatever the root logger is set up to do
+    logger.propagate = False
+
+
+configure_logging()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     """Application lifespan handler for startup and shutdown."""
@@ -28,9 +51,13 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     # Initialize database
     await init_db()
 
+    # Pooled HTTP clients for LLM providers
+    http_clients.open()
+
     yield
 
-    # Shutdown: cleanup if needed
+    # Shutdown: close pooled connections
+    await http_clients.aclose()
 
 
 app = FastAPI(
@@ -50,6 +77,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError) -> JSONResponse:
+    """Ask the client to retry once the provider's queue has room again."""
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # Include routers
 app.include_router(health_router)
 app.include_router(notebooks_router)
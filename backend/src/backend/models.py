@@ -29,6 +29,9 @@ class Notebook(SQLModel, table=True):
     llm_provider: str = Field(default="ollama")  # ollama, anthropic, openai
     llm_model: str = Field(default="llama3.2")
 
+    # Incremented whenever chunks are added to or removed from the notebook
+    content_version: int = Field(default=0)
+
     # Notebook summary
     summary: str | None = None
     summary_key_terms: str | None = None  # JSON array of key terms
@@ -94,6 +97,9 @@ class Chunk(SQLModel, table=True):
     token_count: int = Field(nullable=False)
     page_number: int | None = None
     embedding_id: str | None = None
+    # Set on child chunks, which are only used for matching; parents and
+    # single-level chunks (parent_id is None) hold the content used for answers
+    parent_id: str | None = Field(default=None, foreign_key="chunk.id", index=True)
 
     document: Document | None = Relationship(back_populates="chunks")
     message_sources: list["MessageSource"] = Relationship(
@@ -128,6 +134,17 @@ class Message(SQLModel, table=True):
     model: str | None = None
     feedback: str | None = None  # 'up', 'down', or null
     created_at: datetime = Field(default_factory=utc_now)
+    # Notebook content version the answer's sources were retrieved from
+    content_version: int | None = None
+    # Generation stopped early because the client disconnected
+    interrupted: bool = Field(default=False)
+    # Token counts reported by the provider (None if it reported none)
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    # Latencies in milliseconds: first token, whole generation, source retrieval
+    ttft_ms: float | None = None
+    generation_ms: float | None = None
+    retrieval_ms: float | None = None
 
     chat_session: ChatSession | None = Relationship(back_populates="messages")
     sources: list["MessageSource"] = Relationship(
@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.backend.database import get_session
+from src.backend.llm.scheduler import Priority, llm_scheduler
 from src.backend.notebooks import service
 from src.backend.notebooks.schemas import (
     NotebookCreate,
@@ -157,6 +158,7 @@ async def generate_notebook_summary(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Notebook not found",
         )
+    llm_scheduler.admit(notebook.llm_provider, Priority.BACKGROUND)
 
     # Generate the summary
     notebook = await service.generate_notebook_summary(session, notebook)
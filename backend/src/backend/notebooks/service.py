@@ -1,11 +1,12 @@
 import json
-import re
 
-from sqlalchemy import func, select
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.backend.llm import get_provider
 from src.backend.llm.base import ChatMessage as LLMChatMessage
+from src.backend.llm.scheduler import Priority, llm_scheduler
+from src.backend.llm.structured import generate_validated_json, required_text, text_list
 from src.backend.models import Chunk, Document, Notebook, utc_now
 from src.backend.notebooks.schemas import NotebookCreate, NotebookUpdate
 
@@ -76,6 +77,28 @@ async def delete_notebook(session: AsyncSession, notebook: Notebook) -> None:
     await session.commit()
 
 
+async def bump_content_version(session: AsyncSession, notebook_id: str) -> None:
+    """Mark a notebook's indexed content as changed (caller commits).
+
+    Caches keyed by content version treat entries for older versions as stale.
+    """
+    await session.execute(
+        update(Notebook)
+        .where(Notebook.id == notebook_id)
+        .values(content_version=Notebook.content_version + 1)
+    )
+
+
+NOTEBOOK_SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "key_terms": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["summary", "key_terms"],
+}
+
+
 async def generate_notebook_summary(
     session: AsyncSession,
     notebook: Notebook,
@@ -104,6 +127,7 @@ async def generate_notebook_summary(
             .join(Document, Chunk.document_id == Document.id)
             .where(Document.notebook_id == notebook.id)
             .where(Document.processing_status == "ready")
+            .where(Chunk.parent_id.is_(None))
             .order_by(Chunk.chunk_index)
             .limit(20)
         )
@@ -139,24 +163,17 @@ Only return the JSON object, nothing else."""
 
     messages = [LLMChatMessage(role="user", content=prompt)]
 
+    def parse(data: dict) -> tuple[str, list[str]]:
+        return required_text(data, "summary"), text_list(data, "key_terms")
+
     try:
-        full_response = ""
-        async for chunk in provider.chat_stream(messages, model):
-            if chunk:
-                full_response += chunk
-
-        # Parse JSON response
-        json_match = re.search(r"\{.*\}", full_response, re.DOTALL)
-        if json_match:
-            data = json.loads(json_match.group())
-            notebook.summary = data.get("summary", "")
-            key_terms = data.get("key_terms", [])
-            notebook.summary_key_terms = json.dumps(key_terms)
-        else:
-            # Fallback: use the response as summary
-            notebook.summary = full_response.strip()
-            notebook.summary_key_terms = json.dumps([])
+        async with llm_scheduler.slot(provider_name, Priority.BACKGROUND, notebook.id):
+            summary, key_terms = await generate_validated_json(
+                provider, messages, model, NOTEBOOK_SUMMARY_SCHEMA, parse
+            )
 
+        notebook.summary = summary
+        notebook.summary_key_terms = json.dumps(key_terms)
         notebook.summary_generated_at = utc_now()
         await session.commit()
         await session.refresh(notebook)
@@ -5,51 +5,46 @@ from typing import Any
 
 import httpx
 
-from src.backend.config import settings
+from src.backend.http_clients import http_clients
 
 
 async def check_connection() -> bool:
     """Check if Ollama is running and accessible."""
     try:
-        async with httpx.AsyncClient(timeout=2.0) as client:
-            response = await client.get(f"{settings.ollama_base_url}/api/tags")
-            return response.status_code == 200
+        response = await http_clients.get("ollama").get("/api/tags", timeout=2.0)
+        return response.status_code == 200
     except (httpx.ConnectError, httpx.TimeoutException):
         return False
 
 
 async def list_models() -> list[dict[str, Any]]:
     """List available models from Ollama."""
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.get(f"{settings.ollama_base_url}/api/tags")
-        response.raise_for_status()
-        data = response.json()
-        return data.get("models", [])
+    response = await http_clients.get("ollama").get("/api/tags", timeout=10.0)
+    response.raise_for_status()
+    data = response.json()
+    return data.get("models", [])
 
 
 async def get_model_info(model_name: str) -> dict[str, Any] | None:
     """Get information about a specific model."""
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.post(
-            f"{settings.ollama_base_url}/api/show",
-            json={"name": model_name},
-        )
-        if response.status_code == 404:
-            return None
-        response.raise_for_status()
-        return response.json()
+    response = await http_clients.get("ollama").post(
+        "/api/show",
+        json={"name": model_name},
+        timeout=10.0,
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
 
 
 async def pull_model(model_name: str) -> AsyncIterator[dict[str, Any]]:
     """Pull a model from Ollama, yielding progress updates."""
-    async with (
-        httpx.AsyncClient(timeout=None) as client,
-        client.stream(
-            "POST",
-            f"{settings.ollama_base_url}/api/pull",
-            json={"name": model_name, "stream": True},
-        ) as response,
-    ):
+    async with http_clients.get("ollama").stream(
+        "POST",
+        "/api/pull",
+        json={"name": model_name, "stream": True},
+    ) as response:
         response.raise_for_status()
         async for line in response.aiter_lines():
             if line:
@@ -78,14 +73,7 @@ async def generate(
     if options:
         payload["options"] = options
 
-    async with (
-        httpx.AsyncClient(timeout=None) as client,
-        client.stream(
-            "POST",
-            f"{settings.ollama_base_url}/api/generate",
-            json=payload,
-        ) as response,
-    ):
+    async with http_clients.get("ollama").stream("POST", "/api/generate", json=payload) as response:
         response.raise_for_status()
         async for line in response.aiter_lines():
             if line:
@@ -108,14 +96,7 @@ async def chat(
     if options:
         payload["options"] = options
 
-    async with (
-        httpx.AsyncClient(timeout=None) as client,
-        client.stream(
-            "POST",
-            f"{settings.ollama_base_url}/api/chat",
-            json=payload,
-        ) as response,
-    ):
+    async with http_clients.get("ollama").stream("POST", "/api/chat", json=payload) as response:
         response.raise_for_status()
         async for line in response.aiter_lines():
             if line:
@@ -13,21 +13,48 @@ class ChunkData(NamedTuple):
     token_count: int
 
 
+class SectionData(NamedTuple):
+    content: str
+    token_count: int
+    children: list[ChunkData]
+
+
 def count_tokens(text: str) -> int:
     """Count tokens using tiktoken (cl100k_base encoding)."""
     encoding = tiktoken.get_encoding("cl100k_base")
     return len(encoding.encode(text))
 
 
-def chunk_text(text: str) -> list[ChunkData]:
-    """Split text into chunks with token counts."""
+def _split(text: str, chunk_size: int, chunk_overlap: int) -> list[ChunkData]:
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=settings.chunk_size,
-        chunk_overlap=settings.chunk_overlap,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
         length_function=count_tokens,
         separators=["\n\n", "\n", ". ", " ", ""],
     )
-
     chunks = splitter.split_text(text)
 
     return [ChunkData(content=chunk, token_count=count_tokens(chunk)) for chunk in chunks]
+
+
+def chunk_text(text: str) -> list[ChunkData]:
+    """Split text into chunks with token counts."""
+    return _split(text, settings.chunk_size, settings.chunk_overlap)
+
+
+def chunk_text_hierarchical(text: str) -> list[SectionData]:
+    """Split text into non-overlapping parent sections, each split into small child chunks.
+
+    Children are what gets embedded and matched; the parent section is what
+    the LLM reads, so matching stays precise without losing surrounding context.
+    """
+    return [
+        SectionData(
+            content=section.content,
+            token_count=section.token_count,
+            children=_split(
+                section.content, settings.child_chunk_size, settings.child_chunk_overlap
+            ),
+        )
+        for section in _split(text, settings.parent_chunk_size, 0)
+    ]
@@ -4,10 +4,12 @@ from pathlib import Path
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.backend.config import settings
 from src.backend.embedding.service import embed_texts
 from src.backend.embedding.vectorstore import add_chunks_to_collection
 from src.backend.models import Chunk, Document
-from src.backend.processing.chunking import chunk_text
+from src.backend.notebooks.service import bump_content_version
+from src.backend.processing.chunking import chunk_text, chunk_text_hierarchical
 from src.backend.processing.extractors import extract_text
 
 
@@ -27,6 +29,104 @@ async def update_document_status(
     await session.refresh(document)
 
 
+def build_chunk_records(document: Document, text: str) -> tuple[list[Chunk], list[Chunk]]:
+    """Split text into chunk records.
+
+    Returns:
+        The content chunks (what answers and summaries read) and the chunks to
+        embed. With parent-child chunking these are parent sections and their
+        children; otherwise both are the same single-level chunks.
+    """
+    if not settings.parent_child_chunking:
+        chunks = [
+            Chunk(
+                document_id=document.id,
+                chunk_index=index,
+                content=chunk_data.content,
+                token_count=chunk_data.token_count,
+            )
+            for index, chunk_data in enumerate(chunk_text(text))
+        ]
+        return chunks, chunks
+
+    parents: list[Chunk] = []
+    children: list[Chunk] = []
+    for section in chunk_text_hierarchical(text):
+        parent = Chunk(
+            document_id=document.id,
+            chunk_index=len(parents),
+            content=section.content,
+            token_count=section.token_count,
+        )
+        parents.append(parent)
+        for child_data in section.children:
+            children.append(
+                Chunk(
+                    document_id=document.id,
+                    chunk_index=len(children),
+                    content=child_data.content,
+                    token_count=child_data.token_count,
+                    parent_id=parent.id,
+                )
+            )
+    return parents, children
+
+
+async def store_chunks(session: AsyncSession, document: Document, text: str) -> int:
+    """Chunk, embed and index a document's text.
+
+    Parent sections are stored once, in SQLite only; their children are
+    embedded and added to the vector store with a pointer to the parent.
+
+    Returns:
+        The number of content chunks.
+    """
+    content_chunks, index_chunks = build_chunk_records(document, text)
+    await update_document_status(session, document, "processing", progress=66)
+
+    if not content_chunks:
+        return 0
+
+    session.add_all(content_chunks)
+    if index_chunks is not content_chunks:
+        session.add_all(index_chunks)
+
+    # Flush so parents exist before children reference them
+    await session.flush()
+
+    # Generate embeddings
+    texts = [c.content for c in index_chunks]
+    embeddings = embed_texts(texts)
+
+    # Update chunks with embedding info
+    for chunk in index_chunks:
+        chunk.embedding_id = chunk.id  # Use chunk ID as embedding ID
+
+    # Store in ChromaDB
+    metadatas = []
+    for c in index_chunks:
+        metadata = {
+            "document_id": document.id,
+            "document_name": document.filename,
+            "chunk_index": c.chunk_index,
+            "token_count": c.token_count,
+        }
+        if c.parent_id:
+            metadata["parent_id"] = c.parent_id
+        metadatas.append(metadata)
+
+    add_chunks_to_collection(
+        notebook_id=document.notebook_id,
+        chunk_ids=[c.id for c in index_chunks],
+        embeddings=embeddings,
+        documents=texts,
+        metadatas=metadatas,
+    )
+
+    await bump_content_version(session, document.notebook_id)
+    return len(content_chunks)
+
+
 async def process_document(session: AsyncSession, document: Document) -> None:
     """Process a document: extract text, chunk, embed, and store."""
     try:
@@ -45,60 +145,11 @@ async def process_document(session: AsyncSession, document: Document) -> None:
         if result.page_count is not None:
             document.page_count = result.page_count
 
-        # Chunk text (33-66% progress)
-        chunks_data = chunk_text(result.text)
-        await update_document_status(session, document, "processing", progress=66)
-
-        if not chunks_data:
-            document.chunk_count = 0
-            document.processing_status = "ready"
-            document.processing_progress = 100
-            document.processing_error = None
-            await session.commit()
-            return
-
-        # Create chunk records
-        chunk_records: list[Chunk] = []
-        for index, chunk_data in enumerate(chunks_data):
-            chunk = Chunk(
-                document_id=document.id,
-                chunk_index=index,
-                content=chunk_data.content,
-                token_count=chunk_data.token_count,
-            )
-            session.add(chunk)
-            chunk_records.append(chunk)
-
-        # Flush to get chunk IDs
-        await session.flush()
-
-        # Generate embeddings
-        texts = [c.content for c in chunks_data]
-        embeddings = embed_texts(texts)
-
-        # Update chunks with embedding info
-        for chunk, _ in zip(chunk_records, embeddings, strict=True):
-            chunk.embedding_id = chunk.id  # Use chunk ID as embedding ID
-
-        # Store in ChromaDB
-        add_chunks_to_collection(
-            notebook_id=document.notebook_id,
-            chunk_ids=[c.id for c in chunk_records],
-            embeddings=embeddings,
-            documents=texts,
-            metadatas=[
-                {
-                    "document_id": document.id,
-                    "document_name": document.filename,
-                    "chunk_index": c.chunk_index,
-                    "token_count": c.token_count,
-                }
-                for c in chunk_records
-            ],
-        )
+        # Chunk, embed and index (33-100% progress)
+        chunk_count = await store_chunks(session, document, result.text)
 
         # Update document (100% progress)
-        document.chunk_count = len(chunks_data)
+        document.chunk_count = chunk_count
         document.processing_status = "ready"
         document.processing_progress = 100
         document.processing_error = None
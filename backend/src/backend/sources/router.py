@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.backend.config import settings
 from src.backend.database import get_session
 from src.backend.documents.schemas import DocumentResponse
+from src.backend.llm.scheduler import Priority, QueueFullError, llm_scheduler
 from src.backend.models import Document, Notebook
 from src.backend.sources.extractors.search import search_web
 from src.backend.sources.extractors.url import extract_url_content
@@ -217,11 +218,13 @@ async def generate_guide(
             status_code=400,
             detail="Document must be fully processed before generating a guide",
         )
+    notebook = await get_notebook_or_404(session, document.notebook_id)
+    llm_scheduler.admit(notebook.llm_provider, Priority.BACKGROUND)
 
     try:
         from src.backend.sources.service import generate_source_guide
 
-        summary, topics = await generate_source_guide(session, document)
+        summary, topics = await generate_source_guide(session, document, notebook)
 
         return SourceGuideResponse(
             document_id=document.id,
@@ -230,6 +233,8 @@ async def generate_guide(
             generated_at=document.summary_generated_at,
         )
 
+    except QueueFullError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate guide: {e}") from e
 
@@ -4,13 +4,28 @@ from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.backend.config import settings
-from src.backend.embedding.service import embed_texts
-from src.backend.embedding.vectorstore import add_chunks_to_collection
-from src.backend.models import Chunk, Document, utc_now
-from src.backend.processing.chunking import chunk_text
-from src.backend.processing.service import update_document_status
+from src.backend.llm import get_provider
+from src.backend.llm.base import ChatMessage as LLMChatMessage
+from src.backend.llm.scheduler import Priority, llm_scheduler
+from src.backend.llm.structured import (
+    INVALID_OUTPUT_ERRORS,
+    generate_validated_json,
+    required_text,
+    text_list,
+)
+from src.backend.models import Chunk, Document, Notebook, utc_now
+from src.backend.processing.service import store_chunks, update_document_status
 from src.backend.sources.extractors.url import ExtractionResult
 
+SOURCE_GUIDE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "topics": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["summary", "topics"],
+}
+
 
 async def get_source_count(session: AsyncSession, notebook_id: str) -> int:
     """Get current number of sources in a notebook."""
@@ -90,7 +105,9 @@ async def create_paste_source(
 async def get_source_content(session: AsyncSession, document_id: str) -> str:
     """Get the full content of a source from its chunks."""
     result = await session.execute(
-        select(Chunk).where(Chunk.document_id == document_id).order_by(Chunk.chunk_index)
+        select(Chunk)
+        .where(Chunk.document_id == document_id, Chunk.parent_id.is_(None))
+        .order_by(Chunk.chunk_index)
     )
     chunks = result.scalars().all()
 
@@ -109,53 +126,9 @@ async def process_non_file_source(
     try:
         await update_document_status(session, document, "processing", progress=33)
 
-        chunks_data = chunk_text(content)
-        await update_document_status(session, document, "processing", progress=66)
-
-        if not chunks_data:
-            document.chunk_count = 0
-            document.processing_status = "ready"
-            document.processing_progress = 100
-            document.processing_error = None
-            await session.commit()
-            return
-
-        chunk_records: list[Chunk] = []
-        for index, chunk_data in enumerate(chunks_data):
-            chunk = Chunk(
-                document_id=document.id,
-                chunk_index=index,
-                content=chunk_data.content,
-                token_count=chunk_data.token_count,
-            )
-            session.add(chunk)
-            chunk_records.append(chunk)
-
-        await session.flush()
-
-        texts = [c.content for c in chunks_data]
-        embeddings = embed_texts(texts)
-
-        for chunk, _ in zip(chunk_records, embeddings, strict=True):
-            chunk.embedding_id = chunk.id
-
-        add_chunks_to_collection(
-            notebook_id=document.notebook_id,
-            chunk_ids=[c.id for c in chunk_records],
-            embeddings=embeddings,
-            documents=texts,
-            metadatas=[
-                {
-                    "document_id": document.id,
-                    "document_name": document.filename,
-                    "chunk_index": c.chunk_index,
-                    "token_count": c.token_count,
-                }
-                for c in chunk_records
-            ],
-        )
+        chunk_count = await store_chunks(session, document, content)
 
-        document.chunk_count = len(chunks_data)
+        document.chunk_count = chunk_count
         document.processing_status = "ready"
         document.processing_progress = 100
         document.processing_error = None
@@ -167,15 +140,15 @@ async def process_non_file_source(
         raise
 
 
-async def generate_source_guide(session: AsyncSession, document: Document) -> tuple[str, list[str]]:
-    """Generate AI summary and topics for a document using Ollama."""
+async def generate_source_guide(
+    session: AsyncSession, document: Document, notebook: Notebook
+) -> tuple[str, list[str]]:
+    """Generate AI summary and topics for a document with the notebook's LLM."""
     import json
 
-    import httpx
-
     result = await session.execute(
         select(Chunk)
-        .where(Chunk.document_id == document.id)
+        .where(Chunk.document_id == document.id, Chunk.parent_id.is_(None))
         .order_by(Chunk.chunk_index)
         .limit(settings.source_guide_max_chunks)
     )
@@ -198,45 +171,36 @@ You MUST respond in this exact JSON format:
 Document content:
 {context}"""
 
-    response_parts = []
-    async with (
-        httpx.AsyncClient(timeout=float(settings.ollama_timeout)) as client,
-        client.stream(
-            "POST",
-            f"{settings.ollama_base_url}/api/chat",
-            json={
-                "model": settings.default_llm_model,
-                "messages": [{"role": "user", "content": prompt}],
-                "stream": True,
-            },
-        ) as response,
-    ):
-        async for line in response.aiter_lines():
-            if line:
-                chunk = json.loads(line)
-                if "message" in chunk and "content" in chunk["message"]:
-                    response_parts.append(chunk["message"]["content"])
-
-    raw_response = "".join(response_parts).strip()
-
-    # Parse JSON response
-    try:
-        # Find JSON in response (handle markdown code blocks)
-        json_str = raw_response
-        if "```json" in json_str:
-            json_str = json_str.split("```json")[1].split("```")[0]
-        elif "```" in json_str:
-            json_str = json_str.split("```")[1].split("```")[0]
-
-        parsed = json.loads(json_str.strip())
-        summary = parsed.get("summary", raw_response)
-        topics = parsed.get("topics", [])
-        if not isinstance(topics, list):
-            topics = []
-        topics = [str(t) for t in topics[:5]]
-    except (json.JSONDecodeError, IndexError):
-        summary = raw_response
-        topics = []
+    def parse(data: dict) -> tuple[str, list[str]]:
+        return required_text(data, "summary"), text_list(data, "topics")[:5]
+
+    provider = get_provider(notebook.llm_provider)
+    model = notebook.llm_model or settings.default_llm_model
+    async with llm_scheduler.slot(notebook.llm_provider, Priority.BACKGROUND, notebook.id):
+        try:
+            summary, topics = await generate_validated_json(
+                provider,
+                [LLMChatMessage(role="user", content=prompt)],
+                model,
+                SOURCE_GUIDE_SCHEMA,
+                parse,
+            )
+        except INVALID_OUTPUT_ERRORS:
+            # Degrade to a plain-text summary without topics rather than no guide
+            fallback_prompt = f"""Summarize this document in 2-3 paragraphs, with key topics in **bold**.
+
+Document content:
+{context}"""
+            parts = [
+                chunk
+                async for chunk in provider.chat_stream(
+                    [LLMChatMessage(role="user", content=fallback_prompt)],
+                    model,
+                )
+            ]
+            summary, topics = "".join(parts).strip(), []
+            if not summary:
+                raise
 
     document.summary = summary
     document.summary_topics = json.dumps(topics) if topics else None
@@ -6,6 +6,7 @@ from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.backend.database import get_session
+from src.backend.llm.scheduler import Priority, llm_scheduler
 from src.backend.notebooks.service import get_notebook
 from src.backend.studio import service
 from src.backend.studio.schemas import (
@@ -71,6 +72,7 @@ async def generate_mindmap(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Notebook not found",
         )
+    llm_scheduler.admit(notebook.llm_provider, Priority.BACKGROUND)
 
     focus_topic = request.focus_topic if request else None
     task = await service.create_mindmap_task(session, notebook, focus_topic)
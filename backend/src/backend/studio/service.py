@@ -1,5 +1,4 @@
 import json
-import re
 from uuid import uuid4
 
 from sqlalchemy import select
@@ -7,8 +6,36 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.backend.llm import get_provider
 from src.backend.llm.base import ChatMessage as LLMChatMessage
+from src.backend.llm.scheduler import Priority, llm_scheduler
+from src.backend.llm.structured import generate_validated_json, required_text
 from src.backend.models import Chunk, Document, Notebook, StudioOutput
 
+_MINDMAP_LEAF = {
+    "type": "object",
+    "properties": {"id": {"type": "string"}, "label": {"type": "string"}},
+    "required": ["label"],
+}
+
+MINDMAP_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "central_topic": {"type": "string"},
+        "nodes": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "label": {"type": "string"},
+                    "children": {"type": "array", "items": _MINDMAP_LEAF},
+                },
+                "required": ["label", "children"],
+            },
+        },
+    },
+    "required": ["central_topic", "nodes"],
+}
+
 
 async def get_mindmap(session: AsyncSession, notebook_id: str) -> StudioOutput | None:
     stmt = (
@@ -118,6 +145,7 @@ async def generate_mindmap_background(
                     .join(Document, Chunk.document_id == Document.id)
                     .where(Document.notebook_id == notebook_id)
                     .where(Document.processing_status == "ready")
+                    .where(Chunk.parent_id.is_(None))
                     .order_by(Chunk.chunk_index)
                     .limit(30)
                 )
@@ -178,25 +206,16 @@ Generate unique IDs for each node. Only return the JSON object, nothing else."""
             await _update_task_status(session, task, "processing", 50)
 
             provider = get_provider(provider_name)
-            full_response = ""
-            async for chunk in provider.chat_stream(
-                [LLMChatMessage(role="user", content=prompt)], model
-            ):
-                if chunk:
-                    full_response += chunk
+            async with llm_scheduler.slot(provider_name, Priority.BACKGROUND, notebook_id):
+                data = await generate_validated_json(
+                    provider,
+                    [LLMChatMessage(role="user", content=prompt)],
+                    model,
+                    MINDMAP_SCHEMA,
+                    _parse_mindmap,
+                )
 
             await _update_task_status(session, task, "processing", 80)
-
-            json_match = re.search(r"\{.*\}", full_response, re.DOTALL)
-            if json_match:
-                data = json.loads(json_match.group())
-                _ensure_node_ids(data)
-            else:
-                data = {
-                    "central_topic": notebook_name,
-                    "nodes": [{"id": str(uuid4()), "label": "Topics", "children": []}],
-                }
-
             await _update_task_status(session, task, "ready", 100, data=data)
 
         except Exception as e:
@@ -210,13 +229,22 @@ Generate unique IDs for each node. Only return the JSON object, nothing else."""
             )
 
 
-def _ensure_node_ids(data: dict) -> None:
-    for node in data.get("nodes", []):
+def _parse_mindmap(data: dict) -> dict:
+    """Validate a generated mind map and fill in missing node IDs."""
+    nodes = data["nodes"]
+    if not isinstance(nodes, list) or not nodes:
+        raise ValueError("Mind map has no branches")
+    for node in nodes:
         _ensure_node_id(node)
+    return {"central_topic": required_text(data, "central_topic"), "nodes": nodes}
 
 
 def _ensure_node_id(node: dict) -> None:
+    required_text(node, "label")
     if not node.get("id"):
         node["id"] = str(uuid4())
-    for child in node.get("children", []):
+    children = node.setdefault("children", [])
+    if not isinstance(children, list):
+        raise TypeError("children is not a list")
+    for child in children:
         _ensure_node_id(child)
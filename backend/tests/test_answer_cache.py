@@ -0,0 +1,76 @@
+from src.backend.chat.answer_cache import CachedAnswer, SemanticAnswerCache, make_cache_key
+
+
+def make_key(**overrides):
+    args = {
+        "notebook_id": "nb",
+        "content_version": 1,
+        "provider": "ollama",
+        "model": "llama3",
+        "chat_style": "default",
+        "response_length": "default",
+        "custom_instructions": None,
+        "document_ids": None,
+        "per_document": False,
+    }
+    args.update(overrides)
+    return make_cache_key(**args)
+
+
+def make_cache(**overrides) -> SemanticAnswerCache:
+    options = {"max_entries": 10, "ttl_seconds": 60, "similarity_threshold": 0.9}
+    options.update(overrides)
+    return SemanticAnswerCache(**options)
+
+
+def answer(content: str) -> CachedAnswer:
+    return CachedAnswer(content=content, sources=[], grounding={})
+
+
+def test_similar_query_hits():
+    cache = make_cache()
+    cache.put(make_key(), [1.0, 0.0], answer("cached"))
+
+    assert cache.get(make_key(), [0.99, 0.05]).content == "cached"
+
+
+def test_dissimilar_query_misses():
+    cache = make_cache()
+    cache.put(make_key(), [1.0, 0.0], answer("cached"))
+
+    assert cache.get(make_key(), [0.0, 1.0]) is None
+
+
+def test_key_separates_provider_and_retrieval_mode():
+    cache = make_cache()
+    cache.put(make_key(), [1.0, 0.0], answer("cached"))
+
+    assert cache.get(make_key(provider="openai"), [1.0, 0.0]) is None
+    assert cache.get(make_key(per_document=True), [1.0, 0.0]) is None
+
+
+def test_document_order_does_not_matter():
+    assert make_key(document_ids=["b", "a"]) == make_key(document_ids=["a", "b"])
+
+
+def test_custom_instructions_only_count_for_custom_style():
+    assert make_key(custom_instructions="be brief") == make_key()
+    assert make_key(chat_style="custom", custom_instructions="be brief") != make_key(
+        chat_style="custom"
+    )
+
+
+def test_new_content_version_drops_old_answers():
+    cache = make_cache()
+    cache.put(make_key(), [1.0, 0.0], answer("old"))
+    cache.put(make_key(content_version=2), [0.0, 1.0], answer("new"))
+
+    assert cache.get(make_key(), [1.0, 0.0]) is None
+    assert cache.get(make_key(content_version=2), [0.0, 1.0]).content == "new"
+
+
+def test_expired_answers_miss():
+    cache = make_cache(ttl_seconds=-1)
+    cache.put(make_key(), [1.0, 0.0], answer("cached"))
+
+    assert cache.get(make_key(), [1.0, 0.0]) is None
@@ -0,0 +1,129 @@
+import importlib
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from src.backend.cache import retrieval_cache
+from src.backend.config import settings
+from src.backend.documents.schemas import BatchSearchRequest, DocumentFilters
+from src.backend.models import Chunk, Document, Notebook
+
+# The package re-exports the APIRouter as ``router``, shadowing the module
+router = importlib.import_module("src.backend.documents.router")
+
+# Chunk IDs the fake vector store returns for each query, best match first
+MATCHES = {
+    "alpha": ["c1", "c2"],
+    "beta": ["c2"],
+}
+
+
+@pytest.fixture
+def vector_store(monkeypatch):
+    """Fake embedding and batch search; records the queries of each batch."""
+    batches: list[list[str]] = []
+    queries = list(MATCHES)
+
+    def embed_texts(texts):
+        return [[float(queries.index(text.strip().lower()))] for text in texts]
+
+    def search_collection_batch(notebook_id, query_embeddings, n_results, document_ids):
+        names = [queries[int(embedding[0])] for embedding in query_embeddings]
+        batches.append(names)
+        matches = [MATCHES[name] for name in names]
+        return {
+            "ids": matches,
+            "documents": [[f"{chunk_id} match" for chunk_id in ids] for ids in matches],
+            "metadatas": [
+                [{"document_id": "d", "document_name": "old"} for _ in ids] for ids in matches
+            ],
+            "distances": [[0.1 * (rank + 1) for rank in range(len(ids))] for ids in matches],
+        }
+
+    monkeypatch.setattr(router, "embed_texts", embed_texts)
+    monkeypatch.setattr(router, "search_collection_batch", search_collection_batch)
+    retrieval_cache.clear()
+    return batches
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add(Notebook(id="nb", name="Notebook"))
+        session.add(
+            Document(
+                id="d",
+                notebook_id="nb",
+                filename="report.pdf",
+                file_type="pdf",
+                file_size=1,
+                file_path="/tmp/report.pdf",
+                processing_status="ready",
+            )
+        )
+        for index, chunk_id in enumerate(["c1", "c2"]):
+            session.add(
+                Chunk(
+                    id=chunk_id,
+                    document_id="d",
+                    chunk_index=index,
+                    content=f"{chunk_id} text",
+                    token_count=2,
+                )
+            )
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+async def search(session, queries: list[str], **options):
+    request = BatchSearchRequest(queries=queries, **options)
+    response = await router.search_documents_batch("nb", request, session)
+    return [(result.query, [r.chunk_id for r in result.results]) for result in response.results]
+
+
+async def test_results_follow_request_order_and_duplicates_are_searched_once(session, vector_store):
+    results = await search(session, ["beta", "alpha", "  Alpha "])
+
+    assert results == [("beta", ["c2"]), ("alpha", ["c1", "c2"]), ("  Alpha ", ["c1", "c2"])]
+    assert vector_store == [["beta", "alpha"]]
+
+
+async def test_results_carry_section_text_and_current_names(session, vector_store):
+    request = BatchSearchRequest(queries=["alpha"])
+    response = await router.search_documents_batch("nb", request, session)
+
+    (first, _) = response.results[0].results
+    assert (first.content, first.document_name) == ("c1 text", "report.pdf")
+
+
+async def test_cached_queries_are_not_searched_again(session, vector_store):
+    await search(session, ["alpha"])
+    results = await search(session, ["alpha", "beta"])
+
+    assert results == [("alpha", ["c1", "c2"]), ("beta", ["c2"])]
+    assert vector_store == [["alpha"], ["beta"]]
+
+
+async def test_top_k_limits_each_query(session, vector_store):
+    assert await search(session, ["alpha"], top_k=1) == [("alpha", ["c1"])]
+
+
+async def test_filters_matching_nothing_skip_the_search(session, vector_store):
+    results = await search(session, ["alpha", "beta"], filters=DocumentFilters(file_type=["docx"]))
+
+    assert results == [("alpha", []), ("beta", [])]
+    assert vector_store == []
+
+
+async def test_too_many_queries_are_rejected(session, vector_store, monkeypatch):
+    monkeypatch.setattr(settings, "max_search_batch_queries", 1)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await search(session, ["alpha", "beta"])
+    assert exc_info.value.status_code == 400
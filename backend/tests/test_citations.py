@@ -0,0 +1,72 @@
+from src.backend.chat.citations import CitationTracker
+
+
+def make_sources(count: int) -> list[dict]:
+    return [
+        {
+            "chunk_id": f"chunk-{i}",
+            "document_id": f"doc-{i}",
+            "document_name": f"doc-{i}.pdf",
+            "content": f"text {i}",
+            "relevance_score": 0.5,
+            "citation_index": i,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def cited_indexes(events: list[dict]) -> list[int]:
+    return [event["citation_index"] for event in events]
+
+
+def test_complete_marker_in_one_token():
+    tracker = CitationTracker(make_sources(3))
+    assert cited_indexes(tracker.feed("Paris is the capital [2].")) == [2]
+
+
+def test_marker_split_across_tokens():
+    tracker = CitationTracker(make_sources(12))
+    assert tracker.feed("See [") == []
+    assert tracker.feed("1") == []
+    assert cited_indexes(tracker.feed("2] and more")) == [12]
+
+
+def test_marker_split_after_digits():
+    tracker = CitationTracker(make_sources(3))
+    assert tracker.feed("text [3") == []
+    assert cited_indexes(tracker.feed("]")) == [3]
+
+
+def test_citation_event_carries_the_source_and_page():
+    tracker = CitationTracker(make_sources(2), page_numbers={"chunk-1": 7})
+    (event,) = tracker.feed("[1]")
+    assert event == {
+        "type": "citation",
+        "citation_index": 1,
+        "chunk_id": "chunk-1",
+        "document_id": "doc-1",
+        "document_name": "doc-1.pdf",
+        "content": "text 1",
+        "relevance_score": 0.5,
+        "page_number": 7,
+    }
+
+
+def test_repeated_and_unknown_markers_are_ignored():
+    tracker = CitationTracker(make_sources(2))
+    assert cited_indexes(tracker.feed("[1] [9] [1]")) == [1]
+    assert cited_indexes(tracker.feed("[2] [1]")) == [2]
+
+
+def test_brackets_that_are_not_markers_are_not_held():
+    tracker = CitationTracker(make_sources(2))
+    tracker.feed("a list [x")
+    assert cited_indexes(tracker.feed("1] [2]")) == [2]
+
+
+def test_cited_sources_in_index_order():
+    tracker = CitationTracker(make_sources(3))
+    tracker.feed("[3] then [1]")
+
+    assert tracker.cited == [3, 1]
+    assert [s["citation_index"] for s in tracker.cited_sources()] == [1, 3]
@@ -0,0 +1,87 @@
+from datetime import UTC, datetime
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from src.backend.chat.router import resolve_document_ids
+from src.backend.documents.schemas import DocumentFilters
+from src.backend.documents.service import filter_document_ids
+from src.backend.models import Document, Notebook
+
+
+def make_document(document_id: str, **fields) -> Document:
+    values = {
+        "id": document_id,
+        "notebook_id": "nb",
+        "filename": f"{document_id}.pdf",
+        "file_type": "pdf",
+        "file_size": 1,
+        "file_path": f"/tmp/{document_id}",
+        "processing_status": "ready",
+    }
+    values.update(fields)
+    return Document(**values)
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add(Notebook(id="nb", name="Notebook"))
+        session.add_all(
+            [
+                make_document(
+                    "report", page_count=40, created_at=datetime(2024, 1, 10, tzinfo=UTC)
+                ),
+                make_document("memo", page_count=2, created_at=datetime(2024, 6, 1, tzinfo=UTC)),
+                make_document(
+                    "article",
+                    file_type="html",
+                    source_type="url",
+                    created_at=datetime(2024, 3, 1, tzinfo=UTC),
+                ),
+                make_document("draft", processing_status="processing"),
+            ]
+        )
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+async def matching(session, filters: DocumentFilters, document_ids=None) -> set[str] | None:
+    ids = await filter_document_ids(session, "nb", filters, document_ids)
+    return None if ids is None else set(ids)
+
+
+async def test_no_filters_keep_the_selection(session):
+    assert await matching(session, DocumentFilters()) is None
+    assert await matching(session, DocumentFilters(), ["memo"]) == {"memo"}
+
+
+async def test_conditions_are_combined(session):
+    assert await matching(session, DocumentFilters(file_type=["pdf"])) == {"report", "memo"}
+    assert await matching(session, DocumentFilters(file_type=["pdf"], min_pages=10)) == {"report"}
+    assert await matching(session, DocumentFilters(source_type=["url"])) == {"article"}
+
+
+async def test_date_range_and_timezones(session):
+    filters = DocumentFilters(
+        created_after=datetime(2024, 2, 1, tzinfo=UTC),
+        created_before=datetime(2024, 5, 1),
+    )
+    assert await matching(session, filters) == {"article"}
+
+
+async def test_filters_narrow_the_selection_and_skip_unready_documents(session):
+    filters = DocumentFilters(file_type=["pdf"])
+    assert await matching(session, filters, ["memo", "article"]) == {"memo"}
+    assert "draft" not in await matching(session, DocumentFilters(max_pages=100))
+
+
+async def test_chat_gets_no_sources_when_filters_match_nothing(session):
+    filters = DocumentFilters(file_type=["docx"])
+    assert await resolve_document_ids(session, "nb", None, False, filters) == []
+    assert await resolve_document_ids(session, "nb", None, True, filters) == []
@@ -0,0 +1,51 @@
+from src.backend.chat.service import _select_sources
+from src.backend.config import settings
+from src.backend.embedding.mmr import maximal_marginal_relevance
+
+QUERY = [1.0, 0.0, 0.0]
+# Two near-duplicates of the best match, and a less similar but distinct chunk
+CANDIDATES = [
+    [0.95, 0.31, 0.0],
+    [0.94, 0.34, 0.0],
+    [0.8, 0.0, 0.6],
+]
+
+
+def test_near_duplicates_give_way_to_distinct_evidence():
+    assert maximal_marginal_relevance(QUERY, CANDIDATES, k=2, lambda_mult=0.5) == [0, 2]
+
+
+def test_lambda_one_is_plain_relevance_ranking():
+    assert maximal_marginal_relevance(QUERY, CANDIDATES, k=3, lambda_mult=1.0) == [0, 1, 2]
+
+
+def test_k_is_bounded_by_the_candidates():
+    assert maximal_marginal_relevance(QUERY, CANDIDATES, k=10, lambda_mult=0.5) == [0, 2, 1]
+    assert maximal_marginal_relevance(QUERY, [], k=3) == []
+    assert maximal_marginal_relevance(QUERY, CANDIDATES, k=0) == []
+
+
+def candidate(chunk_id: str, embedding: list[float] | None) -> dict:
+    return {"chunk_id": chunk_id, "relevance_score": 0.5, "embedding": embedding}
+
+
+def test_select_sources_reranks_and_numbers_citations(monkeypatch):
+    monkeypatch.setattr(settings, "rag_mmr_enabled", True)
+    monkeypatch.setattr(settings, "rag_mmr_lambda", 0.5)
+    candidates = [candidate(f"c{i}", embedding) for i, embedding in enumerate(CANDIDATES)]
+
+    sources = _select_sources(QUERY, candidates, max_chunks=2)
+
+    assert [s["chunk_id"] for s in sources] == ["c0", "c2"]
+    assert [s["citation_index"] for s in sources] == [1, 2]
+    assert all("embedding" not in s for s in sources)
+
+
+def test_select_sources_keeps_search_order_without_embeddings(monkeypatch):
+    monkeypatch.setattr(settings, "rag_mmr_enabled", True)
+    candidates = [candidate(f"c{i}", None) for i in range(3)]
+
+    assert [s["chunk_id"] for s in _select_sources(QUERY, candidates, max_chunks=2)] == [
+        "c0",
+        "c1",
+    ]
@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from src.backend.chat import service
+from src.backend.chat.service import (
+    _collapse_to_parents,
+    _parse_search_results,
+    hydrate_parent_sections,
+)
+from src.backend.documents.router import to_search_results
+from src.backend.models import Chunk
+
+# Vector store result for one query: two children of section p1, a child of
+# p2, and a single-level chunk without a parent
+RESULTS = {
+    "ids": [["p1-a", "p1-b", "p2-a", "solo"]],
+    "documents": [["child a", "child b", "child c", "solo text"]],
+    "metadatas": [
+        [
+            {"document_id": "d", "document_name": "d.pdf", "parent_id": "p1"},
+            {"document_id": "d", "document_name": "d.pdf", "parent_id": "p1"},
+            {"document_id": "d", "document_name": "d.pdf", "parent_id": "p2"},
+            {"document_id": "d", "document_name": "d.pdf", "chunk_index": 7},
+        ]
+    ],
+    "distances": [[0.1, 0.2, 0.3, 0.4]],
+}
+
+
+def test_children_collapse_into_their_best_matching_parent():
+    collapsed = _collapse_to_parents(_parse_search_results(RESULTS))
+
+    assert [(c["chunk_id"], c["relevance_score"]) for c in collapsed] == [
+        ("p1", 0.9),
+        ("p2", 0.7),
+        ("solo", 0.6),
+    ]
+    # Parent text is loaded separately; single-level chunks keep theirs
+    assert [c["content"] for c in collapsed] == [None, None, "solo text"]
+    assert all("parent_id" not in c for c in collapsed)
+
+
+def test_search_results_are_deduplicated_by_parent_before_the_limit():
+    results = to_search_results(RESULTS, limit=2)
+
+    assert [(r.chunk_id, r.relevance_score) for r in results] == [("p1", 0.9), ("p2", 0.7)]
+
+
+@pytest.fixture
+async def sessions(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(service, "async_session", factory)
+    yield factory
+    await engine.dispose()
+
+
+async def test_parent_sections_are_hydrated_and_renumbered(sessions):
+    async with sessions() as session:
+        session.add(
+            Chunk(id="p1", document_id="d", chunk_index=0, content="section 1", token_count=2)
+        )
+        await session.commit()
+
+    sources = _collapse_to_parents(_parse_search_results(RESULTS))
+    hydrated = await hydrate_parent_sections(sources)
+
+    # p2 was deleted since the search and is dropped
+    assert [(s["chunk_id"], s["content"], s["citation_index"]) for s in hydrated] == [
+        ("p1", "section 1", 1),
+        ("solo", "solo text", 2),
+    ]
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from src.backend.chat import query_planner
+from src.backend.chat.query_planner import is_standalone_query, plan_queries
+from src.backend.chat.service import _fuse_candidates
+from src.backend.config import settings
+from src.backend.models import Message
+
+HISTORY = [
+    Message(id="m1", chat_session_id="s", role="user", content="What is the Apollo program?"),
+    Message(id="m2", chat_session_id="s", role="assistant", content="A NASA program."),
+]
+
+
+class FakeProvider:
+    def __init__(self, response: str = "", error: Exception | None = None, delay: float = 0):
+        self.response = response
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+
+    async def chat_stream(self, messages, model, usage=None):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        yield self.response
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    def use(fake: FakeProvider) -> FakeProvider:
+        monkeypatch.setattr(query_planner, "get_provider", lambda name: fake)
+        return fake
+
+    monkeypatch.setattr(settings, "rag_query_rewrite_enabled", True)
+    query_planner._plan_cache.clear()
+    return use
+
+
+def candidate(chunk_id: str, score: float) -> dict:
+    return {"chunk_id": chunk_id, "relevance_score": score}
+
+
+def test_fusion_favors_chunks_ranked_well_by_several_queries():
+    first = [candidate("a", 0.9), candidate("b", 0.8), candidate("c", 0.7)]
+    second = [candidate("b", 0.6), candidate("d", 0.5), candidate("c", 0.85)]
+
+    fused = _fuse_candidates([first, second])
+
+    assert [c["chunk_id"] for c in fused] == ["b", "c", "a", "d"]
+    # Each chunk keeps its best score across queries
+    scores = {c["chunk_id"]: c["relevance_score"] for c in fused}
+    assert scores == {"a": 0.9, "b": 0.8, "c": 0.85, "d": 0.5}
+
+
+def test_standalone_detection():
+    assert is_standalone_query("when did it launch", None)
+    assert not is_standalone_query("when did it launch?", HISTORY)
+    assert not is_standalone_query("tell me more", HISTORY)
+    assert is_standalone_query("When did the Apollo 11 mission launch?", HISTORY)
+
+
+async def test_standalone_query_skips_the_llm(provider):
+    fake = provider(FakeProvider('["unused"]'))
+    query = "When did the Apollo 11 mission launch?"
+
+    assert await plan_queries(query, HISTORY, "fake", "model") == [query]
+    assert fake.calls == 0
+
+
+async def test_follow_up_is_rewritten_and_cached(provider):
+    fake = provider(FakeProvider('["Apollo program launch date", "Apollo program cost"]'))
+
+    queries = await plan_queries("when did it start and what did it cost?", HISTORY, "fake", "m")
+    again = await plan_queries("When did it start and what did it cost?", HISTORY, "fake", "m")
+
+    assert queries == again == ["Apollo program launch date", "Apollo program cost"]
+    assert fake.calls == 1
+
+
+@pytest.mark.parametrize(
+    "fake",
+    [
+        FakeProvider(error=RuntimeError("provider down")),
+        FakeProvider("not json"),
+        FakeProvider("[]"),
+        FakeProvider('["late"]', delay=1),
+    ],
+    ids=["error", "unparseable", "empty", "timeout"],
+)
+async def test_failed_rewrite_falls_back_to_the_original_query(provider, monkeypatch, fake):
+    provider(fake)
+    monkeypatch.setattr(settings, "rag_query_rewrite_timeout", 0.05)
+    query = "when did it start?"
+
+    assert await plan_queries(query, HISTORY, "fake", "model") == [query]
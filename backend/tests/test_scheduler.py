@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from src.backend.llm.scheduler import Priority, ProviderScheduler, QueueFullError
+
+
+def busy_scheduler(max_queued: int = 3, max_queued_background: int | None = None):
+    """A scheduler with its only slot taken, so every new call has to queue."""
+    scheduler = ProviderScheduler("test", 1, max_queued, max_queued_background)
+    running = scheduler.enqueue(Priority.CHAT, "running")
+    assert running.granted
+    return scheduler, running
+
+
+def test_background_backlog_does_not_reject_chat():
+    scheduler, _ = busy_scheduler(max_queued=3)
+    for _ in range(3):
+        scheduler.enqueue(Priority.BACKGROUND, "notebook")
+
+    scheduler.admit(Priority.CHAT)
+    with pytest.raises(QueueFullError):
+        scheduler.admit(Priority.BACKGROUND)
+
+
+def test_full_chat_queue_rejects_chat_with_retry_after():
+    scheduler, _ = busy_scheduler(max_queued=2)
+    scheduler.enqueue(Priority.CHAT, "a")
+    scheduler.enqueue(Priority.CHAT, "b")
+
+    with pytest.raises(QueueFullError) as exc_info:
+        scheduler.admit(Priority.CHAT)
+    assert exc_info.value.retry_after >= 1
+    scheduler.admit(Priority.BACKGROUND)
+
+
+def test_background_has_its_own_bound():
+    scheduler, _ = busy_scheduler(max_queued=5, max_queued_background=1)
+    scheduler.enqueue(Priority.BACKGROUND, "a")
+
+    with pytest.raises(QueueFullError):
+        scheduler.admit(Priority.BACKGROUND)
+    scheduler.admit(Priority.CHAT)
+
+
+def test_enqueue_enforces_the_bound_for_admitted_requests():
+    scheduler, _ = busy_scheduler(max_queued=1)
+    # Both pass the early check before either is queued
+    scheduler.admit(Priority.CHAT)
+    scheduler.admit(Priority.CHAT)
+
+    scheduler.enqueue(Priority.CHAT, "a")
+    with pytest.raises(QueueFullError):
+        scheduler.enqueue(Priority.CHAT, "b")
+    assert scheduler.queued_at(Priority.CHAT) == 1
+
+
+def test_free_slot_is_taken_without_queueing():
+    scheduler = ProviderScheduler("test", 1, max_queued=0)
+    assert scheduler.enqueue(Priority.BACKGROUND, "a").granted
+
+
+def test_retry_after_ignores_lower_priority_work():
+    scheduler, _ = busy_scheduler(max_queued=10)
+    for _ in range(5):
+        scheduler.enqueue(Priority.BACKGROUND, "a")
+
+    assert scheduler.retry_after(Priority.CHAT) < scheduler.retry_after(Priority.BACKGROUND)
+
+
+def test_higher_priority_is_served_first():
+    scheduler, running = busy_scheduler(max_queued=10)
+    background = scheduler.enqueue(Priority.BACKGROUND, "a")
+    suggestions = scheduler.enqueue(Priority.SUGGESTIONS, "a")
+    chat = scheduler.enqueue(Priority.CHAT, "a")
+    assert [chat.position, suggestions.position, background.position] == [1, 2, 3]
+
+    running.release()
+    assert chat.granted and not suggestions.granted and not background.granted
+    chat.release()
+    assert suggestions.granted and not background.granted
+
+
+def test_notebooks_are_served_round_robin():
+    scheduler, running = busy_scheduler(max_queued=10)
+    first = scheduler.enqueue(Priority.BACKGROUND, "busy")
+    second = scheduler.enqueue(Priority.BACKGROUND, "busy")
+    other = scheduler.enqueue(Priority.BACKGROUND, "quiet")
+    assert [first.position, other.position, second.position] == [1, 2, 3]
+
+    granted = []
+    current = running
+    for _ in range(3):
+        current.release()
+        current = next(t for t in (first, second, other) if t.granted and t not in granted)
+        granted.append(current)
+    assert granted == [first, other, second]
+
+
+def test_released_waiter_leaves_the_queue():
+    scheduler, running = busy_scheduler(max_queued=10)
+    waiting = scheduler.enqueue(Priority.CHAT, "a")
+    behind = scheduler.enqueue(Priority.CHAT, "a")
+    assert scheduler.queued_at(Priority.CHAT) == 2
+
+    waiting.release()
+    assert scheduler.queued_at(Priority.CHAT) == 1
+    assert behind.position == 1
+    running.release()
+    assert behind.granted and not waiting.granted
+    assert scheduler.running == 1
+
+
+async def test_positions_are_reported_until_granted():
+    scheduler, running = busy_scheduler(max_queued=10)
+    ahead = scheduler.enqueue(Priority.CHAT, "a")
+    ticket = scheduler.enqueue(Priority.CHAT, "b")
+
+    positions = []
+
+    async def follow():
+        async for position in ticket.positions():
+            positions.append(position)
+
+    task = asyncio.create_task(follow())
+    await asyncio.sleep(0)
+    running.release()
+    await asyncio.sleep(0)
+    ahead.release()
+    await asyncio.wait_for(task, 1)
+
+    assert positions == [2, 1]
+    assert ticket.granted
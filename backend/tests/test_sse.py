@@ -0,0 +1,63 @@
+import asyncio
+
+from src.backend.chat.sse import coalesce_tokens, sse_event
+
+
+async def collect(chunks) -> list[str]:
+    return [piece async for piece in chunks]
+
+
+async def from_list(chunks: list[str], delay: float = 0.0):
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+def test_sse_event_frame():
+    assert sse_event({"type": "token", "content": "é"}) == (
+        b'data: {"type":"token","content":"\xc3\xa9"}\n\n'
+    )
+
+
+async def test_first_chunk_is_released_alone_and_rest_merged():
+    pieces = await collect(
+        coalesce_tokens(from_list(["a", "b", "c", "d"]), max_delay_ms=1000, max_bytes=1000)
+    )
+    assert pieces == ["a", "bcd"]
+
+
+async def test_buffer_is_released_at_max_bytes():
+    pieces = await collect(
+        coalesce_tokens(from_list(["x", "ab", "cd", "ef"]), max_delay_ms=1000, max_bytes=4)
+    )
+    assert pieces == ["x", "abcd", "ef"]
+
+
+async def test_buffer_is_released_when_the_delay_passes():
+    pieces = await collect(
+        coalesce_tokens(from_list(["a", "b", "c"], delay=0.05), max_delay_ms=10, max_bytes=1000)
+    )
+    assert pieces == ["a", "b", "c"]
+
+
+async def test_no_delay_passes_chunks_through_without_empties():
+    pieces = await collect(coalesce_tokens(from_list(["a", "", "b"]), max_delay_ms=0))
+    assert pieces == ["a", "b"]
+
+
+async def test_closing_early_closes_the_source():
+    closed = asyncio.Event()
+
+    async def source():
+        try:
+            for i in range(100):
+                yield f"t{i} "
+                await asyncio.sleep(0)
+        finally:
+            closed.set()
+
+    stream = coalesce_tokens(source(), max_delay_ms=1000, max_bytes=1000)
+    assert await anext(stream) == "t0 "
+    await stream.aclose()
+    await asyncio.wait_for(closed.wait(), 1)
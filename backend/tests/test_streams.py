@@ -0,0 +1,91 @@
+import asyncio
+
+from src.backend.chat.sse import sse_event
+from src.backend.chat.streams import GenerationRegistry, GenerationStream, parse_last_event_id
+
+
+def frame_seq(frame: bytes) -> int:
+    event_id = frame.split(b"\n", 1)[0].removeprefix(b"id: ").decode()
+    return int(event_id.rpartition(":")[2])
+
+
+async def events(count: int):
+    for i in range(count):
+        yield sse_event({"type": "token", "content": str(i)})
+
+
+async def read_all(stream: GenerationStream, after: int = 0) -> list[bytes]:
+    return [frame async for frame in stream.read(after)]
+
+
+def test_parse_last_event_id():
+    assert parse_last_event_id("3f2a:17", "3f2a") == 17
+    assert parse_last_event_id(None, "3f2a") == 0
+    assert parse_last_event_id("", "3f2a") == 0
+    assert parse_last_event_id("garbage", "3f2a") == 0
+
+
+def test_last_event_id_of_another_stream_replays_from_the_start():
+    assert parse_last_event_id("9b1c:17", "3f2a") == 0
+    assert parse_last_event_id("17", "3f2a") == 0
+
+
+async def test_frames_are_numbered_and_replayed_after_last_event_id():
+    registry = GenerationRegistry(max_events=100, retention_seconds=60)
+    stream = registry.start("session", events(5))
+    await asyncio.wait_for(stream.task, 1)
+
+    frames = await read_all(stream)
+    # A "stream" frame announcing the ID comes first
+    assert [frame_seq(f) for f in frames] == [1, 2, 3, 4, 5, 6]
+    assert frames[0].startswith(f"id: {stream.id}:1\n".encode())
+
+    resumed = await read_all(stream, after=4)
+    assert resumed == frames[4:]
+
+
+async def test_reader_follows_a_running_generation():
+    release = asyncio.Event()
+
+    async def slow():
+        yield sse_event({"type": "token", "content": "a"})
+        await release.wait()
+        yield sse_event({"type": "token", "content": "b"})
+
+    registry = GenerationRegistry(max_events=100, retention_seconds=60)
+    stream = registry.start("session", slow())
+    reader = asyncio.create_task(read_all(stream))
+    await asyncio.sleep(0.01)
+    release.set()
+
+    frames = await asyncio.wait_for(reader, 1)
+    assert [frame_seq(f) for f in frames] == [1, 2, 3]
+    assert frames[-1].endswith(b'"content":"b"}\n\n')
+
+
+async def test_resume_past_the_bounded_log_reports_an_error():
+    registry = GenerationRegistry(max_events=3, retention_seconds=60)
+    stream = registry.start("session", events(10))
+    await asyncio.wait_for(stream.task, 1)
+
+    frames = await read_all(stream, after=2)
+    assert frames == [sse_event({"type": "error", "error": "Stream can no longer be resumed"})]
+    assert [frame_seq(f) for f in await read_all(stream, after=8)] == [9, 10, 11]
+
+
+async def test_new_generation_cancels_the_running_one():
+    async def endless():
+        while True:
+            yield sse_event({"type": "token", "content": "x"})
+            await asyncio.sleep(0.01)
+
+    registry = GenerationRegistry(max_events=100, retention_seconds=60)
+    first = registry.start("session", endless())
+    await asyncio.sleep(0.02)
+    second = registry.start("session", events(1))
+    await asyncio.wait_for(asyncio.gather(first.task, second.task), 1)
+
+    assert first.finished
+    frames = await read_all(first)
+    assert frames[-1].endswith(b'{"type":"error","error":"Generation cancelled"}\n\n')
+    assert registry.get(second.id) is second
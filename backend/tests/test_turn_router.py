@@ -0,0 +1,82 @@
+import pytest
+
+from src.backend.chat import turn_router
+from src.backend.chat.turn_router import PROTOTYPES, classify_turn
+from src.backend.config import settings
+from src.backend.models import Message
+
+HISTORY = [
+    Message(id="m1", chat_session_id="s", role="user", content="What is RAG?"),
+    Message(id="m2", chat_session_id="s", role="assistant", content="Retrieval [1]."),
+]
+
+AXES = {"chit_chat": [1.0, 0.0, 0.0], "meta": [0.0, 1.0, 0.0]}
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    """Prototypes on two axes; queries are embedded as configured by the test."""
+    queries: dict[str, list[float]] = {}
+    phrase_routes = {phrase: route for route, phrases in PROTOTYPES.items() for phrase in phrases}
+
+    monkeypatch.setattr(settings, "rag_turn_router_enabled", True)
+    monkeypatch.setattr(settings, "rag_turn_router_threshold", 0.8)
+    monkeypatch.setattr(turn_router, "_prototype_matrix", None)
+    monkeypatch.setattr(
+        turn_router, "embed_texts", lambda texts: [AXES[phrase_routes[t]] for t in texts]
+    )
+    monkeypatch.setattr(turn_router, "embed_query", lambda query: queries[query])
+    return queries
+
+
+@pytest.mark.parametrize("query", ["thanks!", "Hello there", "ok, got it.", "thank you so much :)"])
+async def test_greetings_and_thanks_skip_retrieval(query):
+    decision = await classify_turn(query, HISTORY)
+    assert (decision.route, decision.reason) == ("chit_chat", "heuristic")
+
+
+async def test_edit_requests_need_a_previous_answer(embeddings):
+    embeddings["make it shorter"] = [0.0, 0.0, 1.0]
+
+    assert (await classify_turn("make it shorter", HISTORY)).route == "meta"
+    assert (await classify_turn("make it shorter", [])).route == "retrieve"
+
+
+async def test_edit_request_with_a_new_question_retrieves(embeddings):
+    query = "make it shorter, and what about the costs of indexing?"
+    embeddings[query] = [0.0, 0.0, 1.0]
+
+    assert (await classify_turn(query, HISTORY)).route == "retrieve"
+
+
+async def test_long_questions_retrieve_without_embedding(monkeypatch):
+    monkeypatch.setattr(settings, "rag_turn_router_max_words", 3)
+    decision = await classify_turn("how does the ranking stage work", HISTORY)
+    assert (decision.route, decision.reason, decision.query_embedding) == (
+        "retrieve",
+        "default",
+        None,
+    )
+
+
+async def test_prototype_match_routes_and_keeps_the_embedding(embeddings):
+    embeddings["much appreciated"] = [0.95, 0.1, 0.0]
+
+    decision = await classify_turn("much appreciated", HISTORY)
+
+    assert (decision.route, decision.reason) == ("chit_chat", "prototype")
+    assert decision.query_embedding == [0.95, 0.1, 0.0]
+
+
+async def test_uncertain_match_retrieves(embeddings):
+    embeddings["what about chunking"] = [0.5, 0.2, 0.8]
+
+    decision = await classify_turn("what about chunking", HISTORY)
+
+    assert (decision.route, decision.reason) == ("retrieve", "default")
+    assert decision.score < 0.8
+
+
+async def test_disabled_router_always_retrieves(monkeypatch):
+    monkeypatch.setattr(settings, "rag_turn_router_enabled", False)
+    assert (await classify_turn("thanks!", HISTORY)).route == "retrieve"
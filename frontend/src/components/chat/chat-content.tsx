@@ -7,6 +7,7 @@ import { showToast } from "@/components/ui/toast";
 import { useMessages } from "@/hooks/use-chat";
 import { useScrollSentinel } from "@/hooks/use-scroll-sentinel";
 import { useChatStream } from "@/hooks/use-chat-stream";
+import { useRetrievalPrefetch } from "@/hooks/use-retrieval-prefetch";
 import {
   useNotebookSummary,
   useGenerateNotebookSummary,
@@ -76,6 +77,13 @@ export function ChatContent({ sessionId, notebookId }: ChatContentProps) {
     isStreaming: streaming.isBufferActive,
   });
 
+  useRetrievalPrefetch(
+    sessionId,
+    inputValue,
+    selectedSources.size > 0 ? Array.from(selectedSources) : undefined,
+    !streaming.isActive,
+  );
+
   const handleCitationClick = useCallback(
     (index: number) => {
       if (streaming.sources.length > 0) {
@@ -324,6 +332,7 @@ export function ChatContent({ sessionId, notebookId }: ChatContentProps) {
               stoppedContent={stoppedContent}
               suggestedQuestions={suggestions.questions}
               streamingStage={streaming.stage}
+              queuePosition={streaming.queuePosition}
               searchQuery={searchQuery}
               hasMoreMessages={hasMoreMessages}
               onCitationClick={handleCitationClick}
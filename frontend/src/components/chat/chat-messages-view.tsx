@@ -26,6 +26,7 @@ interface ChatMessagesViewProps {
   stoppedContent: string;
   suggestedQuestions: string[];
   streamingStage: StreamingStage | null;
+  queuePosition: number | null;
   searchQuery: string;
   hasMoreMessages: boolean;
   onCitationClick: (index: number) => void;
@@ -52,6 +53,7 @@ export const ChatMessagesView = forwardRef<
     stoppedContent,
     suggestedQuestions,
     streamingStage,
+    queuePosition,
     searchQuery,
     hasMoreMessages,
     onCitationClick,
@@ -71,6 +73,12 @@ export const ChatMessagesView = forwardRef<
     lastAssistantMessage &&
     lastAssistantMessage.content.startsWith(streamingContent.slice(0, 100));
 
+  // The server saves a stopped answer as an interrupted message
+  const stoppedAlreadyPersisted =
+    stoppedContent &&
+    lastAssistantMessage?.interrupted &&
+    lastAssistantMessage.content.startsWith(stoppedContent.slice(0, 100));
+
   return (
     <div className="mx-auto max-w-3xl space-y-6 px-6 pb-16 pt-6">
       {hasMoreMessages && (
@@ -136,9 +144,12 @@ export const ChatMessagesView = forwardRef<
         />
       )}
       {isStreaming && !streamingContent && (
-        <ThinkingIndicator stage={streamingStage} />
+        <ThinkingIndicator
+          stage={streamingStage}
+          queuePosition={queuePosition}
+        />
       )}
-      {!isStreaming && stoppedContent && (
+      {!isStreaming && stoppedContent && !stoppedAlreadyPersisted && (
         <StoppedMessage content={stoppedContent} />
       )}
       {!isStreaming &&
@@ -24,6 +24,7 @@ import {
   useInvalidateChatSessions,
 } from "@/hooks/use-chat";
 import { sendMessage, regenerateMessage } from "@/lib/api";
+import { addCitedSource } from "@/lib/citation-utils";
 import type { ChatMessage, SourceInfo, StreamEvent } from "@/types/api";
 
 interface ChatViewProps {
@@ -80,6 +81,9 @@ export function ChatView({
         case "sources":
           setCurrentSources(event.sources || []);
           break;
+        case "citation":
+          setCurrentSources((prev) => addCitedSource(prev, event));
+          break;
         case "token":
           setStreamingContent((prev) => prev + (event.content || ""));
           break;
@@ -1,12 +1,13 @@
 "use client";
 
-import { Bot, Search, BookOpen, Sparkles } from "lucide-react";
+import { Bot, Search, BookOpen, Sparkles, Clock } from "lucide-react";
 import type { StreamingStage } from "@/types/api";
 
 const STAGE_CONFIG: Record<
   StreamingStage,
   { message: string; icon: typeof Search }
 > = {
+  queued: { message: "Waiting for the model...", icon: Clock },
   searching: { message: "Searching sources...", icon: Search },
   reading: { message: "Reading documents...", icon: BookOpen },
   generating: { message: "Generating response...", icon: Sparkles },
@@ -14,10 +15,18 @@ const STAGE_CONFIG: Record<
 
 interface ThinkingIndicatorProps {
   stage?: StreamingStage | null;
+  queuePosition?: number | null;
 }
 
-export function ThinkingIndicator({ stage }: ThinkingIndicatorProps) {
+export function ThinkingIndicator({
+  stage,
+  queuePosition,
+}: ThinkingIndicatorProps) {
   const config = stage ? STAGE_CONFIG[stage] : STAGE_CONFIG.searching;
+  const message =
+    stage === "queued" && queuePosition
+      ? `Waiting for the model (#${queuePosition} in line)...`
+      : config.message;
   const StageIcon = config.icon;
 
   return (
@@ -34,7 +43,7 @@ export function ThinkingIndicator({ stage }: ThinkingIndicatorProps) {
         <div className="flex items-center gap-2">
           <StageIcon className="h-3.5 w-3.5 text-on-surface-muted" />
           <span className="text-sm text-on-surface-muted">
-            {config.message}
+            {message}
           </span>
         </div>
       </div>
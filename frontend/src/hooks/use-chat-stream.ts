@@ -4,7 +4,14 @@ import {
   useInvalidateMessages,
   useInvalidateChatSessions,
 } from "@/hooks/use-chat";
-import { sendMessage, regenerateMessage, editMessage } from "@/lib/api";
+import {
+  sendMessage,
+  regenerateMessage,
+  editMessage,
+  getFollowUpQuestions,
+  cancelChatStream,
+} from "@/lib/api";
+import { addCitedSource } from "@/lib/citation-utils";
 import type {
   SourceInfo,
   StreamEvent,
@@ -37,9 +44,11 @@ export function useChatStream({
   const [suggestedQuestions, setSuggestedQuestions] = useState<string[]>([]);
   const [isStreaming, setIsStreaming] = useState(false);
   const [currentStage, setCurrentStage] = useState<StreamingStage | null>(null);
+  const [queuePosition, setQueuePosition] = useState<number | null>(null);
 
   const abortControllerRef = useRef<AbortController | null>(null);
   const stoppedByUserRef = useRef(false);
+  const streamIdRef = useRef<string | null>(null);
   const resetBufferRef = useRef<(() => void) | null>(null);
 
   const invalidateMessages = useInvalidateMessages(sessionId);
@@ -66,12 +75,29 @@ export function useChatStream({
   const handleEvent = useCallback(
     (event: StreamEvent) => {
       switch (event.type) {
+        case "stream":
+          streamIdRef.current = event.stream_id || null;
+          break;
         case "stage":
           setCurrentStage(event.stage || null);
           break;
+        case "queue":
+          // Position 0 means the model is free and generation is starting
+          if (event.position) {
+            setCurrentStage("queued");
+            setQueuePosition(event.position);
+          } else {
+            setCurrentStage("generating");
+            setQueuePosition(null);
+          }
+          break;
         case "sources":
           setCurrentSources(event.sources || []);
           break;
+        case "citation":
+          // Long-context answers send no source list; cited sources arrive here
+          setCurrentSources((prev) => addCitedSource(prev, event));
+          break;
         case "grounding":
           setGroundingMetadata(event.metadata || null);
           break;
@@ -82,9 +108,12 @@ export function useChatStream({
           setIsStreaming(false);
           setCurrentStage(null);
           completeStreamingBuffer();
-          break;
-        case "suggestions":
-          setSuggestedQuestions(event.questions || []);
+          // Follow-up questions are generated after the stream closes
+          if (event.message_id) {
+            getFollowUpQuestions(event.message_id)
+              .then(setSuggestedQuestions)
+              .catch(() => {});
+          }
           break;
         case "error":
           setError(event.error || "An error occurred");
@@ -103,6 +132,7 @@ export function useChatStream({
     setCurrentSources([]);
     setGroundingMetadata(null);
     setCurrentStage(null);
+    setQueuePosition(null);
     stoppedByUserRef.current = false;
   }, [resetStreamingBuffer]);
 
@@ -163,11 +193,18 @@ export function useChatStream({
     stoppedByUserRef.current = true;
     setStoppedContent(streamingContent);
     abortControllerRef.current?.abort();
+    // Generation outlives the connection, so stop it explicitly
+    if (streamIdRef.current) {
+      cancelChatStream(streamIdRef.current).catch(() => {});
+      streamIdRef.current = null;
+    }
     setIsStreaming(false);
     setCurrentStage(null);
     resetStreamingBuffer();
     setPendingUserMessage(null);
     invalidateMessages();
+    // The partial answer is saved once the server notices the disconnect
+    setTimeout(invalidateMessages, 1000);
   }, [streamingContent, resetStreamingBuffer, invalidateMessages]);
 
   const regenerate = useCallback(
@@ -260,6 +297,7 @@ export function useChatStream({
       grounding: groundingMetadata,
       isBufferActive,
       stage: currentStage,
+      queuePosition,
     },
     error: {
       message: error,
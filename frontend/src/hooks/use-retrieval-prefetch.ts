@@ -0,0 +1,53 @@
+import { useEffect, useRef } from "react";
+import { cancelPrefetch, prefetchRetrieval } from "@/lib/api";
+
+const PREFETCH_DEBOUNCE_MS = 400;
+const MIN_PREFETCH_LENGTH = 12;
+
+/**
+ * Warm retrieval for the draft in the chat input once the user pauses typing,
+ * so that sending it can skip embedding and search.
+ */
+export function useRetrievalPrefetch(
+  sessionId: string,
+  draft: string,
+  documentIds: string[] | undefined,
+  enabled: boolean,
+) {
+  const hasPendingRef = useRef(false);
+  const documentKey = documentIds?.join(",") ?? "";
+
+  useEffect(() => {
+    const content = draft.trim();
+    if (!enabled) {
+      // A send consumes the pending prefetch, so there is nothing to cancel
+      hasPendingRef.current = false;
+      return;
+    }
+    if (content.length < MIN_PREFETCH_LENGTH) {
+      if (hasPendingRef.current && !content) {
+        hasPendingRef.current = false;
+        cancelPrefetch(sessionId).catch(() => {});
+      }
+      return;
+    }
+
+    const controller = new AbortController();
+    const timer = setTimeout(() => {
+      hasPendingRef.current = true;
+      prefetchRetrieval(
+        sessionId,
+        content,
+        documentKey ? documentKey.split(",") : undefined,
+        controller.signal,
+      ).catch(() => {
+        // Prefetch is best-effort; rate limiting and aborts are expected
+      });
+    }, PREFETCH_DEBOUNCE_MS);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [sessionId, draft, documentKey, enabled]);
+}
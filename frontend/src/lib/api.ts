@@ -381,6 +381,78 @@ export async function getMessages(sessionId: string): Promise<ChatMessage[]> {
   return response.messages;
 }
 
+// Generation continues on the server when the connection drops; resume it
+// from the last event received instead of failing the stream
+const MAX_STREAM_RESUMES = 3;
+
+async function readChatStream(
+  response: Response,
+  onEvent: (event: StreamEvent) => void,
+  signal?: AbortSignal,
+): Promise<void> {
+  let lastEventId: string | null = null;
+  let finished = false;
+  let resumes = 0;
+
+  while (true) {
+    const reader = response.body?.getReader();
+    if (!reader) throw new Error("No response body");
+
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    try {
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop() || "";
+
+        for (const line of lines) {
+          if (line.startsWith("id: ")) {
+            lastEventId = line.slice(4);
+          } else if (line.startsWith("data: ")) {
+            const data = line.slice(6);
+            try {
+              const event = JSON.parse(data) as StreamEvent;
+              if (event.type === "done" || event.type === "error") {
+                finished = true;
+              }
+              onEvent(event);
+            } catch {
+              // Ignore parse errors
+            }
+          }
+        }
+      }
+    } catch (err) {
+      if (signal?.aborted || !lastEventId || resumes >= MAX_STREAM_RESUMES) {
+        throw err;
+      }
+    }
+
+    if (finished || !lastEventId) return;
+    if (resumes >= MAX_STREAM_RESUMES) throw new Error("Stream interrupted");
+    resumes += 1;
+
+    const streamId = lastEventId.split(":")[0];
+    response = await fetch(`${API_BASE_URL}/api/streams/${streamId}`, {
+      headers: { "Last-Event-ID": lastEventId },
+      signal,
+    });
+    if (!response.ok) {
+      const errorText = await response.text();
+      throw new ApiError(response.status, errorText || response.statusText);
+    }
+  }
+}
+
+export async function cancelChatStream(streamId: string): Promise<void> {
+  return request<void>(`/api/streams/${streamId}`, { method: "DELETE" });
+}
+
 export async function sendMessage(
   sessionId: string,
   content: string,
@@ -404,32 +476,26 @@ export async function sendMessage(
     throw new ApiError(response.status, errorText || response.statusText);
   }
 
-  const reader = response.body?.getReader();
-  if (!reader) throw new Error("No response body");
-
-  const decoder = new TextDecoder();
-  let buffer = "";
-
-  while (true) {
-    const { done, value } = await reader.read();
-    if (done) break;
+  await readChatStream(response, onEvent, signal);
+}
 
-    buffer += decoder.decode(value, { stream: true });
-    const lines = buffer.split("\n");
-    buffer = lines.pop() || "";
+export async function prefetchRetrieval(
+  sessionId: string,
+  content: string,
+  documentIds?: string[],
+  signal?: AbortSignal,
+): Promise<void> {
+  return request<void>(`/api/sessions/${sessionId}/prefetch`, {
+    method: "POST",
+    body: JSON.stringify({ content, document_ids: documentIds }),
+    signal,
+  });
+}
 
-    for (const line of lines) {
-      if (line.startsWith("data: ")) {
-        const data = line.slice(6);
-        try {
-          const event = JSON.parse(data) as StreamEvent;
-          onEvent(event);
-        } catch {
-          // Ignore parse errors
-        }
-      }
-    }
-  }
+export async function cancelPrefetch(sessionId: string): Promise<void> {
+  return request<void>(`/api/sessions/${sessionId}/prefetch`, {
+    method: "DELETE",
+  });
 }
 
 export async function regenerateMessage(
@@ -451,32 +517,7 @@ export async function regenerateMessage(
     throw new ApiError(response.status, errorText || response.statusText);
   }
 
-  const reader = response.body?.getReader();
-  if (!reader) throw new Error("No response body");
-
-  const decoder = new TextDecoder();
-  let buffer = "";
-
-  while (true) {
-    const { done, value } = await reader.read();
-    if (done) break;
-
-    buffer += decoder.decode(value, { stream: true });
-    const lines = buffer.split("\n");
-    buffer = lines.pop() || "";
-
-    for (const line of lines) {
-      if (line.startsWith("data: ")) {
-        const data = line.slice(6);
-        try {
-          const event = JSON.parse(data) as StreamEvent;
-          onEvent(event);
-        } catch {
-          // Ignore parse errors
-        }
-      }
-    }
-  }
+  await readChatStream(response, onEvent, signal);
 }
 
 export async function editMessage(
@@ -498,32 +539,7 @@ export async function editMessage(
     throw new ApiError(response.status, errorText || response.statusText);
   }
 
-  const reader = response.body?.getReader();
-  if (!reader) throw new Error("No response body");
-
-  const decoder = new TextDecoder();
-  let buffer = "";
-
-  while (true) {
-    const { done, value } = await reader.read();
-    if (done) break;
-
-    buffer += decoder.decode(value, { stream: true });
-    const lines = buffer.split("\n");
-    buffer = lines.pop() || "";
-
-    for (const line of lines) {
-      if (line.startsWith("data: ")) {
-        const data = line.slice(6);
-        try {
-          const event = JSON.parse(data) as StreamEvent;
-          onEvent(event);
-        } catch {
-          // Ignore parse errors
-        }
-      }
-    }
-  }
+  await readChatStream(response, onEvent, signal);
 }
 
 export async function setMessageFeedback(
@@ -545,6 +561,15 @@ export async function getSuggestedQuestions(
   return response.questions;
 }
 
+export async function getFollowUpQuestions(
+  messageId: string,
+): Promise<string[]> {
+  const response = await request<SuggestedQuestionsResponse>(
+    `/api/messages/${messageId}/suggested-questions`,
+  );
+  return response.questions;
+}
+
 // Notebook Summary API
 
 export async function getNotebookSummary(
@@ -1,5 +1,5 @@
 import React from "react";
-import type { SourceInfo } from "@/types/api";
+import type { SourceInfo, StreamEvent } from "@/types/api";
 
 export interface ProcessTextWithCitationsOptions {
   text: string;
@@ -113,3 +113,33 @@ export function processChildren({
     );
   });
 }
+
+/**
+ * Add the source of a streamed `citation` event to the current sources,
+ * unless a source with that citation index is already known.
+ */
+export function addCitedSource(
+  sources: SourceInfo[],
+  event: StreamEvent,
+): SourceInfo[] {
+  const index = event.citation_index;
+  if (
+    index === undefined ||
+    !event.chunk_id ||
+    !event.document_id ||
+    sources.some((s) => s.citation_index === index)
+  ) {
+    return sources;
+  }
+  return [
+    ...sources,
+    {
+      chunk_id: event.chunk_id,
+      document_id: event.document_id,
+      document_name: event.document_name ?? "",
+      content: event.content ?? "",
+      relevance_score: event.relevance_score ?? 0,
+      citation_index: index,
+    },
+  ];
+}
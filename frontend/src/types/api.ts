@@ -143,6 +143,12 @@ export interface ChatMessage {
   content: string;
   model: string | null;
   feedback: MessageFeedback;
+  interrupted: boolean;
+  prompt_tokens: number | null;
+  completion_tokens: number | null;
+  ttft_ms: number | null;
+  generation_ms: number | null;
+  retrieval_ms: number | null;
   created_at: string;
 }
 
@@ -167,7 +173,11 @@ export interface GroundingMetadata {
   sources_filtered: number;
 }
 
-export type StreamingStage = "searching" | "reading" | "generating";
+export type StreamingStage =
+  | "queued"
+  | "searching"
+  | "reading"
+  | "generating";
 
 export interface StreamEvent {
   type:
@@ -175,16 +185,26 @@ export interface StreamEvent {
     | "token"
     | "done"
     | "error"
-    | "suggestions"
     | "grounding"
-    | "stage";
+    | "stage"
+    | "citation"
+    | "stream"
+    | "queue";
   sources?: SourceInfo[];
   content?: string;
   message_id?: string;
   error?: string;
-  questions?: string[];
   metadata?: GroundingMetadata;
   stage?: StreamingStage;
+  cached?: boolean;
+  citation_index?: number;
+  chunk_id?: string;
+  document_id?: string;
+  document_name?: string;
+  relevance_score?: number;
+  page_number?: number | null;
+  stream_id?: string;
+  position?: number;
 }
 
 export interface SuggestedQuestionsResponse {